@@ -0,0 +1,246 @@
+# benchmarks/load.py
+#
+# Load driver for the dashboard, point and chatbot views. Reports
+# throughput and p50/p95/p99 latency per view.
+#
+#     python -m benchmarks.load --scenario sparse --concurrency 16 --duration 30
+#     python -m benchmarks.load --url http://127.0.0.1:8000   # see serve.py
+#
+# Without --url the app runs in this process (Django test client) against
+# the OpenAQ replay stand-in and the stub chatbot backend, and the report
+# includes how many upstream calls were made.
+
+import argparse
+import math
+import os
+import random
+import threading
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from dashboard.metadata.areas import AREAS, DELHI_BBOX  # noqa: E402
+
+from benchmarks.replay import SCENARIOS, ReplayOpenAQ, install  # noqa: E402
+
+VIEWS = ("dashboard", "point", "chatbot")
+
+CHATBOT_QUERIES = (
+    "Is it safe to go for a run?",
+    "Why is the air so bad today?",
+    "Should my kids play outside?",
+    "What mask should I wear?",
+    "When will the air get better?",
+)
+CHATBOT_CONTEXT = {
+    "user_type": "citizen",
+    "aqi": {"aqi": 212, "category": "Poor", "dominant_pollutant": "pm25"},
+    "pollutants": {"pm25": 96.0, "pm10": 180.0, "no2": 42.0},
+}
+
+
+def random_points(count: int, seed: int) -> list:
+    """
+    count fixed points in the Delhi bbox; fewer points means more requests
+    per grid cell, i.e. a higher cache hit ratio.
+    """
+
+    rng = random.Random(seed)
+    min_lon, min_lat, max_lon, max_lat = DELHI_BBOX
+    return [
+        (round(rng.uniform(min_lat, max_lat), 5), round(rng.uniform(min_lon, max_lon), 5))
+        for _ in range(count)
+    ]
+
+
+def build_request(view: str, rng: random.Random, points: list) -> tuple:
+    """
+    (method, path, json body or None) for one request to view.
+    """
+
+    if view == "dashboard":
+        return "GET", f"/api/dashboard/?area_id={rng.choice(list(AREAS))}", None
+    if view == "point":
+        lat, lon = rng.choice(points)
+        return "GET", f"/api/point-aqi/?lat={lat}&lon={lon}", None
+    return "POST", "/api/chatbot/", {**CHATBOT_CONTEXT, "query": rng.choice(CHATBOT_QUERIES)}
+
+
+def in_process_sender():
+    from django.test import Client
+
+    local = threading.local()
+
+    def send(method, path, body) -> int:
+        client = getattr(local, "client", None)
+        if client is None:
+            # "localhost" passes the DEBUG ALLOWED_HOSTS check; view errors
+            # become 500s as they would on a real server
+            client = local.client = Client(
+                SERVER_NAME="localhost", raise_request_exception=False
+            )
+        if method == "GET":
+            return client.get(path).status_code
+        return client.post(path, body, content_type="application/json").status_code
+
+    return send
+
+
+def http_sender(base_url: str, concurrency: int, timeout: float):
+    import httpx
+
+    client = httpx.Client(
+        base_url=base_url,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrency),
+    )
+
+    def send(method, path, body) -> int:
+        return client.request(method, path, json=body).status_code
+
+    return send
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    # nearest rank
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run(send, views: list, points: list, concurrency: int,
+        duration: float, max_requests: int | None, seed: int) -> tuple:
+    """
+    Drives send() from concurrency threads until duration elapses or
+    max_requests were sent. Returns ({view: [(seconds, ok), ...]}, elapsed).
+    """
+
+    results = {view: [] for view in views}
+    results_lock = threading.Lock()
+    sent = 0
+    sent_lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int):
+        nonlocal sent
+        rng = random.Random(seed + index)
+        local = {view: [] for view in views}
+
+        while time.perf_counter() < deadline:
+            if max_requests is not None:
+                with sent_lock:
+                    if sent >= max_requests:
+                        break
+                    sent += 1
+
+            view = rng.choice(views)
+            method, path, body = build_request(view, rng, points)
+            started = time.perf_counter()
+            try:
+                ok = 200 <= send(method, path, body) < 400
+            except Exception:
+                ok = False
+            local[view].append((time.perf_counter() - started, ok))
+
+        with results_lock:
+            for view, samples in local.items():
+                results[view].extend(samples)
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(i,), name=f"load-{i}")
+        for i in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return results, time.perf_counter() - started
+
+
+def report(results: dict, elapsed: float) -> str:
+    lines = [
+        f"{'view':<12}{'requests':>10}{'errors':>8}{'req/s':>9}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    ]
+
+    everything = []
+    for view, samples in list(results.items()) + [("total", None)]:
+        if samples is None:
+            samples = everything
+        else:
+            everything = everything + samples
+
+        latencies = sorted(s for s, _ in samples)
+        errors = sum(1 for _, ok in samples if not ok)
+        lines.append(
+            f"{view:<12}{len(samples):>10}{errors:>8}{len(samples) / elapsed:>9.1f}"
+            + "".join(
+                f"{percentile(latencies, p) * 1e3:>10.1f}" for p in (50, 95, 99)
+            )
+            + f"{(latencies[-1] if latencies else float('nan')) * 1e3:>10.1f}"
+        )
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the AQI and chatbot views.")
+    parser.add_argument("--url", help="Base URL of a running server; in-process if omitted.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="normal",
+                        help="OpenAQ replay scenario (in-process only).")
+    parser.add_argument("--views", default=",".join(VIEWS),
+                        help="Comma-separated subset of " + ", ".join(VIEWS) + ".")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds.")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests.")
+    parser.add_argument("--points", type=int, default=200,
+                        help="Distinct points the point view picks from.")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    views = [v.strip() for v in args.views.split(",") if v.strip()]
+    unknown = set(views) - set(VIEWS)
+    if unknown:
+        parser.error(f"unknown views: {', '.join(sorted(unknown))}")
+
+    replay = None
+    if args.url:
+        send = http_sender(args.url, args.concurrency, args.timeout)
+        target = args.url
+    else:
+        from dashboard.services.chatbot_service import StubBackend, set_model_backend
+
+        replay = ReplayOpenAQ(args.scenario, seed=args.seed)
+        install(replay)
+        set_model_backend(StubBackend())
+        send = in_process_sender()
+        target = f"in-process, replay scenario {args.scenario!r}"
+
+    print(f"{target}: {args.concurrency} workers, views {', '.join(views)}")
+    results, elapsed = run(
+        send,
+        views,
+        random_points(args.points, args.seed),
+        args.concurrency,
+        args.duration,
+        args.requests,
+        args.seed,
+    )
+    print(report(results, elapsed))
+
+    if replay is not None:
+        calls = replay.stats()
+        print("upstream calls: " + (
+            ", ".join(f"{k} {v}" for k, v in sorted(calls.items())) or "none"
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/record.py
+#
+# Records a fresh fixture from the live OpenAQ API (needs OPENAQ_API_KEY):
+#
+#     python -m benchmarks.record [--max-sensors 40] [--hours 12]
+
+import argparse
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from dotenv import load_dotenv
+
+from benchmarks.fixture import DEFAULT_FIXTURE, trim_location, trim_measurement
+from dashboard.metadata.areas import DELHI_BBOX
+from dashboard.services.calculate_aqi import SUPPORTED_POLLUTANTS
+
+
+def record(max_sensors: int, hours: int) -> dict:
+    load_dotenv()
+    client = httpx.Client(
+        base_url=os.getenv("OPENAQ_BASE_URL", "https://api.openaq.org/v3"),
+        headers={"X-API-Key": os.environ["OPENAQ_API_KEY"]},
+        timeout=30,
+    )
+
+    with client:
+        response = client.get("/locations", params={
+            "bbox": ",".join(str(v) for v in DELHI_BBOX),
+            "limit": 1000,
+        })
+        response.raise_for_status()
+        locations = [trim_location(loc) for loc in response.json()["results"]]
+
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        measurements = {}
+        for loc in locations:
+            for sensor in loc["sensors"]:
+                if len(measurements) >= max_sensors:
+                    break
+                if sensor["parameter"]["name"].lower() not in SUPPORTED_POLLUTANTS:
+                    continue
+
+                response = client.get(
+                    f"/sensors/{sensor['id']}/measurements",
+                    params={"datetime_from": since.isoformat(), "limit": 100},
+                )
+                response.raise_for_status()
+                results = response.json()["results"]
+                if results:
+                    measurements[str(sensor["id"])] = [trim_measurement(m) for m in results]
+
+    recorded = {str(sid) for sid in measurements}
+    locations = [
+        loc for loc in locations
+        if any(str(s["id"]) in recorded for s in loc["sensors"])
+    ]
+
+    return {
+        "source": "openaq",
+        "recorded_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "bbox": list(DELHI_BBOX),
+        "locations": locations,
+        "measurements": measurements,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record an OpenAQ fixture for the benchmarks.")
+    parser.add_argument("--out", default=DEFAULT_FIXTURE)
+    parser.add_argument("--max-sensors", type=int, default=40)
+    parser.add_argument("--hours", type=int, default=12)
+    args = parser.parse_args()
+
+    fixture = record(args.max_sensors, args.hours)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, ensure_ascii=False, separators=(",", ":"))
+
+    count = sum(len(m) for m in fixture["measurements"].values())
+    print(f"recorded {len(fixture['locations'])} locations, {count} measurements -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# benchmarks/replay.py
+#
+# A local stand-in for the OpenAQ SDK client that replays a recorded
+# fixture, so the HTTP endpoints can be load-tested without touching the
+# real API:
+#
+#     from benchmarks.replay import ReplayOpenAQ, install
+#     install(ReplayOpenAQ("sparse", latency_ms=300))
+#
+# Only the calls openaq_point_service makes are implemented, with the
+# installed SDK's signatures, so a call the real client would reject fails
+# here too. The SDK has no radius search over measurements, so neither
+# does the stand-in. Scenarios set
+# the injected latency, the error rate, the share of recorded locations
+# that are visible (sparse coverage forces radius expansion) and an
+# optional per-minute quota enforced with 429s and x-ratelimit headers.
+
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from math import hypot
+from types import SimpleNamespace
+
+from openaq import HTTPRateLimitError, ServiceUnavailableError
+
+from benchmarks.fixture import DEFAULT_FIXTURE, load_fixture
+from dashboard.services import openaq_point_service, sensor_catalog
+from dashboard.services.geo import project_km
+
+SCENARIOS = {
+    # no injected delay: measures the app alone
+    "instant": {"latency_ms": 0, "jitter_ms": 0, "error_rate": 0.0, "coverage": 1.0},
+    # typical OpenAQ round-trip from India
+    "normal": {"latency_ms": 250, "jitter_ms": 100, "error_rate": 0.0, "coverage": 1.0},
+    "slow": {"latency_ms": 2000, "jitter_ms": 1000, "error_rate": 0.0, "coverage": 1.0},
+    "flaky": {"latency_ms": 250, "jitter_ms": 100, "error_rate": 0.2, "coverage": 1.0},
+    # a quarter of the stations: most points need a wider radius
+    "sparse": {"latency_ms": 250, "jitter_ms": 100, "error_rate": 0.0, "coverage": 0.25},
+    # OpenAQ's default quota
+    "quota": {"latency_ms": 250, "jitter_ms": 100, "error_rate": 0.0, "coverage": 1.0,
+              "quota_per_minute": 60},
+}
+
+
+def _utc(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _iso(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _ns(value):
+    """
+    Recursively turns fixture JSON into attribute objects, the way the SDK
+    exposes response models (camelCase keys become snake_case).
+    """
+
+    if isinstance(value, dict):
+        return SimpleNamespace(**{
+            "".join("_" + c.lower() if c.isupper() else c for c in k): _ns(v)
+            for k, v in value.items()
+        })
+    if isinstance(value, list):
+        return [_ns(v) for v in value]
+    return value
+
+
+def _response(results: list, headers, found: int | None = None):
+    return SimpleNamespace(
+        headers=headers,
+        meta=SimpleNamespace(found=len(results) if found is None else found),
+        results=results,
+    )
+
+
+class _Resource:
+    def __init__(self, client: "ReplayOpenAQ"):
+        self._client = client
+
+
+class _Measurements(_Resource):
+    def list(self, sensors_id, data, rollup=None, datetime_from=None,
+             datetime_to=None, date_from=None, date_to=None, page=1, limit=1000):
+        if data != "measurements" or rollup is not None:
+            raise NotImplementedError("the fixture records raw measurements only")
+
+        client = self._client
+        headers = client._call("measurements")
+
+        rows = client._sensor_measurements(sensors_id, datetime_from)
+        start = (page - 1) * limit
+        return _response(_ns(rows[start:start + limit]), headers, found=len(rows))
+
+
+class _Locations(_Resource):
+    # filters the app never sends are accepted, as the SDK does, and ignored
+    def list(self, page=1, limit=100, radius=None, coordinates=None, bbox=None,
+             providers_id=None, countries_id=None, parameters_id=None,
+             licenses_id=None, instruments_id=None, manufacturers_id=None,
+             owners_id=None, iso=None, monitor=None, mobile=None,
+             order_by=None, sort_order=None):
+        client = self._client
+        headers = client._call("locations")
+
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            rows = [
+                loc for loc in client._visible
+                if min_lat <= loc["coordinates"]["latitude"] <= max_lat
+                and min_lon <= loc["coordinates"]["longitude"] <= max_lon
+            ]
+        else:
+            rows = client._locations_near(coordinates, radius)
+
+        start = (page - 1) * limit
+        return _response(_ns(rows[start:start + limit]), headers, found=len(rows))
+
+    def latest(self, locations_id):
+        client = self._client
+        headers = client._call("latest")
+
+        rows = []
+        for loc in client._visible:
+            if loc["id"] != locations_id:
+                continue
+            for sensor in loc["sensors"]:
+                history = client._sensor_measurements(sensor["id"], location=loc)
+                if history:
+                    newest = max(history, key=lambda m: m["period"]["datetimeTo"]["utc"])
+                    rows.append({
+                        "datetime": {"utc": newest["period"]["datetimeTo"]["utc"], "local": None},
+                        "value": newest["value"],
+                        "coordinates": newest["coordinates"],
+                        "sensorsId": sensor["id"],
+                        "locationsId": locations_id,
+                    })
+
+        return _response(_ns(rows), headers)
+
+
+class ReplayOpenAQ:
+    """
+    Replays a recorded fixture through the subset of the OpenAQ SDK that
+    the app calls. Timestamps are shifted so the newest recorded reading
+    is "now" when the stand-in is created.
+
+    Thread-safe; counts every call per endpoint in .calls.
+    """
+
+    def __init__(
+        self,
+        scenario: str = "normal",
+        fixture: dict | None = None,
+        seed: int = 0,
+        **overrides,
+    ):
+        settings = {**SCENARIOS[scenario], **overrides}
+        self.scenario = scenario
+        self.latency_ms = settings["latency_ms"]
+        self.jitter_ms = settings["jitter_ms"]
+        self.error_rate = settings["error_rate"]
+        self.coverage = settings["coverage"]
+        self.quota_per_minute = settings.get("quota_per_minute", 0)
+
+        fixture = fixture if fixture is not None else load_fixture(DEFAULT_FIXTURE)
+        self._shift = datetime.now(timezone.utc) - _utc(fixture["recorded_at"])
+        self._measurements = fixture["measurements"]
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self._window_started = time.monotonic()
+        self._window_used = 0
+
+        locations = [loc for loc in fixture["locations"] if loc.get("coordinates")]
+        keep = max(1, round(len(locations) * self.coverage))
+        self._visible = sorted(
+            self._rng.sample(locations, keep),
+            key=lambda loc: loc["id"],
+        )
+
+        self.measurements = _Measurements(self)
+        self.locations = _Locations(self)
+
+    def _quota(self):
+        """
+        x-ratelimit headers for one more request against a fixed one-minute
+        window, or None once the quota is used up. Caller holds the lock.
+        """
+
+        now = time.monotonic()
+        if now - self._window_started >= 60:
+            self._window_started = now
+            self._window_used = 0
+
+        reset = max(1, int(60 - (now - self._window_started)))
+        if self._window_used >= self.quota_per_minute:
+            return None
+
+        self._window_used += 1
+        return SimpleNamespace(
+            x_ratelimit_limit=self.quota_per_minute,
+            x_ratelimit_remaining=self.quota_per_minute - self._window_used,
+            x_ratelimit_used=self._window_used,
+            x_ratelimit_reset=reset,
+        )
+
+    def _call(self, endpoint: str):
+        """
+        Books one request: counts it, enforces the quota, then sleeps the
+        injected latency and maybe fails. Returns the response headers.
+        """
+
+        with self._lock:
+            self.calls[endpoint] += 1
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+
+            if self.quota_per_minute:
+                headers = self._quota()
+                if headers is None:
+                    self.calls["rejected_429"] += 1
+                    raise HTTPRateLimitError(f"replayed 429 ({self.scenario})")
+            else:
+                # the SDK reports absent headers as 0
+                headers = SimpleNamespace(
+                    x_ratelimit_limit=0,
+                    x_ratelimit_remaining=0,
+                    x_ratelimit_used=0,
+                    x_ratelimit_reset=0,
+                )
+
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise ServiceUnavailableError(f"replayed 503 ({self.scenario})")
+        return headers
+
+    def _locations_near(self, coordinates, radius_m) -> list:
+        lat, lon = coordinates
+        x, y = project_km(lat, lon, lat)
+
+        near = []
+        for loc in self._visible:
+            lx, ly = project_km(
+                loc["coordinates"]["latitude"], loc["coordinates"]["longitude"], lat
+            )
+            if hypot(lx - x, ly - y) * 1000 <= radius_m:
+                near.append(loc)
+        return near
+
+    def _sensor_measurements(self, sensor_id, datetime_from=None, location=None) -> list:
+        since = _utc(datetime_from) if isinstance(datetime_from, str) else datetime_from
+
+        rows = []
+        for m in self._measurements.get(str(sensor_id), ()):
+            dt_to = _utc(m["period"]["datetimeTo"]["utc"]) + self._shift
+            if since is not None and dt_to < since:
+                continue
+
+            rows.append({
+                **m,
+                "sensorsId": int(sensor_id),
+                "period": {
+                    "datetimeFrom": {
+                        "utc": _iso(_utc(m["period"]["datetimeFrom"]["utc"]) + self._shift),
+                    },
+                    "datetimeTo": {"utc": _iso(dt_to)},
+                },
+                "coordinates": m.get("coordinates")
+                or (location or {}).get("coordinates"),
+            })
+        return rows
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.calls)
+
+
+def install(client) -> object:
+    """
+    Makes client the OpenAQ client of openaq_point_service and drops the
+    sensor catalog so it is reloaded through the stand-in. Returns the
+    previous client, for uninstall().
+    """
+
+    previous = openaq_point_service._client
+    openaq_point_service._client = client
+    sensor_catalog._catalog = None
+    sensor_catalog._failed_at = 0.0
+    return previous
+
+
+def uninstall(previous):
+    openaq_point_service._client = previous
+    sensor_catalog._catalog = None
@@ -0,0 +1,296 @@
+# benchmarks/run.py
+#
+# Offline benchmarks of the AQI pipeline, driven by the recorded OpenAQ
+# fixture. No network access, no database writes.
+#
+#     python -m benchmarks.run                  # compare with baseline.json
+#     python -m benchmarks.run --save-baseline  # record a new baseline
+#     python -m benchmarks.run --quick --only pipeline
+#
+# Exits with status 1 when a case is slower than its baseline by more than
+# --threshold (default 25%) and by more than --noise-floor (default 50 µs
+# per call) in each of three runs. Each case is compared relative to a fixed calibration loop
+# timed right before it, so a machine that is busier or clocked lower than
+# when the baseline was recorded (or than a moment ago) does not read as a
+# regression.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from benchmarks.fixture import (  # noqa: E402
+    DEFAULT_FIXTURE,
+    fixture_readings,
+    load_fixture,
+    readings_by_location,
+    scaled_readings,
+)
+from dashboard.services import calculate_aqi  # noqa: E402
+from dashboard.services.area_service import _run_aqi_pipeline  # noqa: E402
+from dashboard.services.normalisation import normalize_window_averages  # noqa: E402
+from dashboard.services.reasoning import infer_pollution_reasons  # noqa: E402
+from dashboard.services.risk import calculate_pollution_risk  # noqa: E402
+from dashboard.services.rolling_window import (  # noqa: E402
+    WindowAggregator,
+    aggregator as window_aggregator,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+MEASUREMENT_SIZES = (1, 10, 100, 1000, 10000)
+POINT_SIZES = (1, 100, 1000, 10000)
+QUICK_LIMIT = 1000
+
+# each timed repeat runs for at least this long
+MIN_REPEAT_SECONDS = 0.2
+DEFAULT_REPEAT = 7
+CALIBRATION_REPEAT = 3
+# extra runs of a case that looks slower before it is flagged
+CONFIRM_RUNS = 2
+DEFAULT_THRESHOLD = 0.25
+# per-call differences below this are timer and scheduler noise, whatever
+# their percentage
+DEFAULT_NOISE_FLOOR_SECONDS = 50e-6
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def build_cases(fixture: dict, quick: bool) -> list:
+    """
+    [(name, size, setup, fn)]: setup() returns fn's arguments and is not
+    timed; size is the number of measurements or points per call.
+    """
+
+    readings = fixture_readings(fixture)
+    now = _timestamp(fixture["recorded_at"]) + 1
+    groups = readings_by_location(fixture, readings)
+
+    sample = normalize_window_averages(readings, WindowAggregator(), now)
+    aqi_result = calculate_aqi.calculate_overall_aqi(sample)
+    # the windows end at the recording time, not the wall clock; a pipeline
+    # that drops every reading would be timed doing nothing
+    window_aggregator.clear()
+    checked = _run_aqi_pipeline("bench", readings, now)
+    window_aggregator.clear()
+    if aqi_result["aqi"] is None or checked["aqi"]["aqi"] is None:
+        raise SystemExit("fixture yields no AQI at its recorded_at; nothing to benchmark")
+
+    measurement_sizes = [s for s in MEASUREMENT_SIZES if not quick or s <= QUICK_LIMIT]
+    point_sizes = [s for s in POINT_SIZES if not quick or s <= QUICK_LIMIT]
+
+    cases = [
+        ("aqi", 1, lambda: (sample,), calculate_aqi.calculate_overall_aqi),
+        ("reasons", 1, lambda: (sample,), infer_pollution_reasons),
+        ("risk", 1, lambda: (aqi_result, sample), calculate_pollution_risk),
+    ]
+
+    for size in measurement_sizes:
+        scaled = scaled_readings(readings, size)
+
+        cases.append((
+            "normalize", size,
+            lambda scaled=scaled: (scaled, WindowAggregator(), now),
+            normalize_window_averages,
+        ))
+
+        def pipeline_setup(scaled=scaled):
+            window_aggregator.clear()
+            return ("bench", scaled, now)
+
+        cases.append(("pipeline", size, pipeline_setup, _run_aqi_pipeline))
+
+    for size in point_sizes:
+        points = [groups[i % len(groups)] for i in range(size)]
+
+        def points_setup(points=points):
+            window_aggregator.clear()
+            return (points,)
+
+        def run_points(points):
+            for group in points:
+                _run_aqi_pipeline("bench", group, now)
+
+        cases.append(("points_pipeline", size, points_setup, run_points))
+
+        if calculate_aqi.np is not None:
+            per_point = [
+                normalize_window_averages(points[i], WindowAggregator(), now)
+                for i in range(min(size, len(groups)))
+            ]
+            columns = {
+                p: calculate_aqi.np.array(
+                    [per_point[i % len(per_point)].get(p, float("nan")) for i in range(size)]
+                )
+                for p in calculate_aqi.SUPPORTED_POLLUTANTS
+            }
+            cases.append((
+                "points_aqi_batch", size,
+                lambda columns=columns: (columns,),
+                calculate_aqi.calculate_overall_aqi_batch,
+            ))
+
+    return cases
+
+
+def measure(setup, fn, repeat: int) -> float:
+    """
+    Best mean seconds per call over repeat runs.
+    """
+
+    args = setup()
+    started = time.perf_counter()
+    fn(*args)
+    once = max(time.perf_counter() - started, 1e-7)
+    number = max(1, int(MIN_REPEAT_SECONDS / once))
+
+    best = float("inf")
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(number):
+            args = setup()
+            started = time.perf_counter()
+            fn(*args)
+            total += time.perf_counter() - started
+        best = min(best, total / number)
+
+    return best
+
+
+def _calibration_work():
+    # plain dict, float and sort work, like the pipeline's hot loops
+    totals = {}
+    for i in range(20000):
+        key = i % 97
+        totals[key] = totals.get(key, 0.0) + i * 0.5
+    return sorted(totals.values())
+
+
+def calibrate(repeat: int) -> float:
+    """
+    Seconds per call of a fixed reference workload on this machine now.
+    """
+
+    return measure(lambda: (), _calibration_work, repeat)
+
+
+def case_id(name: str, size: int) -> str:
+    return f"{name}[{size}]"
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "numpy": getattr(calculate_aqi.np, "__version__", None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline AQI pipeline benchmarks.")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--quick", action="store_true", help=f"Sizes up to {QUICK_LIMIT} only.")
+    parser.add_argument("--only", help="Run cases whose name contains this.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--noise-floor", type=float, default=DEFAULT_NOISE_FLOOR_SECONDS,
+                        help="Ignore per-call differences below this many seconds.")
+    args = parser.parse_args()
+
+    fixture = load_fixture(args.fixture)
+    baseline = load_baseline(args.baseline)
+    baseline_results = baseline.get("results", {})
+
+    if baseline and baseline.get("environment") != environment():
+        print("warning: baseline was recorded on a different environment; "
+              "compare with care", file=sys.stderr)
+
+    baseline_calibration = baseline.get("calibration", {})
+
+    results = {}
+    calibration = {}
+    regressions = []
+
+    print(f"{'case':<28}{'per call':>14}{'items/s':>14}{'baseline':>14}{'change':>10}")
+    for name, size, setup, fn in build_cases(fixture, args.quick):
+        if args.only and args.only not in name:
+            continue
+
+        key = case_id(name, size)
+        base = baseline_results.get(key)
+        change = ""
+        flag = ""
+
+        # a case that looks slower is measured again: noise rarely repeats,
+        # a real regression does
+        for _ in range(1 + CONFIRM_RUNS):
+            calibration[key] = calibrate(CALIBRATION_REPEAT)
+            seconds = measure(setup, fn, args.repeat)
+            if not base:
+                break
+
+            # the baseline at this machine's speed right now; a baseline
+            # without a calibration compares as recorded
+            expected = base * calibration[key] / baseline_calibration.get(key, calibration[key])
+            ratio = seconds / expected - 1
+            if ratio <= args.threshold or seconds - expected <= args.noise_floor:
+                break
+
+        results[key] = seconds
+        if base:
+            base = expected
+            change = f"{ratio:+.0%}"
+            if ratio > args.threshold and seconds - base > args.noise_floor:
+                flag = "  REGRESSION"
+                regressions.append(key)
+
+        print(
+            f"{key:<28}{seconds * 1e3:>11.4f} ms{size / seconds:>14,.0f}"
+            f"{(f'{base * 1e3:.4f} ms' if base else '-'):>14}{change:>10}{flag}"
+        )
+
+    if args.save_baseline:
+        partial = args.only or args.quick
+        merged = {**baseline_results, **results} if partial else results
+        merged_calibration = {**baseline_calibration, **calibration} if partial else calibration
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "environment": environment(),
+                "fixture": os.path.basename(args.fixture),
+                "calibration": dict(sorted(merged_calibration.items())),
+                "results": dict(sorted(merged.items())),
+            }, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: "
+              + ", ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# benchmarks/serve.py
+#
+# The app wired to the OpenAQ replay stand-in and the stub chatbot
+# backend, for load tests against a real server:
+#
+#     python -m benchmarks.serve [--scenario sparse] [--port 8000]
+#     REPLAY_SCENARIO=slow gunicorn -w 4 benchmarks.serve:application
+
+import argparse
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("CHATBOT_BACKEND", "stub")
+
+application = get_wsgi_application()
+
+from benchmarks.replay import SCENARIOS, ReplayOpenAQ, install  # noqa: E402
+
+install(ReplayOpenAQ(os.getenv("REPLAY_SCENARIO", "normal")))
+
+
+def main():
+    from django.core.management import call_command
+
+    parser = argparse.ArgumentParser(description="Run the app against replayed OpenAQ data.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.scenario:
+        install(ReplayOpenAQ(args.scenario))
+
+    # the reloader would start a fresh process without the stand-in
+    call_command("runserver", f"{args.host}:{args.port}", use_reloader=False)
+
+
+if __name__ == "__main__":
+    main()
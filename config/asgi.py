@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# started here rather than in AppConfig.ready() so that only servers run
+# it, never migrate, test, shell or other management commands
+from dashboard.services.prefetch import start_in_process_prefetch  # noqa: E402
+
+start_in_process_prefetch()
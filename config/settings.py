@@ -11,11 +11,17 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 from os import getenv
 load_dotenv()
 OPENAQ_API_KEY = getenv('OPENAQ_API_KEY')
 
+# run the AREAS prefetch scheduler inside each web worker (started by
+# config/wsgi.py and config/asgi.py) instead of `manage.py prefetch_areas`,
+# which needs a shared AQI_CACHE_STORE
+AQI_PREFETCH_IN_PROCESS = getenv('AQI_PREFETCH_IN_PROCESS', '0') == '1'
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,12 +48,16 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'dashboard',
-    'rest-framework'
+    'rest_framework'
 
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # compression: brotli when the client and the optional package allow
+    # it, gzip otherwise; streaming (SSE) responses are left uncompressed
+    'dashboard.middleware.GZipMiddleware',
+    'dashboard.middleware.BrotliMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,6 +97,56 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# AQI_CACHE_STORE picks where AQI results live:
+#   memory  - bounded LRU inside each process (default)
+#   locmem  - Django's per-process cache
+#   file    - files under AQI_CACHE_DIR, shared by all workers on a node
+#   sqlite  - table in the default database (run `manage.py createcachetable`)
+#   redis   - any Redis-protocol server at REDIS_URL, shared across nodes
+
+AQI_CACHE_STORE = getenv('AQI_CACHE_STORE', 'memory')
+AQI_CACHE_ALIAS = 'aqi'
+
+_AQI_CACHE_STORES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'aqi',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': getenv('AQI_CACHE_DIR', str(BASE_DIR / '.aqi_cache')),
+    },
+    'sqlite': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'aqi_cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': getenv('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+if AQI_CACHE_STORE != 'memory':
+    if AQI_CACHE_STORE not in _AQI_CACHE_STORES:
+        raise ImproperlyConfigured(
+            f"AQI_CACHE_STORE={AQI_CACHE_STORE!r}; expected one of "
+            + ", ".join(['memory', *_AQI_CACHE_STORES])
+        )
+    CACHES[AQI_CACHE_ALIAS] = {
+        **_AQI_CACHE_STORES[AQI_CACHE_STORE],
+        'KEY_PREFIX': 'aqi',
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -18,7 +18,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from dashboard.views import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("dashboard.urls")),
+    # Prometheus' default scrape path
+    path("metrics", metrics_view),
 ]
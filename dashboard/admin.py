@@ -1,3 +1,9 @@
 from django.contrib import admin
 
-# Register your models here.
+from dashboard.models import Measurement
+
+
+@admin.register(Measurement)
+class MeasurementAdmin(admin.ModelAdmin):
+    list_display = ("sensor_id", "parameter", "timestamp", "value")
+    list_filter = ("parameter",)
@@ -0,0 +1,95 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_MODULES = [
+    "dashboard.services.area_service",
+    "dashboard.services.aqi_grid",
+    "dashboard.services.cache",
+    "dashboard.services.calculate_aqi",
+    "dashboard.services.chatbot_service",
+    "dashboard.services.measurement_store",
+    "dashboard.services.normalisation",
+    "dashboard.services.openaq_async_service",
+    "dashboard.services.openaq_point_service",
+    "dashboard.services.prefetch",
+    "dashboard.services.sensor_catalog",
+    "dashboard.views",
+    "dashboard.urls",
+]
+
+# everything before this line on stderr is Django's own setup
+_MARKER = "--import-times--"
+# "import time:       356 |      95805 | openaq"
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure_import(module: str) -> tuple:
+    """
+    Cold import of one module in a fresh interpreter, after django.setup().
+
+    Returns (total_ms, [(dependency, ms), ...]) with the module's direct
+    imports, slowest first.
+    """
+
+    code = (
+        "import sys, django; django.setup(); "
+        f"sys.stderr.write({_MARKER!r} + '\\n'); import {module}"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=os.environ.copy(),
+    )
+    if proc.returncode != 0:
+        raise CommandError(f"import of {module} failed:\n{proc.stderr[-2000:]}")
+
+    lines = proc.stderr.split(_MARKER, 1)[1].splitlines()
+
+    total_us = 0
+    children = []
+    for line in lines:
+        match = _LINE.match(line)
+        if not match:
+            continue
+
+        _, cumulative, indent, name = match.groups()
+        depth = len(indent) // 2
+        if depth == 0:
+            total_us += int(cumulative)
+        elif depth == 1:
+            children.append((name, int(cumulative) / 1000))
+
+    children.sort(key=lambda c: c[1], reverse=True)
+    return total_us / 1000, children
+
+
+class Command(BaseCommand):
+    help = "Measures the cold import time of each module in a fresh interpreter."
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per module; the fastest is reported.",
+        )
+        parser.add_argument("--top", type=int, default=3, help="Slowest imports listed per module.")
+
+    def handle(self, *args, **options):
+        results = []
+        for module in options["modules"]:
+            runs = [measure_import(module) for _ in range(max(options["repeat"], 1))]
+            results.append((module, *min(runs, key=lambda r: r[0])))
+
+        results.sort(key=lambda r: r[1], reverse=True)
+        for module, total_ms, children in results:
+            heaviest = ", ".join(
+                f"{name} {ms:.1f}" for name, ms in children[:options["top"]]
+            )
+            self.stdout.write(f"{total_ms:8.1f} ms  {module}  ({heaviest})")
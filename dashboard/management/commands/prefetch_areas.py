@@ -0,0 +1,55 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.services.cache import SHARED_STORES, is_shared_store
+from dashboard.services.prefetch import (
+    PREFETCH_JITTER_SECONDS,
+    PREFETCH_LEAD_SECONDS,
+    PREFETCH_MAX_WORKERS,
+    refresh_all_areas,
+    run_prefetch_loop,
+)
+
+
+class Command(BaseCommand):
+    help = "Keeps the AQI of every area in AREAS warm in the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Refresh every area once and exit.",
+        )
+        parser.add_argument("--workers", type=int, default=PREFETCH_MAX_WORKERS)
+        parser.add_argument("--lead", type=int, default=PREFETCH_LEAD_SECONDS)
+        parser.add_argument("--jitter", type=int, default=PREFETCH_JITTER_SECONDS)
+
+    def handle(self, *args, **options):
+        if not is_shared_store():
+            # the results would land in this command's own cache and be
+            # thrown away on exit, warming nothing the web workers read
+            raise CommandError(
+                f"AQI_CACHE_STORE={settings.AQI_CACHE_STORE!r} is per-process; "
+                f"prefetch_areas needs a shared store ({', '.join(SHARED_STORES)}). "
+                "Use AQI_PREFETCH_IN_PROCESS=1 to warm each worker's own cache."
+            )
+
+        if options["once"]:
+            statuses = refresh_all_areas(max_workers=options["workers"])
+            for area_id, status in statuses.items():
+                self.stdout.write(f"{area_id}: {status}")
+            return
+
+        self.stdout.write("Prefetching areas, Ctrl+C to stop")
+        stop_event = threading.Event()
+        try:
+            run_prefetch_loop(
+                stop_event,
+                lead_seconds=options["lead"],
+                jitter_seconds=options["jitter"],
+                max_workers=options["workers"],
+            )
+        except KeyboardInterrupt:
+            stop_event.set()
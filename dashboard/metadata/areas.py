@@ -1,5 +1,8 @@
 # dashboard/metadata/areas.py
 
+# (min_lon, min_lat, max_lon, max_lat) covering Delhi NCT
+DELHI_BBOX = (76.8, 28.4, 77.4, 28.9)
+
 AREAS = {
     "central_delhi": {
         "name": "Central Delhi",
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Measurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sensor_id', models.BigIntegerField()),
+                ('parameter', models.CharField(max_length=32)),
+                ('timestamp', models.DateTimeField()),
+                ('value', models.FloatField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['parameter', 'timestamp'], name='measurement_param_time_idx')],
+                'constraints': [models.UniqueConstraint(fields=('sensor_id', 'parameter', 'timestamp'), name='unique_sensor_parameter_timestamp')],
+            },
+        ),
+    ]
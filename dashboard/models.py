@@ -1,3 +1,31 @@
 from django.db import models
 
-# Create your models here.
+
+class Measurement(models.Model):
+    """
+    One raw OpenAQ reading, kept for history and trend queries.
+    """
+
+    sensor_id = models.BigIntegerField()
+    parameter = models.CharField(max_length=32)
+    timestamp = models.DateTimeField()
+    value = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # also the composite (sensor, parameter, time) index used by
+            # per-sensor history queries and by bulk upserts
+            models.UniqueConstraint(
+                fields=["sensor_id", "parameter", "timestamp"],
+                name="unique_sensor_parameter_timestamp",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["parameter", "timestamp"],
+                name="measurement_param_time_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sensor_id} {self.parameter} {self.timestamp:%Y-%m-%d %H:%M} = {self.value}"
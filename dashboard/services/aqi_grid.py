@@ -0,0 +1,349 @@
+# dashboard/services/aqi_grid.py
+#
+# City-wide AQI grid: the CPCB window average (24 h, 8 h for CO/O3) of
+# every catalogued sensor is spread over ~250 m cells with
+# inverse-distance weighting, then scored in one vectorized AQI pass. The
+# averages are the ones point lookups score, so a cell and a point lookup
+# on the same spot agree. Heatmaps and arbitrary point lookups become
+# array indexing instead of OpenAQ calls.
+
+import logging
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from .cache import CACHE_TTL_SECONDS
+from .calculate_aqi import SUPPORTED_POLLUTANTS, calculate_overall_aqi_batch
+from .geo import METRES_PER_DEGREE, project_km
+from .openaq_point_service import fetch_latest_by_locations
+from .openaq_scheduler import BACKFILL, request_priority
+from .measurement_store import seed_windows, store_readings
+from .rolling_window import aggregator as window_aggregator
+from .sensor_catalog import get_catalog
+from dashboard.metadata.areas import DELHI_BBOX
+
+logger = logging.getLogger(__name__)
+
+GRID_CELL_SIZE_M = 250
+IDW_POWER = 2
+# cells farther than this from every sensor of a pollutant get no value
+IDW_MAX_DISTANCE_KM = 25
+# rows interpolated per chunk; bounds the (cells x sensors) distance matrix
+IDW_CHUNK_ROWS = 32
+
+# no-data marker in the binary tile format
+NO_DATA = 0xFFFF
+
+# after a failed build, wait this long before trying again
+GRID_RETRY_SECONDS = 60
+
+
+def idw_interpolate(
+    sensor_xy: np.ndarray,
+    sensor_values: np.ndarray,
+    cell_xy: np.ndarray,
+    power: float = IDW_POWER,
+    max_distance_km: float = IDW_MAX_DISTANCE_KM,
+) -> np.ndarray:
+    """
+    Inverse-distance-weighted value at every cell.
+
+    sensor_xy (n, 2) and cell_xy (m, 2) are projected kilometres. A cell on
+    top of a sensor takes that sensor's value; cells out of range are NaN.
+    """
+
+    diff = cell_xy[:, None, :] - sensor_xy[None, :, :]
+    dist = np.sqrt((diff ** 2).sum(axis=2))
+
+    in_range = dist <= max_distance_km
+    with np.errstate(divide="ignore"):
+        weights = np.where(in_range, 1.0 / dist ** power, 0.0)
+
+    exact = dist < 1e-9
+    weights = np.where(exact.any(axis=1)[:, None], exact.astype(float), weights)
+
+    total = weights.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        values = (weights @ sensor_values) / total
+
+    return np.where(total > 0, values, np.nan)
+
+
+class AqiGrid:
+    """
+    Immutable snapshot of the interpolated city grid (row 0 = south edge).
+    """
+
+    def __init__(self, bbox: tuple, cell_size_m: int, pollutants: Dict[str, np.ndarray],
+                 scored: dict, built_at: float, sensor_count: int):
+        self.bbox = bbox
+        self.cell_size_m = cell_size_m
+        self.lat_step, self.lon_step = _grid_steps(bbox, cell_size_m)
+        self.rows, self.cols = _grid_shape(bbox, self.lat_step, self.lon_step)
+
+        self.pollutants = pollutants
+        self.aqi = scored["aqi"].reshape(self.rows, self.cols)
+        self.category = scored["category"].reshape(self.rows, self.cols)
+        self.dominant_pollutant = scored["dominant_pollutant"].reshape(self.rows, self.cols)
+
+        self.built_at = built_at
+        self.sensor_count = sensor_count
+
+    def cell_of(self, lat: float, lon: float) -> Optional[tuple]:
+        min_lon, min_lat, _, _ = self.bbox
+        row = math.floor((lat - min_lat) / self.lat_step)
+        col = math.floor((lon - min_lon) / self.lon_step)
+
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return row, col
+        return None
+
+    def lookup(self, lat: float, lon: float) -> Optional[dict]:
+        cell = self.cell_of(lat, lon)
+        if cell is None:
+            return None
+
+        aqi = self.aqi[cell]
+        if np.isnan(aqi):
+            return {"status": "no_data", "cell": list(cell)}
+
+        return {
+            "cell": list(cell),
+            "aqi": {
+                "aqi": int(aqi),
+                "category": self.category[cell],
+                "dominant_pollutant": self.dominant_pollutant[cell],
+            },
+            "pollutants": {
+                p: round(float(values[cell]), 1)
+                for p, values in self.pollutants.items()
+                if not np.isnan(values[cell])
+            },
+        }
+
+    def window(self, bbox: Optional[tuple] = None):
+        """
+        (row_slice, col_slice) covering bbox, clipped to the grid.
+        """
+
+        if bbox is None:
+            return slice(0, self.rows), slice(0, self.cols)
+
+        min_lon, min_lat, max_lon, max_lat = bbox
+        g_min_lon, g_min_lat, _, _ = self.bbox
+
+        row0 = max(math.floor((min_lat - g_min_lat) / self.lat_step), 0)
+        row1 = min(math.ceil((max_lat - g_min_lat) / self.lat_step), self.rows)
+        col0 = max(math.floor((min_lon - g_min_lon) / self.lon_step), 0)
+        col1 = min(math.ceil((max_lon - g_min_lon) / self.lon_step), self.cols)
+
+        return slice(row0, max(row1, row0)), slice(col0, max(col1, col0))
+
+    def tile_bytes(self, bbox: Optional[tuple] = None) -> tuple:
+        """
+        Returns ((rows, cols, row0, col0), payload): AQI as little-endian
+        uint16, row-major, NO_DATA where unknown.
+        """
+
+        rows, cols = self.window(bbox)
+        tile = self.aqi[rows, cols]
+        packed = np.where(np.isnan(tile), NO_DATA, tile).astype("<u2")
+
+        return (tile.shape[0], tile.shape[1], rows.start, cols.start), packed.tobytes()
+
+    def tile_json(self, bbox: Optional[tuple] = None) -> dict:
+        rows, cols = self.window(bbox)
+        tile = self.aqi[rows, cols]
+
+        return {
+            "bbox": list(self.bbox),
+            "cell_size_m": self.cell_size_m,
+            "lat_step": self.lat_step,
+            "lon_step": self.lon_step,
+            "row0": rows.start,
+            "col0": cols.start,
+            "rows": tile.shape[0],
+            "cols": tile.shape[1],
+            "built_at": self.built_at,
+            "sensor_count": self.sensor_count,
+            # row-major, null where no sensor is in range
+            "aqi": [None if np.isnan(v) else int(v) for v in tile.ravel()],
+        }
+
+
+def _grid_steps(bbox: tuple, cell_size_m: int) -> tuple:
+    ref_lat = (bbox[1] + bbox[3]) / 2
+    lat_step = cell_size_m / METRES_PER_DEGREE
+    lon_step = lat_step / math.cos(math.radians(ref_lat))
+    return lat_step, lon_step
+
+
+def _grid_shape(bbox: tuple, lat_step: float, lon_step: float) -> tuple:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return (
+        math.ceil((max_lat - min_lat) / lat_step),
+        math.ceil((max_lon - min_lon) / lon_step),
+    )
+
+
+def build_grid(
+    readings: list,
+    bbox: tuple = DELHI_BBOX,
+    cell_size_m: int = GRID_CELL_SIZE_M,
+) -> AqiGrid:
+    """
+    Interpolates readings over the grid and scores every cell.
+
+    readings: [{"lat", "lon", "parameter", "value"}, ...]
+    """
+
+    min_lon, min_lat, _, _ = bbox
+    ref_lat = (bbox[1] + bbox[3]) / 2
+    lat_step, lon_step = _grid_steps(bbox, cell_size_m)
+    rows, cols = _grid_shape(bbox, lat_step, lon_step)
+
+    lats = min_lat + (np.arange(rows) + 0.5) * lat_step
+    lons = min_lon + (np.arange(cols) + 0.5) * lon_step
+    cell_x, _ = project_km(0.0, lons, ref_lat)
+    _, cell_y = project_km(lats, 0.0, ref_lat)
+
+    by_pollutant = {}
+    for r in readings:
+        if r["parameter"] in SUPPORTED_POLLUTANTS:
+            by_pollutant.setdefault(r["parameter"], []).append(r)
+
+    pollutants = {}
+    for parameter, items in by_pollutant.items():
+        sensor_xy = np.array([project_km(r["lat"], r["lon"], ref_lat) for r in items])
+        sensor_values = np.array([r["value"] for r in items], dtype=float)
+
+        grid = np.empty((rows, cols))
+        for start in range(0, rows, IDW_CHUNK_ROWS):
+            chunk_y = cell_y[start:start + IDW_CHUNK_ROWS]
+            xx, yy = np.meshgrid(cell_x, chunk_y)
+            cell_xy = np.column_stack([xx.ravel(), yy.ravel()])
+            grid[start:start + len(chunk_y)] = idw_interpolate(
+                sensor_xy, sensor_values, cell_xy
+            ).reshape(len(chunk_y), cols)
+
+        pollutants[parameter] = grid
+
+    scored = calculate_overall_aqi_batch(
+        {p: values.ravel() for p, values in pollutants.items()}
+        or {"pm25": np.full(rows * cols, np.nan)}
+    )
+
+    return AqiGrid(
+        bbox=bbox,
+        cell_size_m=cell_size_m,
+        pollutants=pollutants,
+        scored=scored,
+        built_at=time.time(),
+        sensor_count=len(readings),
+    )
+
+
+def sensor_averages(locations: list, readings: list, aggregator=window_aggregator,
+                    now: Optional[float] = None) -> list:
+    """
+    Window average of every sensor that has a fresh reading, with its
+    coordinates: [{"lat", "lon", "parameter", "value"}, ...].
+
+    readings are fed into the rolling windows first, after seeding them
+    from the measurement store, as the point lookups do.
+    """
+
+    seed_windows([s for loc in locations for s in loc["sensors"]], aggregator)
+    aggregator.ingest(readings)
+    now = time.time() if now is None else now
+
+    fresh = {(r["sensor_id"], r["parameter"]) for r in readings}
+    averages = []
+    for loc in locations:
+        for sensor in loc["sensors"]:
+            key = (sensor["sensor_id"], sensor["parameter"])
+            mean = aggregator.sensor_mean(*key, now) if key in fresh else None
+            if mean is not None:
+                averages.append({
+                    "lat": loc["lat"],
+                    "lon": loc["lon"],
+                    "parameter": sensor["parameter"],
+                    "value": mean,
+                })
+
+    return averages
+
+
+def fetch_grid_readings() -> tuple:
+    """
+    Window averages of every sensor in the catalog, read with one latest
+    call per location.
+
+    Returns (averages, raw): averages feed build_grid, raw is every
+    fetched reading for the measurement store.
+    """
+
+    # the grid builds in the background, so it can wait for the catalog
+    catalog = get_catalog(wait=True)
+    if catalog is None:
+        raise RuntimeError("sensor catalog unavailable")
+
+    raw = fetch_latest_by_locations(catalog.locations, used_radius_km=0)["readings"]
+    return sensor_averages(catalog.locations, raw), raw
+
+
+_grid: Optional[AqiGrid] = None
+_build_lock = threading.Lock()
+_failed_at = 0.0
+
+
+def refresh_grid() -> AqiGrid:
+    global _grid
+
+    latest, raw = fetch_grid_readings()
+    grid = build_grid(latest)
+    store_readings(raw)
+    _grid = grid
+    logger.info("aqi grid built: %dx%d from %d readings",
+                grid.rows, grid.cols, grid.sensor_count)
+    return grid
+
+
+def _refresh_in_background():
+    if not _build_lock.acquire(blocking=False):
+        return  # a rebuild is already running
+
+    def run():
+        global _failed_at
+        try:
+            # one call per catalogued location: must not starve user lookups
+            with request_priority(BACKFILL):
+                refresh_grid()
+        except Exception:
+            _failed_at = time.time()
+            logger.exception("aqi grid rebuild failed")
+        finally:
+            _build_lock.release()
+
+    threading.Thread(target=run, name="aqi-grid-refresh", daemon=True).start()
+
+
+def get_grid() -> Optional[AqiGrid]:
+    """
+    Current grid, or None until the first build has finished. Builds run
+    in the background at backfill priority: on first use, once the grid is
+    older than the AQI cache TTL, and GRID_RETRY_SECONDS after a failure.
+    A failed rebuild keeps the previous grid.
+    """
+
+    grid = _grid
+    if time.time() - _failed_at < GRID_RETRY_SECONDS:
+        return grid
+
+    if grid is None or time.time() - grid.built_at > CACHE_TTL_SECONDS:
+        _refresh_in_background()
+
+    return grid
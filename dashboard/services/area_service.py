@@ -1,30 +1,176 @@
-from .cache import get_cached, set_cache
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import (
+    CACHE_HARD_TTL_SECONDS,
+    CACHE_TTL_SECONDS,
+    aget_cached,
+    aget_cached_entry,
+    aset_cache,
+    get_cached,
+    get_cached_entry,
+    set_cache,
+)
 from .normalisation import normalize_pollutants
 from .calculate_aqi import calculate_overall_aqi
 from .reasoning import infer_pollution_reasons
 from .risk import calculate_pollution_risk
+from .geo import grid_cell_key
+from .circuit_breaker import openaq_breaker
+from .metrics import CACHE_LOOKUPS, DEGRADED_RESPONSES, PIPELINE_STAGE_SECONDS, timed
+from .singleflight import SingleFlight
+from .measurement_store import store_readings_safely
 
-from services.openaq_point_service import fetch_measurements_by_point
+from .openaq_point_service import (
+    fetch_measurements_by_locations,
+    fetch_measurements_by_point,
+)
+from .openaq_scheduler import REFRESH, request_priority
+from .sensor_catalog import nearest_locations
+from .openaq_async_service import (
+    afetch_measurements_by_locations,
+    afetch_measurements_by_point,
+)
 from dashboard.metadata.areas import get_area_metadata
 
+logger = logging.getLogger(__name__)
+
+# sensor coverage changes far less often than readings, so the radius a
+# cell resolved to is remembered longer than the AQI response itself
+RADIUS_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_START_RADIUS_KM = 5
+RADIUS_STEP_KM = 5
+MAX_RADIUS_KM = 25
+# upper bound on simultaneous cache-miss fetches for one batch request
+BATCH_MAX_WORKERS = 8
+
+# upper bound on simultaneous background refreshes of stale cells
+REVALIDATE_MAX_WORKERS = 4
+
+# a cell without any sensor in range is remembered briefly, so repeated
+# lookups there do not hit OpenAQ every time
+NO_DATA_TTL_SECONDS = int(os.getenv("AQI_NO_DATA_TTL_SECONDS", "300"))
+
+# a cell's last good response outlives the hard TTL, so a failed fetch
+# (OpenAQ down, circuit open) can still be answered, marked degraded
+LAST_GOOD_TTL_SECONDS = int(os.getenv("AQI_LAST_GOOD_TTL_SECONDS", str(24 * 60 * 60)))
+
+# concurrent misses on one cell share a single fetch
+_point_flight = SingleFlight()
 
-def _fetch_raw_measurements_from_point(lat: float, lon: float):
+# cells with a background refresh queued or running
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+_revalidate_executor = ThreadPoolExecutor(
+    max_workers=REVALIDATE_MAX_WORKERS,
+    thread_name_prefix="aqi-revalidate",
+)
+
+
+def _store_in_background(readings: list):
+    # the database write is kept off the request path; store_readings_safely
+    # logs a failure instead of raising
+    if readings:
+        _revalidate_executor.submit(store_readings_safely, readings)
+
+
+def _radius_step_for(distance_km: float) -> int:
+    """
+    Smallest radius step that covers distance_km, so catalog lookups
+    report used_radius_km on the same scale as the radius search.
+    """
+
+    steps = max(math.ceil(distance_km / RADIUS_STEP_KM), 1)
+    return steps * RADIUS_STEP_KM
+
+
+def _fetch_raw_measurements_from_point(
+    lat: float,
+    lon: float,
+    radius_km: int = DEFAULT_START_RADIUS_KM,
+    concurrent: bool = False,
+):
     """
     Fetch OpenAQ data using point + progressive radius
     and adapt it to AQI pipeline format.
+
+    The local sensor catalog is tried first: when it knows locations within
+    MAX_RADIUS_KM, those inside the first RADIUS_STEP_KM step that reaches
+    any of them are read directly (latest values in the default "latest"
+    fetch mode) and the radius search is skipped. Until the catalog has
+    loaded in the background every point takes the radius search.
     """
 
-    result = fetch_measurements_by_point(lat=lat, lon=lon)
+    with timed(PIPELINE_STAGE_SECONDS, stage="catalog_lookup"):
+        nearest = nearest_locations(
+            lat, lon, max_distance_km=MAX_RADIUS_KM, step_km=RADIUS_STEP_KM
+        )
 
-    pollutants = result["pollutants"]
-    raw_measurements = []
+    if nearest:
+        locations, farthest_km = nearest
+        with timed(PIPELINE_STAGE_SECONDS, stage="sensor_fetch"):
+            result = fetch_measurements_by_locations(
+                locations, used_radius_km=_radius_step_for(farthest_km)
+            )
+        _store_in_background(result["readings"])
+        if result["sensor_count"]:
+            return _adapt_point_result(result)
 
-    for parameter, values in pollutants.items():
-        for value in values:
-            raw_measurements.append({
-                "parameter": parameter,
-                "value": value
-            })
+    with timed(PIPELINE_STAGE_SECONDS, stage="radius_search"):
+        result = fetch_measurements_by_point(
+            lat=lat,
+            lon=lon,
+            radius_km=radius_km,
+            concurrent=concurrent,
+        )
+
+    return _adapt_point_result(result)
+
+
+async def _afetch_raw_measurements_from_point(
+    lat: float,
+    lon: float,
+    radius_km: int = DEFAULT_START_RADIUS_KM,
+    concurrent: bool = False,
+):
+    """
+    Async _fetch_raw_measurements_from_point.
+    """
+
+    with timed(PIPELINE_STAGE_SECONDS, stage="catalog_lookup"):
+        nearest = nearest_locations(
+            lat, lon, max_distance_km=MAX_RADIUS_KM, step_km=RADIUS_STEP_KM
+        )
+
+    if nearest:
+        locations, farthest_km = nearest
+        with timed(PIPELINE_STAGE_SECONDS, stage="sensor_fetch"):
+            result = await afetch_measurements_by_locations(
+                locations, used_radius_km=_radius_step_for(farthest_km)
+            )
+        _store_in_background(result["readings"])
+        if result["sensor_count"]:
+            return _adapt_point_result(result)
+
+    with timed(PIPELINE_STAGE_SECONDS, stage="radius_search"):
+        result = await afetch_measurements_by_point(
+            lat=lat,
+            lon=lon,
+            radius_km=radius_km,
+            concurrent=concurrent,
+        )
+
+    return _adapt_point_result(result)
+
+
+def _adapt_point_result(result: dict):
+    # every fetcher returns cleaned readings that keep sensor and time, so
+    # normalize_pollutants applies CPCB window averages
+    raw_measurements = result["readings"]
 
     meta = {
         "used_radius_km": result["used_radius_km"],
@@ -34,15 +180,20 @@ def _fetch_raw_measurements_from_point(lat: float, lon: float):
     return raw_measurements, meta
 
 
-def _run_aqi_pipeline(area_id: str, raw_measurements: list) -> dict:
+def _run_aqi_pipeline(area_id: str, raw_measurements: list, now: float | None = None) -> dict:
     """
-    Pure AQI pipeline. No fetching, no caching.
+    Pure AQI pipeline. No fetching, no caching. now (default: the current
+    time) is where the averaging windows end.
     """
 
-    pollutants = normalize_pollutants(raw_measurements)
-    aqi_result = calculate_overall_aqi(pollutants)
-    reasons = infer_pollution_reasons(pollutants)
-    risk = calculate_pollution_risk(aqi_result, pollutants)
+    with timed(PIPELINE_STAGE_SECONDS, stage="normalize"):
+        pollutants = normalize_pollutants(raw_measurements, now=now)
+    with timed(PIPELINE_STAGE_SECONDS, stage="aqi"):
+        aqi_result = calculate_overall_aqi(pollutants)
+    with timed(PIPELINE_STAGE_SECONDS, stage="reasons"):
+        reasons = infer_pollution_reasons(pollutants)
+    with timed(PIPELINE_STAGE_SECONDS, stage="risk"):
+        risk = calculate_pollution_risk(aqi_result, pollutants)
 
     return {
         "area_id": area_id,
@@ -53,13 +204,40 @@ def _run_aqi_pipeline(area_id: str, raw_measurements: list) -> dict:
     }
 
 
-def get_point_air_quality(lat: float, lon: float, area_id: str | None = None) -> dict:
+def _point_cache_keys(lat: float, lon: float):
+    cell = grid_cell_key(lat, lon)
+    return f"point:{cell}", f"radius:{cell}"
+
+
+def _last_good_key(cache_key: str) -> str:
+    return f"lastgood:{cache_key}"
+
+
+def _start_radius(radius_key: str):
     """
-    Canonical AQI entrypoint for any location.
+    Returns (start_radius_km, probe_concurrently) for a cell.
+
+    A cell with no radius record yet probes every radius at once; a known
+    cell almost always answers at its recorded radius, so a single
+    sequential call is cheaper on quota. Only the "measurements" fetch
+    mode probes radii; "latest" searches the largest one in one query.
     """
 
-    raw_measurements, meta = _fetch_raw_measurements_from_point(lat, lon)
+    return _start_radius_from(get_cached(radius_key))
+
+
+async def _astart_radius(radius_key: str):
+    return _start_radius_from(await aget_cached(radius_key))
+
 
+def _start_radius_from(known_radius):
+    if known_radius:
+        return known_radius["used_radius_km"], False
+
+    return DEFAULT_START_RADIUS_KM, True
+
+
+def _point_response(area_id: str | None, raw_measurements: list, meta: dict) -> dict:
     if not raw_measurements:
         return {
             "area_id": area_id or "custom-point",
@@ -67,22 +245,290 @@ def get_point_air_quality(lat: float, lon: float, area_id: str | None = None) ->
             "meta": meta,
         }
 
-    cache_key = f"point:{lat:.4f},{lon:.4f}:{meta['used_radius_km']}km"
-    cached = get_cached(cache_key)
-    if cached:
-        return cached
-
     response = _run_aqi_pipeline(
         area_id=area_id or "custom-point",
         raw_measurements=raw_measurements,
     )
 
     response["meta"] = meta
-    set_cache(cache_key, response)
     return response
 
 
-def get_area_air_quality(area_id: str) -> dict:
+def _point_cache_writes(response: dict, cache_key: str, radius_key: str) -> list:
+    """
+    (key, value, ttl_seconds) to store for a fetched cell. A cell without
+    data is only cached for NO_DATA_TTL_SECONDS and never replaces its
+    last good response or known radius.
+    """
+
+    if response.get("status") == "no_data":
+        return [(cache_key, response, NO_DATA_TTL_SECONDS)]
+
+    return [
+        (cache_key, response, CACHE_HARD_TTL_SECONDS),
+        (_last_good_key(cache_key), response, LAST_GOOD_TTL_SECONDS),
+        (
+            radius_key,
+            {"used_radius_km": response["meta"]["used_radius_km"]},
+            RADIUS_TTL_SECONDS,
+        ),
+    ]
+
+
+def _finish_point_response(
+    area_id: str | None,
+    raw_measurements: list,
+    meta: dict,
+    cache_key: str,
+    radius_key: str,
+) -> dict:
+    response = _point_response(area_id, raw_measurements, meta)
+    for key, value, ttl_seconds in _point_cache_writes(response, cache_key, radius_key):
+        set_cache(key, value, ttl_seconds=ttl_seconds)
+    return response
+
+
+async def _afinish_point_response(
+    area_id: str | None,
+    raw_measurements: list,
+    meta: dict,
+    cache_key: str,
+    radius_key: str,
+) -> dict:
+    response = _point_response(area_id, raw_measurements, meta)
+    for key, value, ttl_seconds in _point_cache_writes(response, cache_key, radius_key):
+        await aset_cache(key, value, ttl_seconds=ttl_seconds)
+    return response
+
+
+def _freshness(stored_at: float, degraded: bool = False) -> dict:
+    age = max(time.time() - stored_at, 0.0)
+    if degraded:
+        state = "degraded"
+    else:
+        state = "stale" if age > CACHE_TTL_SECONDS else "fresh"
+
+    return {
+        "state": state,
+        "age_seconds": int(age),
+        "updated_at": int(stored_at),
+    }
+
+
+def _serve(response: dict, area_id: str | None, stored_at: float,
+           degraded: bool = False) -> dict:
+    """
+    Shallow copy of a cell response with the caller's area_id and its
+    freshness; the cached dict itself is never modified.
+    """
+
+    return {
+        **response,
+        "area_id": area_id or "custom-point",
+        "freshness": _freshness(stored_at, degraded),
+    }
+
+
+def _serve_last_good(cache_key: str, area_id: str | None):
+    """
+    The cell's last good response marked "degraded" with its age, or None
+    if there is none.
+    """
+
+    return _serve_degraded(get_cached_entry(_last_good_key(cache_key)), area_id)
+
+
+async def _aserve_last_good(cache_key: str, area_id: str | None):
+    return _serve_degraded(await aget_cached_entry(_last_good_key(cache_key)), area_id)
+
+
+def _serve_degraded(entry, area_id: str | None):
+    if entry is None:
+        return None
+
+    DEGRADED_RESPONSES.inc()
+    return _serve(entry["data"], area_id, entry["timestamp"], degraded=True)
+
+
+def _revalidate(cache_key: str, lat: float, lon: float):
+    try:
+        with request_priority(REFRESH):
+            get_point_air_quality(lat, lon, force_refresh=True)
+    except Exception:
+        logger.exception("background refresh of %s failed", cache_key)
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(cache_key)
+
+
+def _schedule_revalidation(cache_key: str, lat: float, lon: float):
+    if openaq_breaker.is_open():
+        # the refresh would fail at once; keep serving the stale entry
+        return
+
+    with _revalidating_lock:
+        if cache_key in _revalidating:
+            return
+        _revalidating.add(cache_key)
+
+    _revalidate_executor.submit(_revalidate, cache_key, lat, lon)
+
+
+def _lookup_cached(cache_key: str, lat: float, lon: float, record: bool = True):
+    """
+    (response, stored_at) of a servable cell entry, or None.
+
+    Entries live until the hard TTL; one older than the soft TTL
+    (CACHE_TTL_SECONDS) is still returned, and a background refresh of the
+    cell is scheduled. record=False keeps re-checks out of the hit/miss
+    metrics.
+    """
+
+    return _check_entry(get_cached_entry(cache_key), cache_key, lat, lon, record)
+
+
+async def _alookup_cached(cache_key: str, lat: float, lon: float, record: bool = True):
+    """
+    Async _lookup_cached.
+    """
+
+    return _check_entry(await aget_cached_entry(cache_key), cache_key, lat, lon, record)
+
+
+def _check_entry(entry, cache_key: str, lat: float, lon: float, record: bool):
+    if entry is None:
+        if record:
+            CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    if time.time() - entry["timestamp"] > CACHE_TTL_SECONDS:
+        if record:
+            CACHE_LOOKUPS.inc(result="stale")
+        _schedule_revalidation(cache_key, lat, lon)
+    elif record:
+        CACHE_LOOKUPS.inc(result="hit")
+
+    return entry["data"], entry["timestamp"]
+
+
+def get_point_air_quality(
+    lat: float,
+    lon: float,
+    area_id: str | None = None,
+    force_refresh: bool = False,
+) -> dict:
+    """
+    Canonical AQI entrypoint for any location.
+
+    The cache is checked before OpenAQ is touched: responses are keyed by
+    the ~500 m grid cell of the point, and the radius that cell resolved
+    to last time is kept separately so a refresh starts probing there.
+    A stale entry is served at once while it is refreshed in the
+    background; every response carries its "freshness".
+
+    force_refresh skips the cache read (used by the prefetch scheduler).
+    Concurrent misses on the same cell are coalesced: one caller fetches,
+    the others share its result or its error.
+    """
+
+    cache_key, radius_key = _point_cache_keys(lat, lon)
+
+    hit = None if force_refresh else _lookup_cached(cache_key, lat, lon)
+    if hit:
+        return _serve(hit[0], area_id, hit[1])
+
+    def refresh():
+        # a flight that finished just before this one started has already
+        # filled the cache
+        hit = None if force_refresh else _lookup_cached(cache_key, lat, lon, record=False)
+        if hit:
+            return hit
+
+        start_radius_km, concurrent = _start_radius(radius_key)
+        raw_measurements, meta = _fetch_raw_measurements_from_point(
+            lat,
+            lon,
+            radius_km=start_radius_km,
+            concurrent=concurrent,
+        )
+
+        response = _finish_point_response(
+            area_id, raw_measurements, meta, cache_key, radius_key
+        )
+        return response, time.time()
+
+    try:
+        response, stored_at = _point_flight.do(cache_key, refresh)
+    except Exception as exc:
+        fallback = _serve_last_good(cache_key, area_id)
+        if fallback is None:
+            raise
+        logger.warning("serving last good result for %s: %s", cache_key, exc)
+        return fallback
+
+    return _serve(response, area_id, stored_at)
+
+
+async def aget_point_air_quality(
+    lat: float,
+    lon: float,
+    area_id: str | None = None,
+) -> dict:
+    """
+    Async get_point_air_quality. Shares the same cache entries, and the same
+    in-flight fetches as the sync path.
+    """
+
+    cache_key, radius_key = _point_cache_keys(lat, lon)
+
+    hit = await _alookup_cached(cache_key, lat, lon)
+    if hit:
+        return _serve(hit[0], area_id, hit[1])
+
+    async def refresh():
+        hit = await _alookup_cached(cache_key, lat, lon, record=False)
+        if hit:
+            return hit
+
+        start_radius_km, concurrent = await _astart_radius(radius_key)
+        raw_measurements, meta = await _afetch_raw_measurements_from_point(
+            lat,
+            lon,
+            radius_km=start_radius_km,
+            concurrent=concurrent,
+        )
+
+        response = await _afinish_point_response(
+            area_id, raw_measurements, meta, cache_key, radius_key
+        )
+        return response, time.time()
+
+    try:
+        response, stored_at = await _point_flight.ado(cache_key, refresh)
+    except Exception as exc:
+        fallback = await _aserve_last_good(cache_key, area_id)
+        if fallback is None:
+            raise
+        logger.warning("serving last good result for %s: %s", cache_key, exc)
+        return fallback
+
+    return _serve(response, area_id, stored_at)
+
+
+def _with_area_id(response: dict, area_id: str | None) -> dict:
+    """
+    Cell entries are shared by every point in the cell, so the caller's
+    area_id is stamped on a shallow copy instead of the cached dict.
+    """
+
+    area_id = area_id or "custom-point"
+    if response.get("area_id") == area_id:
+        return response
+
+    return {**response, "area_id": area_id}
+
+
+def get_area_air_quality(area_id: str, force_refresh: bool = False) -> dict:
     """
     Area AQI = point AQI using predefined center coordinates.
     """
@@ -95,4 +541,105 @@ def get_area_air_quality(area_id: str) -> dict:
         lat=meta["lat"],
         lon=meta["lon"],
         area_id=area_id,
+        force_refresh=force_refresh,
+    )
+
+
+async def aget_area_air_quality(area_id: str) -> dict:
+    """
+    Async get_area_air_quality.
+    """
+
+    meta = get_area_metadata(area_id)
+    if not meta:
+        return {"error": "Unknown area_id"}
+
+    return await aget_point_air_quality(
+        lat=meta["lat"],
+        lon=meta["lon"],
+        area_id=area_id,
     )
+
+
+def _resolve_batch_item(item: dict):
+    """
+    Returns (lat, lon, area_id) for one batch item, or raises ValueError.
+    """
+
+    area_id = item.get("area_id")
+    if area_id is not None and "lat" not in item:
+        meta = get_area_metadata(area_id)
+        if not meta:
+            raise ValueError("Unknown area_id")
+        return meta["lat"], meta["lon"], area_id
+
+    try:
+        lat = float(item["lat"])
+        lon = float(item["lon"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Provide lat/lon or area_id")
+
+    return lat, lon, area_id
+
+
+def get_batch_air_quality(items: list, max_workers: int = BATCH_MAX_WORKERS) -> dict:
+    """
+    AQI for many areas and/or points in one call.
+
+    Items that fall in the same grid cell are fetched once; cached cells
+    are answered directly and the remaining cells are fetched concurrently.
+    Results keep the input order, and a failing item only marks itself as
+    an error.
+    """
+
+    results = [None] * len(items)
+    # cache_key -> (lat, lon, [(index, area_id), ...])
+    cells = {}
+
+    for index, item in enumerate(items):
+        try:
+            lat, lon, area_id = _resolve_batch_item(item)
+        except ValueError as exc:
+            results[index] = {"status": "error", "error": str(exc)}
+            continue
+
+        cache_key, _ = _point_cache_keys(lat, lon)
+        cells.setdefault(cache_key, (lat, lon, []))[2].append((index, area_id))
+
+    cell_results = {}
+    misses = []
+    for cache_key, (lat, lon, _) in cells.items():
+        hit = _lookup_cached(cache_key, lat, lon)
+        if hit:
+            cell_results[cache_key] = _serve(hit[0], None, hit[1])
+        else:
+            misses.append((cache_key, lat, lon))
+
+    def fetch(miss):
+        cache_key, lat, lon = miss
+        try:
+            return cache_key, get_point_air_quality(lat, lon)
+        except Exception as exc:
+            return cache_key, {"status": "error", "error": str(exc)}
+
+    if misses:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(misses)),
+            thread_name_prefix="aqi-batch",
+        ) as executor:
+            cell_results.update(executor.map(fetch, misses))
+
+    for cache_key, (_, _, members) in cells.items():
+        result = cell_results[cache_key]
+        for index, area_id in members:
+            results[index] = _with_area_id(result, area_id)
+
+    return {
+        "results": results,
+        "meta": {
+            "requested": len(items),
+            "unique_locations": len(cells),
+            "cache_hits": len(cells) - len(misses),
+            "fetched": len(misses),
+        },
+    }
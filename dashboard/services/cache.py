@@ -1,35 +1,339 @@
+import os
+import sys
+import threading
 import time
+from collections import OrderedDict
 
-# cache structure:
+# cache structure (one entry, most recently used last):
 # {
 #   "area_id": {
 #       "timestamp": 1700000000,
+#       "ttl": 3600,
+#       "size": 2048,
 #       "data": {...}
 #   }
 # }
 
-_CACHE = {}
 CACHE_TTL_SECONDS = 60 * 60  #taking ttl  1 hour
+# CACHE_TTL_SECONDS is the soft TTL: past it an AQI response is still served
+# (marked stale) while it is refreshed in the background. Past the hard TTL
+# it is gone and the request fetches synchronously.
+CACHE_HARD_TTL_SECONDS = int(os.getenv("AQI_CACHE_HARD_TTL_SECONDS", str(3 * 60 * 60)))
+CACHE_MAX_ENTRIES = int(os.getenv("AQI_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("AQI_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# how often expired entries are swept out, rather than only skipped on read
+CACHE_PURGE_INTERVAL_SECONDS = 60
+
+
+def _estimate_size(obj) -> int:
+    """
+    Approximate deep size in bytes of JSON-like data.
+    """
+
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _estimate_size(key) + _estimate_size(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            size += _estimate_size(value)
+
+    return size
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with per-entry TTL, bounded by entry count and
+    by an estimated byte budget.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        default_ttl: int = CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_purge = time.time()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        return None if entry is None else entry["data"]
+
+    def get_entry(self, key: str):
+        """
+        {"timestamp", "data"} of a live entry, or None.
+        """
+
+        with self._lock:
+            now = time.time()
+            self._maybe_purge(now)
+
+            entry = self._entries.get(key)
+            if not entry:
+                self.misses += 1
+                return None
+
+            if now - entry["timestamp"] > entry["ttl"]:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {"timestamp": entry["timestamp"], "data": entry["data"]}
+
+    async def aget_entry(self, key: str):
+        # in-process and non-blocking; async only to match DjangoCacheBackend
+        return self.get_entry(key)
+
+    def set(self, key: str, data, ttl_seconds: int | None = None):
+        size = _estimate_size(data)
+
+        with self._lock:
+            now = time.time()
+
+            if key in self._entries:
+                self._remove(key)
+
+            # a single value larger than the whole budget is never stored
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = {
+                "timestamp": now,
+                "ttl": self.default_ttl if ttl_seconds is None else ttl_seconds,
+                "size": size,
+                "data": data,
+            }
+            self._bytes += size
+
+            self._maybe_purge(now)
+            while (
+                len(self._entries) > self.max_entries
+                or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    async def aset(self, key: str, data, ttl_seconds: int | None = None):
+        self.set(key, data, ttl_seconds)
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge(time.time())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # --- helpers below expect self._lock to be held ---
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+    def _maybe_purge(self, now: float):
+        if now - self._last_purge >= CACHE_PURGE_INTERVAL_SECONDS:
+            self._purge(now)
+
+    def _purge(self, now: float) -> int:
+        expired = [
+            key for key, entry in self._entries.items()
+            if now - entry["timestamp"] > entry["ttl"]
+        ]
+        for key in expired:
+            self._remove(key)
+
+        self.expirations += len(expired)
+        self._last_purge = now
+        return len(expired)
+
+
+class DjangoCacheBackend:
+    """
+    Stores entries in a Django cache alias (locmem, file, database or
+    Redis), so every worker pointed at the same store shares one warm set
+    of results. Expiry is delegated to the store via the timeout.
+    """
+
+    def __init__(self, alias: str):
+        self.alias = alias
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        return None if entry is None else entry["data"]
+
+    def get_entry(self, key: str):
+        return self._counted(self._cache.get(key))
+
+    async def aget_entry(self, key: str):
+        """
+        get_entry() for coroutines. Django's aget runs blocking stores
+        (database, file, Redis) off the event loop.
+        """
+
+        return self._counted(await self._cache.aget(key))
+
+    def _counted(self, entry):
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return entry
+
+    def set(self, key: str, data, ttl_seconds: int | None = None):
+        self._cache.set(key, *self._stored(data, ttl_seconds))
+
+    async def aset(self, key: str, data, ttl_seconds: int | None = None):
+        await self._cache.aset(key, *self._stored(data, ttl_seconds))
+
+    @staticmethod
+    def _stored(data, ttl_seconds):
+        return (
+            {"timestamp": time.time(), "data": data},
+            CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds,
+        )
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self._cache.__class__.__name__,
+                "alias": self.alias,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    @property
+    def _cache(self):
+        # Django hands out one cache object per thread; look it up per call
+        from django.core.cache import caches
+
+        return caches[self.alias]
+
+
+# process-local store, used when AQI_CACHE_STORE is "memory" (the default)
+# or outside a configured Django project
+_CACHE = LRUCache()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+# stores every worker process sees; "memory" and "locmem" live and die
+# with their process
+SHARED_STORES = ("file", "sqlite", "redis")
+
+
+def is_shared_store() -> bool:
+    from django.conf import settings
+
+    return settings.configured and getattr(settings, "AQI_CACHE_STORE", "memory") in SHARED_STORES
+
+
+def _resolve_backend():
+    from django.conf import settings
+
+    if not settings.configured:
+        return _CACHE
+
+    store = getattr(settings, "AQI_CACHE_STORE", "memory")
+    if store == "memory":
+        return _CACHE
+
+    return DjangoCacheBackend(settings.AQI_CACHE_ALIAS)
+
+
+def get_backend():
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _resolve_backend()
+
+    return _backend
 
 
 def get_cached(area_id: str):
-    entry = _CACHE.get(area_id)
+    return get_backend().get(area_id)
+
+
+def get_cached_entry(key: str):
+    """
+    {"timestamp", "data"} for key, or None. The timestamp is when the entry
+    was stored, for age and freshness checks.
+    """
+
+    return get_backend().get_entry(key)
+
+
+def set_cache(area_id: str, data: dict, ttl_seconds: int = CACHE_TTL_SECONDS):
+    get_backend().set(area_id, data, ttl_seconds)
+
+
+# async variants for views running on the event loop: a database, file or
+# Redis store must not be touched from it directly
+
+async def aget_cached(key: str):
+    entry = await get_backend().aget_entry(key)
+    return None if entry is None else entry["data"]
+
 
-    if not entry:
-        return None
+async def aget_cached_entry(key: str):
+    return await get_backend().aget_entry(key)
 
-    age = time.time() - entry["timestamp"]
-    if age > CACHE_TTL_SECONDS:
-        return None
 
-    return entry["data"]
+async def aset_cache(key: str, data: dict, ttl_seconds: int = CACHE_TTL_SECONDS):
+    await get_backend().aset(key, data, ttl_seconds)
 
 
-def set_cache(area_id: str, data: dict):
-    _CACHE[area_id] = {
-        "timestamp": time.time(),
-        "data": data
-    }
+def cache_stats() -> dict:
+    return get_backend().stats()
 if __name__ == "__main__":
     set_cache("test-area", {"aqi": 200})
 
@@ -38,3 +342,4 @@ if __name__ == "__main__":
     time.sleep(2)
 
     print(get_cached("test-area"))  # still valid
+    print(cache_stats())
@@ -1,6 +1,12 @@
 # dashboard/services/aqi.py
 
-from typing import List, Tuple, Dict
+from functools import lru_cache
+from typing import List, Tuple, Dict, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # only the batch API needs numpy
+    np = None
 
 # Type alias for readability
 Breakpoint = Tuple[float, float, int, int, str]
@@ -10,10 +16,20 @@ Breakpoint = Tuple[float, float, int, int, str]
 def calculate_aqi(value: float, breakpoints: List[Breakpoint]) -> Dict:
     """
     Generic AQI calculator using linear interpolation.
+
+    The tables list integer concentrations, so a fractional value can fall
+    between one range's upper bound and the next range's lower bound (pm25
+    30 < v < 31). Ranges are treated as contiguous, c_low <= v < next
+    c_low: such a value belongs to the lower range and scores its top AQI,
+    as if truncated to the integer the table expects.
     """
 
-    for c_low, c_high, aqi_low, aqi_high, category in breakpoints:
-        if c_low <= value <= c_high:
+    for i, (c_low, c_high, aqi_low, aqi_high, category) in enumerate(breakpoints):
+        upper_ok = (
+            value < breakpoints[i + 1][0] if i + 1 < len(breakpoints) else value <= c_high
+        )
+        if c_low <= value and upper_ok:
+            value = min(value, c_high)
             aqi = (
                 (aqi_high - aqi_low)
                 / (c_high - c_low)
@@ -64,12 +80,14 @@ def calculate_overall_aqi(pollutants: Dict[str, float]) -> Dict:
     """
 
     sub_indices = {}
+    categories = {}
 
     for pollutant, value in pollutants.items():
         if pollutant in SUPPORTED_POLLUTANTS:
             result = calculate_aqi(value, SUPPORTED_POLLUTANTS[pollutant])
             if result["aqi"] is not None:
                 sub_indices[pollutant] = result["aqi"]
+                categories[pollutant] = result["category"]
 
     if not sub_indices:
         return {"aqi": None, "category": "Unknown"}
@@ -77,10 +95,8 @@ def calculate_overall_aqi(pollutants: Dict[str, float]) -> Dict:
     dominant_pollutant = max(sub_indices, key=sub_indices.get)
     overall_aqi = sub_indices[dominant_pollutant]
 
-    category = calculate_aqi(
-        pollutants[dominant_pollutant],
-        SUPPORTED_POLLUTANTS[dominant_pollutant]
-    )["category"]
+    # reuse the category from the first pass instead of recomputing it
+    category = categories[dominant_pollutant]
 
     return {
         "aqi": overall_aqi,
@@ -88,6 +104,123 @@ def calculate_overall_aqi(pollutants: Dict[str, float]) -> Dict:
         "dominant_pollutant": dominant_pollutant,
         "sub_indices": sub_indices,
     }
+
+
+@lru_cache(maxsize=None)
+def _compiled_breakpoints(pollutant: str):
+    """
+    Breakpoint table of one pollutant as parallel numpy arrays, built once.
+    """
+
+    c_low, c_high, aqi_low, aqi_high, category = zip(*SUPPORTED_POLLUTANTS[pollutant])
+
+    return (
+        np.array(c_low, dtype=float),
+        np.array(c_high, dtype=float),
+        np.array(aqi_low, dtype=float),
+        np.array(aqi_high, dtype=float),
+        np.array(category + ("Unknown",), dtype=object),
+    )
+
+
+def calculate_aqi_array(values, pollutant: str):
+    """
+    Vectorized calculate_aqi for one supported pollutant.
+
+    Returns (aqi, category_index): aqi is a float array with NaN where the
+    value falls in no breakpoint range (or is NaN); category_index points
+    into the pollutant's categories, with the last slot meaning "Unknown".
+    """
+
+    c_low, c_high, aqi_low, aqi_high, _ = _compiled_breakpoints(pollutant)
+    values = np.asarray(values, dtype=float)
+
+    # ranges are sorted and contiguous (see calculate_aqi), so the last
+    # range whose lower bound is <= value is the one; NaN sorts past the
+    # end and fails the upper-bound check
+    idx = np.searchsorted(c_low, values, side="right") - 1
+    safe_idx = np.maximum(idx, 0)
+    valid = (idx >= 0) & (values <= c_high[-1])
+
+    lo, hi = c_low[safe_idx], c_high[safe_idx]
+    a_lo, a_hi = aqi_low[safe_idx], aqi_high[safe_idx]
+    # a value in the gap above a range scores that range's top AQI
+    clamped = np.minimum(values, hi)
+
+    # same operation order as calculate_aqi so results are bit-identical
+    with np.errstate(invalid="ignore"):
+        aqi = (a_hi - a_lo) / (hi - lo) * (clamped - lo) + a_lo
+
+    aqi = np.where(valid, np.round(aqi), np.nan)
+    category_index = np.where(valid, safe_idx, len(c_high))
+
+    return aqi, category_index
+
+
+def calculate_overall_aqi_batch(concentrations: Dict[str, Sequence[float]]) -> Dict:
+    """
+    Vectorized calculate_overall_aqi for many locations at once.
+
+    concentrations maps pollutant -> equal-length array of values (NaN for
+    a missing reading). Unsupported pollutants are ignored, as in the
+    scalar path.
+
+    Returns:
+    {
+        "aqi": float array (NaN where no supported value is in range),
+        "category": object array ("Unknown" where aqi is NaN),
+        "dominant_pollutant": object array (None where aqi is NaN),
+        "sub_indices": {pollutant: float array},
+    }
+    """
+
+    if np is None:
+        raise RuntimeError("calculate_overall_aqi_batch requires numpy")
+
+    # keep input order so ties resolve to the same pollutant as max() does
+    # in the scalar path
+    pollutants = [p for p in concentrations if p in SUPPORTED_POLLUTANTS]
+
+    sub_indices = {}
+    categories = []
+    for pollutant in pollutants:
+        aqi, category_index = calculate_aqi_array(concentrations[pollutant], pollutant)
+        sub_indices[pollutant] = aqi
+        categories.append(_compiled_breakpoints(pollutant)[4][category_index])
+
+    if not pollutants:
+        size = len(next(iter(concentrations.values()), []))
+        return {
+            "aqi": np.full(size, np.nan),
+            "category": np.full(size, "Unknown", dtype=object),
+            "dominant_pollutant": np.full(size, None, dtype=object),
+            "sub_indices": {},
+        }
+
+    stacked = np.vstack([sub_indices[p] for p in pollutants])
+    has_value = ~np.isnan(stacked).all(axis=0)
+
+    dominant_idx = np.argmax(np.where(np.isnan(stacked), -np.inf, stacked), axis=0)
+    columns = np.arange(stacked.shape[1])
+
+    overall = np.where(has_value, stacked[dominant_idx, columns], np.nan)
+    category = np.where(
+        has_value,
+        np.vstack(categories)[dominant_idx, columns],
+        "Unknown",
+    ).astype(object)
+    dominant = np.where(
+        has_value,
+        np.array(pollutants, dtype=object)[dominant_idx],
+        None,
+    ).astype(object)
+
+    return {
+        "aqi": overall,
+        "category": category,
+        "dominant_pollutant": dominant,
+        "sub_indices": sub_indices,
+    }
 if __name__ == "__main__":
     pollutants = {
         "pm25": 300.0,
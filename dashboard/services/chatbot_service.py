@@ -1,9 +1,21 @@
 # dashboard/services/chatbot_service.py
 
+import hashlib
+import logging
+import math
 import os
-import google.generativeai as genai
+import queue
+import re
+import threading
+import time
+from typing import Iterator
+
 from dotenv import load_dotenv
 
+from .cache import LRUCache
+from .metrics import CHATBOT_FIRST_CHUNK_SECONDS, CHATBOT_SECONDS
+from .reasoning import infer_pollution_reasons
+
 """
 FRONT END WILL SEND THIS    
 {
@@ -29,9 +41,38 @@ FRONT END WILL SEND THIS
 
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+GEMINI_MODEL = "gemini-1.5-flash"
+
+# answers are reused while the air stays in the same bucket
+CHATBOT_CACHE_TTL_SECONDS = int(os.getenv("CHATBOT_CACHE_TTL_SECONDS", str(15 * 60)))
+CHATBOT_CACHE_MAX_ENTRIES = int(os.getenv("CHATBOT_CACHE_MAX_ENTRIES", "2000"))
+# numbers are rounded to these steps before they reach the prompt, so all
+# requests sharing a cache key get the same prompt (and the cached answer
+# never quotes another request's exact values)
+POLLUTANT_BUCKET = 10  # µg/m³
+AQI_BUCKET = 10
+WEATHER_BUCKETS = {
+    "wind_speed": 1,    # m/s
+    "temperature": 2,   # °C
+    "humidity": 10,     # %
+}
+DEFAULT_WEATHER_BUCKET = 1
+
+# model backend: "gemini", or "stub" for a deterministic local stand-in
+CHATBOT_BACKEND = os.getenv("CHATBOT_BACKEND", "gemini")
+# total time allowed for one answer before the canned fallback is used
+CHATBOT_DEADLINE_SECONDS = float(os.getenv("CHATBOT_DEADLINE_SECONDS", "20"))
+# simulated latency of the stub backend
+CHATBOT_STUB_FIRST_TOKEN_SECONDS = float(os.getenv("CHATBOT_STUB_FIRST_TOKEN_SECONDS", "0.3"))
+CHATBOT_STUB_TOKEN_SECONDS = float(os.getenv("CHATBOT_STUB_TOKEN_SECONDS", "0.02"))
+
+logger = logging.getLogger(__name__)
 
-model = genai.GenerativeModel("gemini-1.5-flash")
+_response_cache = LRUCache(
+    max_entries=CHATBOT_CACHE_MAX_ENTRIES,
+    max_bytes=16 * 1024 * 1024,
+    default_ttl=CHATBOT_CACHE_TTL_SECONDS,
+)
 
 
 def build_prompt(
@@ -80,7 +121,70 @@ Respond in clear, concise, and practical language.
 """
 
 
-def get_chatbot_response(
+def normalize_query(user_query: str) -> str:
+    """
+    Lowercased query without punctuation or repeated whitespace, so
+    "Is it safe to walk?" and "is it safe to walk" share an answer.
+    """
+
+    words = re.sub(r"[^\w\s]", " ", user_query.lower()).split()
+    return " ".join(words)
+
+
+def _as_number(value):
+    """
+    value as a float, or None if it is not a finite number. Request bodies
+    may carry numbers as strings ("95").
+    """
+
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _bucket(value, step: int):
+    """
+    value rounded to the nearest multiple of step, or None if it is not a
+    number.
+    """
+
+    number = _as_number(value)
+    if number is None:
+        return None
+    return round(number / step) * step
+
+
+def _bucketed_levels(values: dict, step_for) -> dict:
+    levels = {}
+    for name, value in values.items():
+        level = _bucket(value, step_for(name))
+        if level is not None:
+            levels[name] = level
+    return levels
+
+
+def bucketed_context(aqi_data: dict, pollutants: dict, weather: dict) -> tuple:
+    """
+    (aqi_data, pollutants, weather) with every number rounded to its
+    bucket. Prompts are built from this, never from the exact values.
+    """
+
+    aqi_data = dict(aqi_data)
+    if "aqi" in aqi_data:
+        aqi_data["aqi"] = _bucket(aqi_data["aqi"], AQI_BUCKET)
+
+    return (
+        aqi_data,
+        _bucketed_levels(pollutants, lambda _: POLLUTANT_BUCKET),
+        _bucketed_levels(
+            weather, lambda name: WEATHER_BUCKETS.get(name, DEFAULT_WEATHER_BUCKET)
+        ),
+    )
+
+
+def response_cache_key(
     user_type: str,
     aqi_data: dict,
     pollutants: dict,
@@ -88,10 +192,288 @@ def get_chatbot_response(
     user_query: str,
 ) -> str:
     """
-    Sends prompt to Gemini and returns response text.
+    Cache key from the user type, the normalized query and the bucketed
+    context (see bucketed_context), i.e. everything the prompt says.
     """
 
+    aqi_data, pollutants, weather = bucketed_context(aqi_data, pollutants, weather)
+
+    def levels(values: dict) -> str:
+        return ",".join(f"{k}={v}" for k, v in sorted(values.items()))
+
+    parts = [
+        (user_type or "").strip().lower(),
+        str(aqi_data.get("aqi")),
+        str(aqi_data.get("category", "")).strip().lower(),
+        str(aqi_data.get("dominant_pollutant", "")).strip().lower(),
+        levels(pollutants),
+        levels(weather),
+        normalize_query(user_query),
+    ]
+    digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    return f"chatbot:{digest}"
+
+
+def chatbot_cache_stats() -> dict:
+    stats = _response_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
+
+
+class GeminiBackend:
+    """
+    Streams chunks of a Gemini answer as they are generated.
+
+    google.generativeai is imported and configured on the first question,
+    not at startup: the import alone is one of the slowest in the app.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                    self._model = genai.GenerativeModel(self.model_name)
+
+        return self._model
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        response = self._get_model().generate_content(
+            prompt,
+            stream=True,
+            request_options={"timeout": timeout},
+        )
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubBackend:
+    """
+    Deterministic offline stand-in: the same prompt always yields the same
+    words, after a fixed first-token delay and a fixed delay per word.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        first_token_seconds: float = CHATBOT_STUB_FIRST_TOKEN_SECONDS,
+        token_seconds: float = CHATBOT_STUB_TOKEN_SECONDS,
+    ):
+        self.first_token_seconds = first_token_seconds
+        self.token_seconds = token_seconds
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        answer = (
+            f"[stub {digest}] Air quality is degraded. Limit strenuous outdoor "
+            "activity, keep windows closed during peak hours and wear an N95 "
+            "mask outdoors."
+        )
+
+        time.sleep(self.first_token_seconds)
+        for i, word in enumerate(answer.split(" ")):
+            if i:
+                time.sleep(self.token_seconds)
+            yield word if i == 0 else " " + word
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "stub": StubBackend,
+}
+
+_backend = None
+
+
+def get_model_backend():
+    global _backend
+
+    if _backend is None:
+        if CHATBOT_BACKEND not in BACKENDS:
+            raise ValueError(f"Unknown CHATBOT_BACKEND: {CHATBOT_BACKEND}")
+        _backend = BACKENDS[CHATBOT_BACKEND]()
+
+    return _backend
+
+
+def set_model_backend(backend):
+    """
+    Swaps the model backend, e.g. StubBackend() for offline latency tests.
+    """
+
+    global _backend
+    _backend = backend
+
+
+CATEGORY_ADVICE = {
+    "Good": "Air quality is good; outdoor activities are fine.",
+    "Satisfactory": "Air quality is acceptable; very sensitive people should limit long outdoor exertion.",
+    "Moderate": "Sensitive groups should reduce prolonged outdoor exertion.",
+    "Poor": "Limit outdoor exertion and wear an N95 mask outdoors.",
+    "Very Poor": "Avoid outdoor activity; keep windows closed and use an air purifier if available.",
+    "Severe": "Stay indoors; avoid all outdoor exertion and follow health advisories.",
+}
+
+
+def fallback_answer(aqi_data: dict, pollutants: dict, weather: dict) -> str:
+    """
+    Canned answer from the rule-based reasons, used when the model fails or
+    misses the deadline.
+    """
+
+    reasons = infer_pollution_reasons({
+        **{name: _as_number(value) for name, value in pollutants.items()},
+        "wind_speed": _as_number(weather.get("wind_speed")),
+    })
+    category = aqi_data.get("category")
+
+    lines = [
+        f"Current AQI is {aqi_data.get('aqi', 'unknown')} ({category or 'unknown'})"
+        f", dominant pollutant {str(aqi_data.get('dominant_pollutant', 'unknown')).upper()}.",
+        f"Likely cause: {reasons['primary_reason']}.",
+    ]
+    if reasons["contributing_factors"]:
+        lines.append("Contributing factors: " + "; ".join(reasons["contributing_factors"]) + ".")
+    lines.append(CATEGORY_ADVICE.get(category, "Check official advisories before outdoor activity."))
+
+    return " ".join(lines)
+
+
+def _stream_with_deadline(prompt: str, deadline_seconds: float) -> Iterator[str]:
+    """
+    Runs the backend stream on a worker thread and yields its chunks until
+    it finishes or the deadline passes (TimeoutError). A hung upstream call
+    is abandoned to its daemon thread.
+    """
+
+    chunks = queue.Queue()
+    stop = threading.Event()
+    done = object()
+    backend = get_model_backend()
+
+    def produce():
+        try:
+            for chunk in backend.stream(prompt, deadline_seconds):
+                if stop.is_set():
+                    return
+                chunks.put(chunk)
+            chunks.put(done)
+        except Exception as exc:
+            chunks.put(exc)
+
+    threading.Thread(target=produce, name="chatbot-stream", daemon=True).start()
+    deadline = time.monotonic() + deadline_seconds
+
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"no answer within {deadline_seconds}s")
+
+            try:
+                item = chunks.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError(f"no answer within {deadline_seconds}s") from None
+
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def stream_chatbot_response(
+    user_type: str,
+    aqi_data: dict,
+    pollutants: dict,
+    weather: dict,
+    user_query: str,
+    deadline_seconds: float = CHATBOT_DEADLINE_SECONDS,
+) -> Iterator[dict]:
+    """
+    Yields {"text": chunk} events as the model produces them.
+
+    A cached answer is yielded in one event. If the model fails or the
+    deadline passes, the canned fallback follows as
+    {"text": ..., "fallback": True}. Only complete model answers are cached.
+    """
+
+    started = time.perf_counter()
+    backend_name = getattr(get_model_backend(), "name", "custom")
+
+    cache_key = response_cache_key(user_type, aqi_data, pollutants, weather, user_query)
+    cached = _response_cache.get(cache_key)
+    if cached is not None:
+        CHATBOT_SECONDS.observe(time.perf_counter() - started, backend=backend_name, outcome="cached")
+        yield {"text": cached}
+        return
+
+    prompt_aqi, prompt_pollutants, prompt_weather = bucketed_context(
+        aqi_data, pollutants, weather
+    )
     prompt = build_prompt(
+        user_type=user_type,
+        aqi_data=prompt_aqi,
+        pollutants=prompt_pollutants,
+        weather=prompt_weather,
+        user_query=user_query,
+    )
+
+    parts = []
+    try:
+        for chunk in _stream_with_deadline(prompt, deadline_seconds):
+            if not parts:
+                CHATBOT_FIRST_CHUNK_SECONDS.observe(
+                    time.perf_counter() - started, backend=backend_name
+                )
+            parts.append(chunk)
+            yield {"text": chunk}
+    except Exception as exc:
+        if isinstance(exc, TimeoutError):
+            logger.warning("chatbot model timed out, using fallback: %s", exc)
+        else:
+            logger.exception("chatbot model failed, using fallback")
+
+        CHATBOT_SECONDS.observe(time.perf_counter() - started, backend=backend_name, outcome="fallback")
+        fallback = fallback_answer(aqi_data, pollutants, weather)
+        yield {"text": ("\n\n" if parts else "") + fallback, "fallback": True}
+        return
+
+    CHATBOT_SECONDS.observe(time.perf_counter() - started, backend=backend_name, outcome="model")
+    answer = "".join(parts).strip()
+    if answer:
+        _response_cache.set(cache_key, answer)
+
+
+def get_chatbot_response(
+    user_type: str,
+    aqi_data: dict,
+    pollutants: dict,
+    weather: dict,
+    user_query: str,
+) -> str:
+    """
+    Full answer text. Answers are cached per response_cache_key for
+    CHATBOT_CACHE_TTL_SECONDS; past CHATBOT_DEADLINE_SECONDS the canned
+    fallback is returned instead.
+    """
+
+    events = stream_chatbot_response(
         user_type=user_type,
         aqi_data=aqi_data,
         pollutants=pollutants,
@@ -99,6 +481,4 @@ def get_chatbot_response(
         user_query=user_query,
     )
 
-    response = model.generate_content(prompt)
-
-    return response.text.strip()
+    return "".join(event["text"] for event in events).strip()
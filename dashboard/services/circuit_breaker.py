@@ -0,0 +1,209 @@
+# dashboard/services/circuit_breaker.py
+#
+# Fails OpenAQ calls fast while the API is down or too slow to be useful,
+# instead of letting every request wait out its own timeouts. Closed: calls
+# pass and their outcomes are tracked over a sliding window. Open: calls
+# raise CircuitOpen at once. Half-open: after OPEN_SECONDS a single probe
+# call is let through; its outcome closes or re-opens the breaker, and
+# calls arriving meanwhile wait for it.
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from .metrics import OPENAQ_BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# outcomes of the last WINDOW calls decide; no verdict before MIN_CALLS
+WINDOW = int(os.getenv("OPENAQ_BREAKER_WINDOW", "20"))
+MIN_CALLS = int(os.getenv("OPENAQ_BREAKER_MIN_CALLS", "10"))
+FAILURE_RATE = float(os.getenv("OPENAQ_BREAKER_FAILURE_RATE", "0.5"))
+# a call this slow counts as a failure even if it succeeds
+SLOW_CALL_SECONDS = float(os.getenv("OPENAQ_BREAKER_SLOW_CALL_SECONDS", "5"))
+OPEN_SECONDS = float(os.getenv("OPENAQ_BREAKER_OPEN_SECONDS", "30"))
+# how long a call waits for an in-flight probe; a probe slower than a slow
+# call re-opens the breaker anyway
+PROBE_WAIT_SECONDS = float(
+    os.getenv("OPENAQ_BREAKER_PROBE_WAIT_SECONDS", str(SLOW_CALL_SECONDS))
+)
+# how often a coroutine waiting for the probe checks its outcome
+PROBE_POLL_SECONDS = 0.05
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of calling a service whose breaker is open.
+    """
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, next probe in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Error-rate and slow-call breaker. Callers bracket each upstream call
+    with before_call() and record(), or release() if the call ended
+    without an outcome (cancelled, interrupted).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = WINDOW,
+        min_calls: int = MIN_CALLS,
+        failure_rate: float = FAILURE_RATE,
+        slow_call_seconds: float = SLOW_CALL_SECONDS,
+        open_seconds: float = OPEN_SECONDS,
+        probe_wait_seconds: float = PROBE_WAIT_SECONDS,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probe_wait_seconds = probe_wait_seconds
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # True = failed or slow
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._probe_done = threading.Condition(self._lock)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+
+        logger.warning("%s circuit %s -> %s", self.name, self.state, state)
+        OPENAQ_BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+        self.state = state
+
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def _retry_in(self) -> float:
+        return max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+
+    def is_open(self) -> bool:
+        """
+        True while calls are being refused outright (open and not yet due
+        for a probe). Does not change state.
+        """
+
+        with self._lock:
+            return self.state == OPEN and self._retry_in() > 0
+
+    def _try_admit(self) -> bool:
+        # False while another call is probing; the caller holds the lock
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN:
+            retry_in = self._retry_in()
+            if retry_in > 0:
+                raise CircuitOpen(self.name, retry_in)
+            self._transition(HALF_OPEN)
+
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def _probe_resolved(self) -> bool:
+        return self.state != HALF_OPEN or not self._probing
+
+    def before_call(self):
+        """
+        Raises CircuitOpen unless a call may go upstream now. In half-open
+        state only one probe is in flight at a time; other calls wait up
+        to probe_wait_seconds for its outcome, then go ahead if it closed
+        the breaker.
+        """
+
+        with self._lock:
+            while not self._try_admit():
+                if not self._probe_done.wait_for(self._probe_resolved, self.probe_wait_seconds):
+                    # the probe is slow enough to count as failed
+                    raise CircuitOpen(self.name, self.open_seconds)
+
+    async def abefore_call(self):
+        """
+        before_call() for coroutines: waits for the probe with
+        asyncio.sleep, never blocking the event loop.
+        """
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.probe_wait_seconds
+
+        while True:
+            with self._lock:
+                if self._try_admit():
+                    return
+            if loop.time() >= deadline:
+                raise CircuitOpen(self.name, self.open_seconds)
+            await asyncio.sleep(PROBE_POLL_SECONDS)
+
+    def record(self, duration: float, failed: bool):
+        """
+        Outcome of a call admitted by before_call().
+        """
+
+        bad = failed or duration >= self.slow_call_seconds
+
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                self._transition(OPEN if bad else CLOSED)
+                self._probe_done.notify_all()
+                return
+
+            if self.state == OPEN:
+                # started before the breaker opened
+                return
+
+            self._outcomes.append(bad)
+            if (
+                len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+            ):
+                self._transition(OPEN)
+
+    def release(self):
+        """
+        Ends a call admitted by before_call() without recording an outcome.
+        A cancelled half-open probe frees the probe slot, so a waiting or
+        the next call probes instead of the breaker refusing calls for good.
+        """
+
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                self._probe_done.notify_all()
+
+    def reset(self):
+        with self._lock:
+            self._probing = False
+            self._transition(CLOSED)
+            self._probe_done.notify_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "retry_in": round(self._retry_in(), 1) if self.state == OPEN else 0,
+            }
+
+
+openaq_breaker = CircuitBreaker("openaq")
@@ -0,0 +1,47 @@
+# dashboard/services/geo.py
+
+import math
+from typing import Tuple
+
+# ~1 degree of latitude in metres (WGS 84 mean)
+METRES_PER_DEGREE = 111_320
+
+# grid cell used to share cache entries between nearby coordinates.
+# 500 m is well below the smallest OpenAQ search radius (5 km), so every
+# point inside a cell resolves to the same sensors.
+GRID_CELL_SIZE_M = 500
+
+
+def grid_cell(lat: float, lon: float, cell_size_m: int = GRID_CELL_SIZE_M) -> Tuple[int, int]:
+    """
+    Quantizes a coordinate to an integer (row, col) grid cell.
+    """
+
+    lat_step = cell_size_m / METRES_PER_DEGREE
+    # longitude degrees shrink with latitude; use the row's latitude so a
+    # cell stays roughly square
+    row = math.floor(lat / lat_step)
+    lon_step = lat_step / max(math.cos(math.radians(row * lat_step)), 1e-6)
+    col = math.floor(lon / lon_step)
+
+    return row, col
+
+
+def grid_cell_key(lat: float, lon: float, cell_size_m: int = GRID_CELL_SIZE_M) -> str:
+    row, col = grid_cell(lat, lon, cell_size_m)
+    return f"{cell_size_m}m:{row}:{col}"
+
+
+def project_km(lat: float, lon: float, ref_lat: float) -> Tuple[float, float]:
+    """
+    Equirectangular projection to (x, y) kilometres around ref_lat.
+
+    Accurate to well under 1% across a city-sized area, which is plenty
+    for nearest-sensor lookups.
+    """
+
+    km_per_degree = METRES_PER_DEGREE / 1000
+    x = lon * km_per_degree * math.cos(math.radians(ref_lat))
+    y = lat * km_per_degree
+
+    return x, y
@@ -0,0 +1,171 @@
+# dashboard/services/measurement_store.py
+#
+# Persists raw OpenAQ readings in the configured database and serves
+# downsampled history, so trend charts read local data instead of asking
+# OpenAQ again.
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDay, TruncHour
+
+from dashboard.models import Measurement
+
+from .rolling_window import DEFAULT_WINDOW_HOURS, aggregator as window_aggregator
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+
+BUCKETS = {
+    "hour": TruncHour,
+    "day": TruncDay,
+}
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    # OpenAQ sends ISO 8601 with a trailing Z
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def store_readings(readings: list) -> int:
+    """
+    Bulk upsert of [{"sensor_id", "parameter", "datetime", "value"}, ...].
+
+    A reading already stored for the same (sensor, parameter, time) has its
+    value updated, so re-fetching overlapping windows is harmless.
+    """
+
+    rows = {}
+    for r in readings:
+        timestamp = _as_datetime(r["datetime"])
+        # duplicates inside one batch would violate the unique constraint
+        rows[(r["sensor_id"], r["parameter"], timestamp)] = r["value"]
+
+    if not rows:
+        return 0
+
+    Measurement.objects.bulk_create(
+        [
+            Measurement(
+                sensor_id=sensor_id,
+                parameter=parameter,
+                timestamp=timestamp,
+                value=value,
+            )
+            for (sensor_id, parameter, timestamp), value in rows.items()
+        ],
+        batch_size=BULK_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["sensor_id", "parameter", "timestamp"],
+        update_fields=["value"],
+    )
+
+    return len(rows)
+
+
+def store_readings_safely(readings: list) -> int:
+    """
+    store_readings for the request path: a storage failure is logged and
+    never fails the AQI response.
+    """
+
+    try:
+        return store_readings(readings)
+    except Exception:
+        logger.exception("storing %d readings failed", len(readings))
+        return 0
+
+
+def get_history(
+    parameter: str,
+    start: datetime,
+    end: datetime,
+    sensor_ids: list | None = None,
+    bucket: str = "hour",
+) -> list:
+    """
+    Min/mean/max per hour or day, aggregated in the database.
+
+    Returns [{"time", "min", "mean", "max", "count"}, ...] oldest first.
+    """
+
+    queryset = Measurement.objects.filter(
+        parameter=parameter,
+        timestamp__gte=start,
+        timestamp__lt=end,
+    )
+    if sensor_ids:
+        queryset = queryset.filter(sensor_id__in=sensor_ids)
+
+    rows = (
+        queryset
+        .annotate(bucket=BUCKETS[bucket]("timestamp"))
+        .values("bucket")
+        .annotate(
+            min=Min("value"),
+            mean=Avg("value"),
+            max=Max("value"),
+            count=Count("id"),
+        )
+        .order_by("bucket")
+    )
+
+    return [
+        {
+            "time": row["bucket"].isoformat(),
+            "min": row["min"],
+            "mean": round(row["mean"], 2),
+            "max": row["max"],
+            "count": row["count"],
+        }
+        for row in rows
+    ]
+
+
+def recent_readings(sensor_ids: list, since: datetime) -> list:
+    """
+    Stored readings of the given sensors since a point in time, in the
+    same shape store_readings accepts.
+    """
+
+    rows = (
+        Measurement.objects
+        .filter(sensor_id__in=sensor_ids, timestamp__gte=since)
+        .values_list("sensor_id", "parameter", "timestamp", "value")
+    )
+
+    return [
+        {
+            "sensor_id": sensor_id,
+            "parameter": parameter,
+            "datetime": timestamp,
+            "value": value,
+        }
+        for sensor_id, parameter, timestamp, value in rows
+    ]
+
+
+def seed_windows(sensors: list, aggregator=window_aggregator):
+    """
+    Loads the stored history of sensors the rolling-window aggregator has
+    not seen yet in this process, so the first average after a restart
+    covers the full 24 h instead of the last fetch. Call before ingesting
+    fresh readings: a sensor counts as seen once it has any.
+    """
+
+    unseen = [
+        s["sensor_id"] for s in sensors
+        if not aggregator.known(s["sensor_id"], s["parameter"])
+    ]
+    if not unseen:
+        return
+
+    since = datetime.now(timezone.utc) - timedelta(hours=DEFAULT_WINDOW_HOURS)
+    try:
+        aggregator.ingest(recent_readings(unseen, since))
+    except Exception:
+        logger.exception("seeding rolling windows failed")
@@ -0,0 +1,247 @@
+# dashboard/services/metrics.py
+#
+# In-process counters and latency histograms for the hot path, rendered in
+# the Prometheus text format by the /metrics endpoint. Disabled unless
+# AQI_METRICS_ENABLED=1; then every inc/observe/timed call returns at once,
+# so instrumentation costs one flag check.
+
+import os
+import threading
+import time
+from typing import Sequence
+
+METRICS_ENABLED = os.getenv("AQI_METRICS_ENABLED", "0") == "1"
+
+# seconds; OpenAQ and Gemini calls range from tens of ms to tens of seconds
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+# results per upstream call
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 1000)
+
+_enabled = METRICS_ENABLED
+_registry = []
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(flag: bool):
+    global _enabled
+    _enabled = flag
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not _enabled:
+            return
+
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_series(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not _enabled:
+            return
+
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [count per bucket..., +Inf count, sum]
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_number(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_number(series[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if "outcome" in self.histogram.labelnames and "outcome" not in self.labels:
+            self.labels["outcome"] = "error" if exc_type else "ok"
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timed(histogram: Histogram, **labels):
+    """
+    Context manager observing the block's duration in seconds. A histogram
+    with an "outcome" label gets "ok" or "error" filled in automatically.
+    """
+
+    if not _enabled:
+        return _NOOP_TIMER
+    return _Timer(histogram, labels)
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    for metric in _registry:
+        metric.clear()
+
+
+# --- application metrics ---
+
+OPENAQ_REQUEST_SECONDS = Histogram(
+    "aqi_openaq_request_seconds",
+    "Latency of OpenAQ API calls.",
+    ["call", "radius_km", "outcome"],
+)
+OPENAQ_RESULTS = Histogram(
+    "aqi_openaq_results",
+    "Results returned per OpenAQ API call.",
+    ["call", "radius_km"],
+    buckets=COUNT_BUCKETS,
+)
+OPENAQ_QUEUE_SECONDS = Histogram(
+    "aqi_openaq_queue_seconds",
+    "Time OpenAQ calls waited for a rate-limit token, by priority.",
+    ["priority"],
+)
+OPENAQ_RETRIES = Counter(
+    "aqi_openaq_retries_total",
+    "OpenAQ calls retried after a 429 or 5xx, by priority and status.",
+    ["priority", "status"],
+)
+OPENAQ_BREAKER_TRANSITIONS = Counter(
+    "aqi_openaq_breaker_transitions_total",
+    "Circuit breaker state changes, by the state entered.",
+    ["breaker", "state"],
+)
+DEGRADED_RESPONSES = Counter(
+    "aqi_degraded_responses_total",
+    "AQI responses answered from the last known good result after a failed fetch.",
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "aqi_pipeline_stage_seconds",
+    "Latency of each stage of a point AQI lookup.",
+    ["stage"],
+)
+CACHE_LOOKUPS = Counter(
+    "aqi_cache_lookups_total",
+    "AQI response cache lookups by result (hit, stale, miss).",
+    ["result"],
+)
+CHATBOT_SECONDS = Histogram(
+    "aqi_chatbot_seconds",
+    "Chatbot answer latency by outcome (model, cached, fallback).",
+    ["backend", "outcome"],
+)
+CHATBOT_FIRST_CHUNK_SECONDS = Histogram(
+    "aqi_chatbot_first_chunk_seconds",
+    "Time until the model's first chunk.",
+    ["backend"],
+)
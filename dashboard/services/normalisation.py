@@ -1,8 +1,19 @@
+import time
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, Iterable, List, Tuple
 
+from .rolling_window import aggregator as window_aggregator
+
+
+def normalize_pollutants(raw_measurements: List[Dict], now: float | None = None) -> Dict:
+    # readings that carry sensor and time information get standards-correct
+    # window averages (ending at now); bare {"parameter", "value"} items
+    # keep the max
+    if raw_measurements and all(
+        "sensor_id" in m and "datetime" in m for m in raw_measurements
+    ):
+        return normalize_window_averages(raw_measurements, now=now)
 
-def normalize_pollutants(raw_measurements: List[Dict]) -> Dict:
     grouped = defaultdict(list)
 
     for m in raw_measurements:
@@ -16,6 +27,127 @@ def normalize_pollutants(raw_measurements: List[Dict]) -> Dict:
         normalised[parameter] = max(values)
 
     return normalised
+
+
+def normalize_window_averages(
+    raw_measurements: List[Dict],
+    aggregator=window_aggregator,
+    now: float | None = None,
+) -> Dict:
+    """
+    CPCB-style normalization: feeds the readings into the rolling windows,
+    then takes each sensor's 24 h (8 h for CO/O3) average. Across sensors
+    the highest average is kept, as the max is kept for raw values.
+    """
+
+    aggregator.ingest(raw_measurements)
+    now = time.time() if now is None else now
+
+    grouped = defaultdict(list)
+    for sensor_id, parameter in {
+        (m["sensor_id"], m["parameter"]) for m in raw_measurements
+    }:
+        mean = aggregator.sensor_mean(sensor_id, parameter, now)
+        if mean is not None:
+            grouped[parameter].append(mean)
+
+    return {
+        parameter: round(max(values), 2)
+        for parameter, values in grouped.items()
+    }
+
+
+# molecular weights (g/mol) for ppb/ppm -> µg/m³ at 25 °C and 1 atm
+MOLECULAR_WEIGHTS = {
+    "no2": 46.0055,
+    "so2": 64.066,
+    "o3": 47.997,
+    "co": 28.010,
+    "nh3": 17.031,
+}
+MOLAR_VOLUME_LITRES = 24.45
+
+# anything above these (µg/m³) is a sensor fault, not air
+PLAUSIBLE_MAX = {
+    "pm25": 1000,
+    "pm10": 2000,
+    "no2": 2000,
+    "so2": 2000,
+    "o3": 1000,
+    "co": 50000,
+    "nh3": 2000,
+}
+
+# (sensor_key, parameter, units, datetime_utc, value)
+Row = Tuple[object, str, str, str, float]
+
+
+def to_micrograms(parameter: str, value: float, units: str | None) -> float | None:
+    """
+    Converts a gas reading in ppb/ppm to µg/m³. Other units pass through;
+    None means the unit cannot be converted for this parameter.
+    """
+
+    units = (units or "").strip().lower()
+    if units not in ("ppb", "ppm"):
+        return value
+
+    weight = MOLECULAR_WEIGHTS.get(parameter)
+    if weight is None:
+        return None
+
+    ppb = value * 1000 if units == "ppm" else value
+    return ppb * weight / MOLAR_VOLUME_LITRES
+
+
+def clean_value(parameter: str, value, units: str | None = None) -> float | None:
+    """
+    Unit-converted value, or None when missing or physically impossible
+    (negative, or above PLAUSIBLE_MAX).
+    """
+
+    if value is None:
+        return None
+
+    value = to_micrograms(parameter, value, units)
+    if value is None or value < 0:
+        return None
+
+    limit = PLAUSIBLE_MAX.get(parameter)
+    if limit is not None and value > limit:
+        return None
+
+    return value
+
+
+def stream_normalize(rows: Iterable[Row]) -> List[Dict]:
+    """
+    One pass over raw OpenAQ rows: converts units, drops impossible values
+    and keeps only the newest reading per sensor.
+
+    Returns [{"sensor_id", "parameter", "datetime", "value"}, ...], one item
+    per sensor, ready for normalize_pollutants.
+    """
+
+    newest = {}
+
+    for sensor_key, parameter, units, timestamp, value in rows:
+        value = clean_value(parameter, value, units)
+        if value is None:
+            continue
+
+        current = newest.get(sensor_key)
+        if current is None or timestamp > current["datetime"]:
+            newest[sensor_key] = {
+                "sensor_id": sensor_key,
+                "parameter": parameter,
+                "datetime": timestamp,
+                "value": value,
+            }
+
+    return list(newest.values())
+
+
 if __name__ == "__main__":
     sample = [
         {"parameter": "pm25", "value": 300.0},
@@ -0,0 +1,415 @@
+# dashboard/services/openaq_async_service.py
+#
+# asyncio counterpart of openaq_point_service. Talks to the OpenAQ REST API
+# through one pooled httpx.AsyncClient so a single ASGI worker can keep
+# hundreds of upstream requests in flight without a thread each.
+
+import asyncio
+import os
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+from dotenv import load_dotenv
+
+from .metrics import OPENAQ_REQUEST_SECONDS, OPENAQ_RESULTS, timed
+from .normalisation import clean_value, stream_normalize
+from .openaq_point_service import (
+    FETCH_MODE,
+    FETCH_MODES,
+    LOCATIONS_PAGE_SIZE,
+    MAX_CONCURRENT_LOCATION_FETCHES,
+    flatten_sensor_readings,
+    latest_rows,
+    location_rings,
+)
+from .openaq_scheduler import scheduler
+
+if TYPE_CHECKING:
+    import httpx
+
+load_dotenv()
+
+OPENAQ_BASE_URL = os.getenv("OPENAQ_BASE_URL", "https://api.openaq.org/v3")
+
+# every request goes to the one OpenAQ host, so the pool-wide limits below
+# are effectively per-host limits
+MAX_CONNECTIONS = int(os.getenv("OPENAQ_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAQ_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY_SECONDS = 30
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("OPENAQ_TIMEOUT_SECONDS", "10"))
+
+MAX_CONCURRENT_PROBES = int(os.getenv("OPENAQ_MAX_CONCURRENT_PROBES", "5"))
+MAX_CONCURRENT_SENSOR_FETCHES = int(
+    os.getenv("OPENAQ_MAX_CONCURRENT_SENSOR_FETCHES", "8")
+)
+SENSOR_LOOKBACK_HOURS = 3
+
+# an AsyncClient is bound to the event loop it was first used on, so one
+# client is kept per loop (normally exactly one under uvicorn/daphne)
+_clients = weakref.WeakKeyDictionary()
+
+
+def _get_client() -> "httpx.AsyncClient":
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+
+    if client is None or client.is_closed:
+        # imported on first use so sync-only workers never load httpx
+        import httpx
+
+        client = httpx.AsyncClient(
+            base_url=OPENAQ_BASE_URL,
+            headers={"X-API-Key": os.getenv("OPENAQ_API_KEY", "")},
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=REQUEST_TIMEOUT_SECONDS,
+        )
+        _clients[loop] = client
+
+    return client
+
+
+async def aclose_client():
+    """
+    Closes the pooled client of the running loop, e.g. on ASGI shutdown.
+    """
+
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _aget(path: str, params: dict | None = None) -> "httpx.Response":
+    """
+    GET through the OpenAQ scheduler (rate limit, priority, retries);
+    raises httpx.HTTPStatusError for error statuses.
+    """
+
+    async def request():
+        response = await _get_client().get(path, params=params)
+        response.raise_for_status()
+        return response
+
+    return await scheduler.acall(request)
+
+
+async def _aprobe_radius(lat: float, lon: float, radius_km: int, limit: int):
+    """
+    Single OpenAQ measurements query at one radius.
+    """
+
+    with timed(OPENAQ_REQUEST_SECONDS, call="measurements", radius_km=radius_km):
+        response = await _aget(
+            "/measurements",
+            params={
+                "coordinates": f"{lat},{lon}",
+                "radius": radius_km * 1000,  # meters
+                "limit": limit,
+                "sort": "desc",
+                "order_by": "datetime",
+            },
+        )
+
+    results = response.json().get("results") or []
+    OPENAQ_RESULTS.observe(len(results), call="measurements", radius_km=radius_km)
+    return results
+
+
+def _iter_rows(results):
+    for m in results:
+        parameter = m["parameter"]["name"].lower()
+        coordinates = m.get("coordinates") or {}
+        sensor_key = m.get("sensorsId")
+        if sensor_key is None:
+            sensor_key = (parameter, coordinates.get("latitude"), coordinates.get("longitude"))
+
+        yield (
+            sensor_key,
+            parameter,
+            m["parameter"].get("units"),
+            m["period"]["datetimeTo"]["utc"],
+            m.get("value"),
+        )
+
+
+def _build_result(rows, radius_km: int) -> dict:
+    readings = stream_normalize(rows)
+
+    pollutants = {}
+    for r in readings:
+        pollutants.setdefault(r["parameter"], []).append(r["value"])
+
+    return {
+        "pollutants": pollutants,
+        "used_radius_km": radius_km,
+        "sensor_count": len(readings),
+        "readings": readings,
+    }
+
+
+async def _aprobe_radii_concurrently(
+    lat: float,
+    lon: float,
+    radii: list,
+    limit: int,
+    max_concurrency: int,
+):
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def probe(radius):
+        async with semaphore:
+            return await _aprobe_radius(lat, lon, radius, limit)
+
+    tasks = [asyncio.create_task(probe(radius)) for radius in radii]
+    try:
+        for radius, task in zip(radii, tasks):
+            results = await task
+            if results:
+                return radius, results
+
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _parse_location(loc: dict) -> dict:
+    return {
+        "location_id": loc["id"],
+        "lat": loc["coordinates"]["latitude"],
+        "lon": loc["coordinates"]["longitude"],
+        "sensors": [
+            {
+                "sensor_id": sensor["id"],
+                "parameter": sensor["parameter"]["name"].lower(),
+                "units": sensor["parameter"].get("units"),
+            }
+            for sensor in (loc.get("sensors") or [])
+        ],
+    }
+
+
+async def _alist_locations_near(lat: float, lon: float, radius_km: int,
+                                page_size: int = LOCATIONS_PAGE_SIZE) -> list:
+    locations = []
+    page = 1
+
+    while True:
+        with timed(OPENAQ_REQUEST_SECONDS, call="locations_near", radius_km=radius_km):
+            response = await _aget(
+                "/locations",
+                params={
+                    "coordinates": f"{lat},{lon}",
+                    "radius": radius_km * 1000,  # meters
+                    "limit": page_size,
+                    "page": page,
+                },
+            )
+
+        results = response.json().get("results") or []
+        OPENAQ_RESULTS.observe(len(results), call="locations_near", radius_km=radius_km)
+
+        locations.extend(
+            _parse_location(loc) for loc in results if loc.get("coordinates")
+        )
+
+        if len(results) < page_size:
+            return locations
+
+        page += 1
+
+
+async def _afetch_location_latest(location: dict, since: datetime) -> list:
+    with timed(OPENAQ_REQUEST_SECONDS, call="latest"):
+        response = await _aget(f"/locations/{location['location_id']}/latest")
+
+    results = response.json().get("results") or []
+    OPENAQ_RESULTS.observe(len(results), call="latest")
+
+    return latest_rows(
+        location,
+        (
+            (r.get("sensorsId"), (r.get("datetime") or {}).get("utc"), r.get("value"))
+            for r in results
+        ),
+        since,
+    )
+
+
+async def _afetch_latest_by_point(lat: float, lon: float, radii: list,
+                                  max_concurrency: int):
+    locations = await _alist_locations_near(lat, lon, radii[-1])
+    if not locations:
+        return None
+
+    since = datetime.now(timezone.utc) - timedelta(hours=SENSOR_LOOKBACK_HOURS)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    rows = []
+
+    async def fetch(location):
+        async with semaphore:
+            return await _afetch_location_latest(location, since)
+
+    for radius, ring in location_rings(lat, lon, locations, radii):
+        for location_rows in await asyncio.gather(*(fetch(loc) for loc in ring)):
+            rows.extend(location_rows)
+
+        if rows:
+            return radius, rows
+
+    return None
+
+
+async def afetch_measurements_by_point(
+    lat: float,
+    lon: float,
+    radius_km: int = 5,
+    max_radius_km: int = 25,
+    step_km: int = 5,
+    limit: int = 50,
+    concurrent: bool = False,
+    max_concurrency: int = MAX_CONCURRENT_PROBES,
+    mode: str = FETCH_MODE,
+):
+    """
+    Async fetch_measurements_by_point with the same arguments and the same
+    return shape.
+    """
+
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown OpenAQ fetch mode: {mode}")
+
+    radii = list(range(radius_km, max_radius_km + 1, step_km))
+
+    if mode == "latest":
+        found = await _afetch_latest_by_point(
+            lat, lon, radii, MAX_CONCURRENT_LOCATION_FETCHES
+        ) if radii else None
+        if found:
+            return _build_result(found[1], found[0])
+    elif concurrent and len(radii) > 1:
+        found = await _aprobe_radii_concurrently(
+            lat, lon, radii, limit, max_concurrency
+        )
+        if found:
+            return _build_result(_iter_rows(found[1]), found[0])
+    else:
+        for current_radius in radii:
+            results = await _aprobe_radius(lat, lon, current_radius, limit)
+
+            if results:
+                return _build_result(_iter_rows(results), current_radius)
+
+    return {
+        "pollutants": {},
+        "used_radius_km": radii[-1] if radii else radius_km,
+        "sensor_count": 0,
+        "readings": [],
+    }
+
+
+async def _afetch_sensor_readings(sensor_id: int) -> list:
+    since = datetime.now(timezone.utc) - timedelta(hours=SENSOR_LOOKBACK_HOURS)
+    with timed(OPENAQ_REQUEST_SECONDS, call="sensor_measurements"):
+        response = await _aget(
+            f"/sensors/{sensor_id}/measurements",
+            params={"datetime_from": since.isoformat(), "limit": 100},
+        )
+
+    results = response.json().get("results") or []
+    OPENAQ_RESULTS.observe(len(results), call="sensor_measurements")
+
+    readings = []
+    for m in results:
+        parameter = m["parameter"]
+        value = clean_value(parameter["name"].lower(), m.get("value"), parameter.get("units"))
+        if value is not None:
+            readings.append((m["period"]["datetimeTo"]["utc"], value))
+
+    return sorted(readings)
+
+
+async def afetch_measurements_by_sensors(
+    sensors: list,
+    used_radius_km: int,
+    max_concurrency: int = MAX_CONCURRENT_SENSOR_FETCHES,
+):
+    """
+    Async fetch_measurements_by_sensors with the same return shape.
+    """
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(sensor_id):
+        async with semaphore:
+            return await _afetch_sensor_readings(sensor_id)
+
+    results = await asyncio.gather(
+        *(fetch(sensor["sensor_id"]) for sensor in sensors)
+    )
+    readings = {
+        sensor["sensor_id"]: sensor_readings
+        for sensor, sensor_readings in zip(sensors, results)
+        if sensor_readings
+    }
+
+    pollutants = {}
+    for sensor in sensors:
+        sensor_readings = readings.get(sensor["sensor_id"])
+        if sensor_readings:
+            pollutants.setdefault(sensor["parameter"], []).append(sensor_readings[-1][1])
+
+    return {
+        "pollutants": pollutants,
+        "used_radius_km": used_radius_km,
+        "sensor_count": len(readings),
+        "readings": flatten_sensor_readings(sensors, readings),
+    }
+
+
+async def afetch_latest_by_locations(
+    locations: list,
+    used_radius_km: int,
+    max_concurrency: int = MAX_CONCURRENT_LOCATION_FETCHES,
+):
+    """
+    Async fetch_latest_by_locations with the same return shape.
+    """
+
+    since = datetime.now(timezone.utc) - timedelta(hours=SENSOR_LOOKBACK_HOURS)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(location):
+        async with semaphore:
+            return await _afetch_location_latest(location, since)
+
+    rows = []
+    for location_rows in await asyncio.gather(*(fetch(loc) for loc in locations)):
+        rows.extend(location_rows)
+
+    return _build_result(rows, used_radius_km)
+
+
+async def afetch_measurements_by_locations(
+    locations: list,
+    used_radius_km: int,
+    mode: str = FETCH_MODE,
+):
+    """
+    Async fetch_measurements_by_locations.
+    """
+
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown OpenAQ fetch mode: {mode}")
+
+    if mode == "latest":
+        return await afetch_latest_by_locations(locations, used_radius_km)
+
+    return await afetch_measurements_by_sensors(
+        [sensor for loc in locations for sensor in loc["sensors"]],
+        used_radius_km=used_radius_km,
+    )
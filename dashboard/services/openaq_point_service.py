@@ -2,13 +2,315 @@
 # from .services.openaq_point_service import fetch_measurements_by_point
 # services/openaq_point_service.py
 
-from openaq import OpenAQ
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from math import hypot
 import os
 from dotenv import load_dotenv
 
+from .calculate_aqi import SUPPORTED_POLLUTANTS
+from .geo import project_km
+from .metrics import OPENAQ_REQUEST_SECONDS, OPENAQ_RESULTS, timed
+from .normalisation import clean_value, stream_normalize
+from .openaq_scheduler import scheduler, with_current_priority
+
 load_dotenv()
 
-_client = OpenAQ(api_key=os.getenv("OPENAQ_API_KEY"))
+# created on first use: importing the SDK alone costs ~100 ms, which every
+# worker boot and management command would otherwise pay
+_client = None
+_client_lock = threading.Lock()
+
+# upper bound on simultaneous radius probes for one point
+MAX_CONCURRENT_PROBES = int(os.getenv("OPENAQ_MAX_CONCURRENT_PROBES", "5"))
+# upper bound on simultaneous per-sensor fetches for one point
+MAX_CONCURRENT_SENSOR_FETCHES = int(
+    os.getenv("OPENAQ_MAX_CONCURRENT_SENSOR_FETCHES", "8")
+)
+# how far back a per-sensor fetch looks for the newest reading; also the
+# oldest "latest" value still counted as current
+SENSOR_LOOKBACK_HOURS = 3
+
+# how a point lookup reads OpenAQ:
+#   "latest"        locations around the point, then each location's latest
+#                   value per sensor (one fresh reading per sensor)
+#   "measurements"  the newest raw measurements around the point (a busy
+#                   sensor can fill the page and crowd out the others)
+# Concurrent radius probing only applies to "measurements": "latest" already
+# searches the largest radius with one locations query.
+FETCH_MODES = ("latest", "measurements")
+FETCH_MODE = os.getenv("OPENAQ_FETCH_MODE", "latest")
+LOCATIONS_PAGE_SIZE = 100
+# upper bound on simultaneous per-location latest fetches for one point
+MAX_CONCURRENT_LOCATION_FETCHES = int(
+    os.getenv("OPENAQ_MAX_CONCURRENT_LOCATION_FETCHES", "8")
+)
+
+
+def _get_client():
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openaq import OpenAQ
+
+                _client = OpenAQ(api_key=os.getenv("OPENAQ_API_KEY"))
+
+    return _client
+
+
+def _probe_radius(lat: float, lon: float, radius_km: int, limit: int):
+    """
+    Single OpenAQ measurements query at one radius.
+    """
+
+    with timed(OPENAQ_REQUEST_SECONDS, call="measurements", radius_km=radius_km):
+        response = scheduler.call(lambda: _get_client().measurements.list(
+            coordinates=(lat, lon),
+            radius=radius_km * 1000,  # meters
+            limit=limit,
+            sort="desc",
+            order_by="datetime",
+        ))
+
+    results = response.results or []
+    OPENAQ_RESULTS.observe(len(results), call="measurements", radius_km=radius_km)
+    return results
+
+
+def _sensor_key(m, parameter: str):
+    # radius results may not name their sensor; the station coordinates
+    # stand in for it so each station still counts once per parameter
+    sensor_id = getattr(m, "sensors_id", None)
+    if sensor_id is not None:
+        return sensor_id
+
+    coordinates = getattr(m, "coordinates", None)
+    return (
+        parameter,
+        getattr(coordinates, "latitude", None),
+        getattr(coordinates, "longitude", None),
+    )
+
+
+def _iter_rows(results):
+    for m in results:
+        parameter = m.parameter.name.lower()
+        yield (
+            _sensor_key(m, parameter),
+            parameter,
+            m.parameter.units,
+            m.period.datetime_to.utc,
+            m.value,
+        )
+
+
+def _build_result(rows, radius_km: int) -> dict:
+    readings = stream_normalize(rows)
+
+    pollutants = {}
+    for r in readings:
+        pollutants.setdefault(r["parameter"], []).append(r["value"])
+
+    return {
+        "pollutants": pollutants,
+        "used_radius_km": radius_km,
+        "sensor_count": len(readings),
+        "readings": readings,
+    }
+
+
+def _probe_radii_concurrently(
+    lat: float,
+    lon: float,
+    radii: list,
+    limit: int,
+    max_workers: int,
+):
+    """
+    Sends every radius probe at once and returns (radius, results) for the
+    smallest radius that has data, or None.
+
+    Futures are awaited in radius order, so a larger radius that answers
+    first is only used once every smaller one came back empty. Probes that
+    have not started yet are cancelled as soon as a winner is known.
+    """
+
+    executor = ThreadPoolExecutor(
+        max_workers=min(max_workers, len(radii)),
+        thread_name_prefix="openaq-probe",
+    )
+    try:
+        futures = [
+            executor.submit(with_current_priority(_probe_radius), lat, lon, radius, limit)
+            for radius in radii
+        ]
+
+        for radius, future in zip(radii, futures):
+            results = future.result()
+            if results:
+                return radius, results
+
+        return None
+    finally:
+        # in-flight HTTP calls cannot be interrupted; their results are
+        # simply ignored
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_location(loc) -> dict:
+    return {
+        "location_id": loc.id,
+        "lat": loc.coordinates.latitude,
+        "lon": loc.coordinates.longitude,
+        "sensors": [
+            {
+                "sensor_id": sensor.id,
+                "parameter": sensor.parameter.name.lower(),
+                "units": sensor.parameter.units,
+            }
+            for sensor in (loc.sensors or [])
+        ],
+    }
+
+
+def _parse_utc(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    # OpenAQ sends ISO 8601 with a trailing Z
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def location_rings(lat: float, lon: float, locations: list, radii: list):
+    """
+    Yields (radius_km, locations) for each radius: the locations that fall
+    within it but within no smaller one. The last ring also takes anything
+    beyond it, since the upstream search measures distance slightly
+    differently. Locations without a sensor the AQI engine can use are
+    left out.
+    """
+
+    x, y = project_km(lat, lon, lat)
+    ranked = []
+    for i, loc in enumerate(locations):
+        if not any(s["parameter"] in SUPPORTED_POLLUTANTS for s in loc["sensors"]):
+            continue
+        loc_x, loc_y = project_km(loc["lat"], loc["lon"], lat)
+        ranked.append((hypot(loc_x - x, loc_y - y), i))
+    ranked.sort()
+
+    i = 0
+    for radius in radii:
+        ring = []
+        last = radius == radii[-1]
+        while i < len(ranked) and (last or ranked[i][0] <= radius):
+            ring.append(locations[ranked[i][1]])
+            i += 1
+        yield radius, ring
+
+
+def latest_rows(location: dict, latest, since: datetime) -> list:
+    """
+    Normalizer rows from one location's latest values, given as
+    (sensor_id, datetime_utc, value). The latest endpoint does not name
+    the parameter, so it comes from the location's sensor list; values
+    older than since are dropped.
+    """
+
+    sensors = {s["sensor_id"]: s for s in location["sensors"]}
+
+    rows = []
+    for sensor_id, dt, value in latest:
+        sensor = sensors.get(sensor_id)
+        if sensor is None or dt is None or _parse_utc(dt) < since:
+            continue
+        rows.append((sensor_id, sensor["parameter"], sensor["units"], dt, value))
+
+    return rows
+
+
+def _list_locations_near(lat: float, lon: float, radius_km: int,
+                         page_size: int = LOCATIONS_PAGE_SIZE) -> list:
+    """
+    Every location within radius_km of the point, following pagination.
+    """
+
+    locations = []
+    page = 1
+
+    while True:
+        with timed(OPENAQ_REQUEST_SECONDS, call="locations_near", radius_km=radius_km):
+            response = scheduler.call(lambda: _get_client().locations.list(
+                coordinates=(lat, lon),
+                radius=radius_km * 1000,  # meters
+                limit=page_size,
+                page=page,
+            ))
+
+        results = response.results or []
+        OPENAQ_RESULTS.observe(len(results), call="locations_near", radius_km=radius_km)
+
+        locations.extend(
+            _parse_location(loc) for loc in results if loc.coordinates is not None
+        )
+
+        if len(results) < page_size:
+            return locations
+
+        page += 1
+
+
+def _fetch_location_latest(location: dict, since: datetime) -> list:
+    with timed(OPENAQ_REQUEST_SECONDS, call="latest"):
+        response = scheduler.call(
+            lambda: _get_client().locations.latest(location["location_id"])
+        )
+
+    results = response.results or []
+    OPENAQ_RESULTS.observe(len(results), call="latest")
+
+    return latest_rows(
+        location,
+        (
+            (r.sensors_id, r.datetime.utc if r.datetime else None, r.value)
+            for r in results
+        ),
+        since,
+    )
+
+
+def _fetch_latest_by_point(lat: float, lon: float, radii: list, max_workers: int):
+    """
+    (radius, rows) for the smallest radius with a fresh reading, or None.
+
+    One paged locations query covers the largest radius. The latest values
+    of each ring of locations are fetched concurrently, and a ring is only
+    fetched if every smaller one had nothing fresh, so radius expansion
+    costs no extra search.
+    """
+
+    locations = _list_locations_near(lat, lon, radii[-1])
+    if not locations:
+        return None
+
+    since = datetime.now(timezone.utc) - timedelta(hours=SENSOR_LOOKBACK_HOURS)
+    fetch = with_current_priority(_fetch_location_latest)
+    rows = []
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(locations)),
+        thread_name_prefix="openaq-latest",
+    ) as executor:
+        for radius, ring in location_rings(lat, lon, locations, radii):
+            for location_rows in executor.map(lambda loc: fetch(loc, since), ring):
+                rows.extend(location_rows)
+
+            if rows:
+                return radius, rows
+
+    return None
 
 
 def fetch_measurements_by_point(
@@ -18,55 +320,259 @@ def fetch_measurements_by_point(
     max_radius_km: int = 25,
     step_km: int = 5,
     limit: int = 50,
+    concurrent: bool = False,
+    max_workers: int = MAX_CONCURRENT_PROBES,
+    mode: str = FETCH_MODE,
 ):
     """
     Fetch OpenAQ measurements using point + radius.
     If no sensors are found, progressively increase radius.
 
+    mode="latest" (the default, see OPENAQ_FETCH_MODE) reads the latest
+    value of every sensor at the locations in range, so each contributes
+    exactly one reading no older than SENSOR_LOOKBACK_HOURS; limit and
+    concurrent do not apply. mode="measurements" pages the newest limit
+    raw measurements around the point.
+
+    In "measurements" mode, concurrent=True probes all radii at once (at
+    most max_workers in flight) and the smallest one with data wins, so a
+    sparse area costs about one round-trip instead of one per step.
+
+    Results are normalized in one pass: newest reading per sensor, gases
+    converted to µg/m³, impossible values dropped.
+
     Returns:
     {
-        "pollutants": { "pm25": [...], "pm10": [...] },
+        "pollutants": { "pm25": [...], "pm10": [...] },   # one per sensor
         "used_radius_km": int,
-        "sensor_count": int
+        "sensor_count": int,
+        "readings": [{"sensor_id", "parameter", "datetime", "value"}, ...]
     }
     """
 
-    current_radius = radius_km
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown OpenAQ fetch mode: {mode}")
 
-    while current_radius <= max_radius_km:
-        response = _client.measurements.list(
-            coordinates=(lat, lon),
-            radius=current_radius * 1000,  # meters
-            limit=limit,
-            sort="desc",
-            order_by="datetime",
-        )
+    radii = list(range(radius_km, max_radius_km + 1, step_km))
+
+    if mode == "latest":
+        found = _fetch_latest_by_point(
+            lat, lon, radii, MAX_CONCURRENT_LOCATION_FETCHES
+        ) if radii else None
+        if found:
+            return _build_result(found[1], found[0])
+    elif concurrent and len(radii) > 1:
+        found = _probe_radii_concurrently(lat, lon, radii, limit, max_workers)
+        if found:
+            return _build_result(_iter_rows(found[1]), found[0])
+    else:
+        for current_radius in radii:
+            results = _probe_radius(lat, lon, current_radius, limit)
+
+            if results:
+                return _build_result(_iter_rows(results), current_radius)
+
+    # No data found even at max radius
+    return {
+        "pollutants": {},
+        "used_radius_km": radii[-1] if radii else radius_km,
+        "sensor_count": 0,
+        "readings": [],
+    }
+
+
+def fetch_locations_in_bbox(bbox: tuple, page_size: int = 1000) -> list:
+    """
+    Bulk-loads every OpenAQ location inside bbox (min_lon, min_lat,
+    max_lon, max_lat), following pagination.
+
+    Returns:
+    [
+        {
+            "location_id": int,
+            "lat": float,
+            "lon": float,
+            "sensors": [{"sensor_id": int, "parameter": "pm25", "units": "µg/m³"}, ...]
+        }
+    ]
+    """
+
+    locations = []
+    page = 1
+
+    while True:
+        with timed(OPENAQ_REQUEST_SECONDS, call="locations"):
+            response = scheduler.call(
+                lambda: _get_client().locations.list(bbox=bbox, limit=page_size, page=page)
+            )
 
         results = response.results or []
+        OPENAQ_RESULTS.observe(len(results), call="locations")
 
-        if results:
-            pollutants = {}
-            for m in results:
-                param = m.parameter.name.lower()
-                value = m.value
+        locations.extend(
+            _parse_location(loc) for loc in results if loc.coordinates is not None
+        )
 
-                if value is None:
-                    continue
+        if len(results) < page_size:
+            return locations
 
-                pollutants.setdefault(param, []).append(value)
+        page += 1
 
-            return {
-                "pollutants": pollutants,
-                "used_radius_km": current_radius,
-                "sensor_count": len(results),
-            }
 
-        # No data → expand radius
-        current_radius += step_km
+def _fetch_sensor_readings(sensor_id: int) -> list:
+    """
+    Every measurement of one sensor within the lookback window, as
+    (datetime_utc, value) pairs sorted oldest first.
+    """
+
+    since = datetime.now(timezone.utc) - timedelta(hours=SENSOR_LOOKBACK_HOURS)
+    with timed(OPENAQ_REQUEST_SECONDS, call="sensor_measurements"):
+        response = scheduler.call(lambda: _get_client().measurements.list(
+            sensors_id=sensor_id,
+            data="measurements",  # raw readings, not hourly/daily rollups
+            datetime_from=since.isoformat(),
+            limit=100,
+        ))
+
+    results = response.results or []
+    OPENAQ_RESULTS.observe(len(results), call="sensor_measurements")
+
+    readings = []
+    for m in results:
+        value = clean_value(m.parameter.name.lower(), m.value, m.parameter.units)
+        if value is not None:
+            readings.append((m.period.datetime_to.utc, value))
+
+    return sorted(readings)
+
+
+def fetch_sensor_readings(
+    sensor_ids: list,
+    max_workers: int = MAX_CONCURRENT_SENSOR_FETCHES,
+) -> dict:
+    """
+    Recent readings of each sensor, fetched concurrently.
+
+    Returns { sensor_id: [(datetime_utc, value), ...] } for sensors that
+    reported within the lookback window, oldest reading first.
+    """
+
+    if not sensor_ids:
+        return {}
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(sensor_ids)),
+        thread_name_prefix="openaq-sensor",
+    ) as executor:
+        readings = executor.map(with_current_priority(_fetch_sensor_readings), sensor_ids)
+
+        return {
+            sensor_id: sensor_readings
+            for sensor_id, sensor_readings in zip(sensor_ids, readings)
+            if sensor_readings
+        }
+
+
+def flatten_sensor_readings(sensors: list, readings: dict) -> list:
+    """
+    [{"sensor_id", "parameter", "datetime", "value"}, ...] for storage.
+    """
+
+    return [
+        {
+            "sensor_id": sensor["sensor_id"],
+            "parameter": sensor["parameter"],
+            "datetime": dt,
+            "value": value,
+        }
+        for sensor in sensors
+        for dt, value in readings.get(sensor["sensor_id"], ())
+    ]
+
+
+def fetch_measurements_by_sensors(
+    sensors: list,
+    used_radius_km: int,
+    max_workers: int = MAX_CONCURRENT_SENSOR_FETCHES,
+):
+    """
+    Fetch the newest reading of each known sensor directly by ID, with no
+    radius search.
+
+    sensors is a list of {"sensor_id", "parameter"} dicts, e.g. from
+    sensor_catalog.nearest_sensors. Returns the same shape as
+    fetch_measurements_by_point, plus every fetched reading under
+    "readings" so it can be persisted.
+    """
+
+    readings = fetch_sensor_readings(
+        [sensor["sensor_id"] for sensor in sensors],
+        max_workers=max_workers,
+    )
+
+    pollutants = {}
+    for sensor in sensors:
+        sensor_readings = readings.get(sensor["sensor_id"])
+        if sensor_readings:
+            # newest reading
+            pollutants.setdefault(sensor["parameter"], []).append(sensor_readings[-1][1])
 
-    # No data found even at max radius
     return {
-        "pollutants": {},
-        "used_radius_km": current_radius - step_km,
-        "sensor_count": 0,
+        "pollutants": pollutants,
+        "used_radius_km": used_radius_km,
+        "sensor_count": len(readings),
+        "readings": flatten_sensor_readings(sensors, readings),
     }
+
+
+def fetch_latest_by_locations(
+    locations: list,
+    used_radius_km: int,
+    max_workers: int = MAX_CONCURRENT_LOCATION_FETCHES,
+):
+    """
+    Latest value of every sensor at known locations, one latest call per
+    location and no search. Values older than SENSOR_LOOKBACK_HOURS and
+    sensors not listed on the location are dropped.
+
+    locations are {"location_id", "sensors", ...} dicts, e.g. from
+    sensor_catalog.nearest_locations. Returns the same shape as
+    fetch_measurements_by_point.
+    """
+
+    since = datetime.now(timezone.utc) - timedelta(hours=SENSOR_LOOKBACK_HOURS)
+    rows = []
+
+    if locations:
+        fetch = with_current_priority(_fetch_location_latest)
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(locations)),
+            thread_name_prefix="openaq-latest",
+        ) as executor:
+            for location_rows in executor.map(lambda loc: fetch(loc, since), locations):
+                rows.extend(location_rows)
+
+    return _build_result(rows, used_radius_km)
+
+
+def fetch_measurements_by_locations(
+    locations: list,
+    used_radius_km: int,
+    mode: str = FETCH_MODE,
+):
+    """
+    Readings of the sensors at known locations: their latest values
+    (mode="latest") or each sensor's recent history
+    (mode="measurements", see fetch_measurements_by_sensors).
+    """
+
+    if mode not in FETCH_MODES:
+        raise ValueError(f"Unknown OpenAQ fetch mode: {mode}")
+
+    if mode == "latest":
+        return fetch_latest_by_locations(locations, used_radius_km)
+
+    return fetch_measurements_by_sensors(
+        [sensor for loc in locations for sensor in loc["sensors"]],
+        used_radius_km=used_radius_km,
+    )
@@ -0,0 +1,418 @@
+# dashboard/services/openaq_scheduler.py
+#
+# Every OpenAQ request goes through one scheduler per process:
+#
+# - a token bucket sized to the API quota, corrected by the provider's
+#   x-ratelimit-* response headers;
+# - priority classes: interactive lookups take tokens first, and
+#   background refreshes and backfills may not drain the bucket below a
+#   reserve kept for users;
+# - jittered exponential backoff on 429 and 5xx responses;
+# - the OpenAQ circuit breaker, so an outage fails calls fast instead of
+#   queueing them.
+#
+# The priority of the current call is a contextvar, so callers mark a whole
+# code path (a prefetch run, a grid rebuild) instead of each request.
+
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from .circuit_breaker import CircuitBreaker, openaq_breaker
+from .metrics import OPENAQ_QUEUE_SECONDS, OPENAQ_RETRIES
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0  # user-facing point and area lookups
+REFRESH = 1      # prefetch and stale-while-revalidate refreshes
+BACKFILL = 2     # catalog and grid rebuilds, bulk history
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", REFRESH: "refresh", BACKFILL: "backfill"}
+
+# OpenAQ's default quota is 60 requests a minute; 0 disables throttling
+RATE_PER_MINUTE = float(os.getenv("OPENAQ_RATE_PER_MINUTE", "60"))
+BURST = int(os.getenv("OPENAQ_BURST", "60"))
+# share of the bucket only interactive calls may use
+RESERVE_FRACTION = {INTERACTIVE: 0.0, REFRESH: 0.3, BACKFILL: 0.6}
+# an interactive call gives up rather than queue longer than this;
+# background calls wait as long as it takes
+INTERACTIVE_MAX_WAIT_SECONDS = float(os.getenv("OPENAQ_MAX_QUEUE_SECONDS", "10"))
+
+MAX_RETRIES = int(os.getenv("OPENAQ_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+
+_priority = contextvars.ContextVar("openaq_priority", default=INTERACTIVE)
+
+
+class RateLimited(Exception):
+    """
+    Raised when an interactive call cannot get a token in time.
+    """
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(level: int):
+    """
+    OpenAQ calls made inside the block (and by tasks it starts) are
+    scheduled at this priority.
+    """
+
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def with_current_priority(fn):
+    """
+    fn wrapped to run at the caller's priority; for work handed to a
+    thread pool, whose threads do not inherit contextvars.
+    """
+
+    level = _priority.get()
+
+    def run(*args, **kwargs):
+        with request_priority(level):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def _status_of(exc: BaseException):
+    # httpx.HTTPStatusError carries the response; SDK errors a status_code
+    response = getattr(exc, "response", None)
+    if response is not None:
+        return getattr(response, "status_code", None)
+    return getattr(exc, "status_code", None)
+
+
+def _is_retryable(status) -> bool:
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def _is_outage(status) -> bool:
+    # no status: connection error or timeout. 429s and other 4xx mean the
+    # API is up and answering
+    return status is None or status == 408 or status >= 500
+
+
+def _rate_limit_headers(response):
+    """
+    (limit, remaining, reset_seconds) from an SDK or httpx response, or
+    None when the provider sent no rate-limit headers.
+    """
+
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+
+    if hasattr(headers, "x_ratelimit_limit"):
+        # the SDK reports absent headers as 0
+        limit = headers.x_ratelimit_limit
+        remaining = headers.x_ratelimit_remaining
+        reset = headers.x_ratelimit_reset
+    else:
+        try:
+            limit = int(headers.get("x-ratelimit-limit", 0))
+            remaining = int(headers.get("x-ratelimit-remaining", 0))
+            reset = int(headers.get("x-ratelimit-reset", 0))
+        except (TypeError, ValueError):
+            return None
+
+    if not limit:
+        return None
+    return limit, remaining, reset
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Full-jitter exponential backoff: uniform in [0, base * 2^attempt],
+    capped.
+    """
+
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class OpenAQScheduler:
+    """
+    Token bucket with priority admission. A caller may take a token when
+    no higher-priority caller is waiting and the bucket stays above its
+    class's reserve; otherwise it waits for the refill.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float = RATE_PER_MINUTE,
+        burst: int = BURST,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.breaker = breaker
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting = {level: 0 for level in PRIORITY_NAMES}
+        self._cond = threading.Condition()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, level: int) -> float:
+        """
+        Takes a token and returns 0, or returns how long to wait. Caller
+        holds the lock.
+        """
+
+        now = time.monotonic()
+        self._refill(now)
+
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        if any(self._waiting[higher] for higher in range(level)):
+            # let the more important callers go first
+            return 1 / self.rate
+
+        reserve = RESERVE_FRACTION[level] * self.capacity
+        if self.tokens - 1 >= reserve:
+            self.tokens -= 1
+            return 0.0
+
+        return (reserve + 1 - self.tokens) / self.rate
+
+    def _max_wait(self, level: int):
+        return INTERACTIVE_MAX_WAIT_SECONDS if level == INTERACTIVE else None
+
+    def acquire(self, level: int | None = None):
+        """
+        Blocks until a token is available at the given (or current)
+        priority. Raises RateLimited if an interactive call would wait
+        longer than INTERACTIVE_MAX_WAIT_SECONDS.
+        """
+
+        if self.unlimited:
+            return
+
+        level = current_priority() if level is None else level
+        started = time.monotonic()
+        max_wait = self._max_wait(level)
+
+        with self._cond:
+            wait = self._try_take(level)
+            if wait:
+                self._waiting[level] += 1
+                try:
+                    while wait:
+                        if max_wait is not None and time.monotonic() - started + wait > max_wait:
+                            raise RateLimited(f"OpenAQ quota exhausted for {wait:.1f}s")
+                        self._cond.wait(wait)
+                        wait = self._try_take(level)
+                finally:
+                    self._waiting[level] -= 1
+                    self._cond.notify_all()
+
+        OPENAQ_QUEUE_SECONDS.observe(time.monotonic() - started, priority=PRIORITY_NAMES[level])
+
+    async def aacquire(self, level: int | None = None):
+        """
+        acquire() for coroutines: waits with asyncio.sleep, never blocking
+        the event loop.
+        """
+
+        if self.unlimited:
+            return
+
+        level = current_priority() if level is None else level
+        started = time.monotonic()
+        max_wait = self._max_wait(level)
+
+        with self._cond:
+            wait = self._try_take(level)
+            if wait:
+                self._waiting[level] += 1
+
+        if wait:
+            try:
+                while wait:
+                    if max_wait is not None and time.monotonic() - started + wait > max_wait:
+                        raise RateLimited(f"OpenAQ quota exhausted for {wait:.1f}s")
+                    await asyncio.sleep(wait)
+                    with self._cond:
+                        wait = self._try_take(level)
+            finally:
+                with self._cond:
+                    self._waiting[level] -= 1
+                    self._cond.notify_all()
+
+        OPENAQ_QUEUE_SECONDS.observe(time.monotonic() - started, priority=PRIORITY_NAMES[level])
+
+    def _retry_delay(self, exc: BaseException, status: int, attempt: int, level: int):
+        """
+        Seconds to wait before retrying, or None to give up.
+        """
+
+        if attempt >= MAX_RETRIES:
+            return None
+
+        delay = backoff_delay(attempt)
+        if status == 429:
+            headers = _rate_limit_headers(getattr(exc, "response", None))
+            if headers and headers[2]:
+                delay = max(delay, headers[2])
+            self.throttled(delay)
+
+        if level == INTERACTIVE and delay > INTERACTIVE_MAX_WAIT_SECONDS:
+            return None
+        return delay
+
+    def _fail_fast(self):
+        # checked before queueing: no point waiting for a token to call a
+        # service that is known to be down
+        if self.breaker is not None and self.breaker.is_open():
+            self.breaker.before_call()
+
+    def _admit(self):
+        if self.breaker is not None:
+            self.breaker.before_call()
+
+    async def _aadmit(self):
+        if self.breaker is not None:
+            await self.breaker.abefore_call()
+
+    def _record(self, started: float, failed: bool):
+        if self.breaker is not None:
+            self.breaker.record(time.monotonic() - started, failed)
+
+    def _release(self):
+        if self.breaker is not None:
+            self.breaker.release()
+
+    def call(self, fn):
+        """
+        fn() once a token is granted at the current priority, retried with
+        jittered exponential backoff on 429 and 5xx. Raises CircuitOpen
+        while the breaker is open.
+        """
+
+        level = current_priority()
+        attempt = 0
+
+        while True:
+            self._fail_fast()
+            self.acquire(level)
+            self._admit()
+            started = time.monotonic()
+            try:
+                response = fn()
+            except Exception as exc:
+                status = _status_of(exc)
+                self._record(started, _is_outage(status))
+                delay = self._retry_delay(exc, status, attempt, level) if _is_retryable(status) else None
+                if delay is None:
+                    raise
+
+                OPENAQ_RETRIES.inc(priority=PRIORITY_NAMES[level], status=status)
+                logger.warning("OpenAQ %s, retry %d in %.2fs", status, attempt + 1, delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # cancelled or interrupted: no outcome, but the probe slot
+                # must not stay taken
+                self._release()
+                raise
+
+            self._record(started, False)
+            self.observe(response)
+            return response
+
+    async def acall(self, coro_fn):
+        """
+        Async call(): coro_fn() is awaited once a token is granted.
+        """
+
+        level = current_priority()
+        attempt = 0
+
+        while True:
+            self._fail_fast()
+            await self.aacquire(level)
+            await self._aadmit()
+            started = time.monotonic()
+            try:
+                response = await coro_fn()
+            except Exception as exc:
+                status = _status_of(exc)
+                self._record(started, _is_outage(status))
+                delay = self._retry_delay(exc, status, attempt, level) if _is_retryable(status) else None
+                if delay is None:
+                    raise
+
+                OPENAQ_RETRIES.inc(priority=PRIORITY_NAMES[level], status=status)
+                logger.warning("OpenAQ %s, retry %d in %.2fs", status, attempt + 1, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # cancelled or interrupted: no outcome, but the probe slot
+                # must not stay taken
+                self._release()
+                raise
+
+            self._record(started, False)
+            self.observe(response)
+            return response
+
+    def observe(self, response):
+        """
+        Aligns the bucket with the provider's view of the quota.
+        """
+
+        headers = _rate_limit_headers(response)
+        if headers is None:
+            return
+
+        _, remaining, reset = headers
+        with self._cond:
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + reset)
+
+    def throttled(self, delay: float):
+        """
+        A 429 arrived: nobody sends for delay seconds.
+        """
+
+        with self._cond:
+            self.tokens = 0.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "tokens": round(self.tokens, 2),
+                "capacity": self.capacity,
+                "rate_per_minute": self.rate * 60,
+                "waiting": {PRIORITY_NAMES[k]: v for k, v in self._waiting.items()},
+            }
+
+
+scheduler = OpenAQScheduler(breaker=openaq_breaker)
@@ -0,0 +1,154 @@
+# dashboard/services/prefetch.py
+#
+# Keeps every area in AREAS warm by refreshing it shortly before its cache
+# entry expires, so get_area_air_quality never pays the OpenAQ fetch on a
+# user request.
+
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .area_service import get_area_air_quality
+from .cache import CACHE_TTL_SECONDS
+from .openaq_scheduler import REFRESH, request_priority
+from dashboard.metadata.areas import AREAS
+
+logger = logging.getLogger(__name__)
+
+# refresh this long before the entry would expire
+PREFETCH_LEAD_SECONDS = int(os.getenv("AQI_PREFETCH_LEAD_SECONDS", "600"))
+# +/- spread so the areas do not all hit OpenAQ in the same second;
+# must stay below PREFETCH_LEAD_SECONDS or an entry can expire first
+PREFETCH_JITTER_SECONDS = int(os.getenv("AQI_PREFETCH_JITTER_SECONDS", "120"))
+PREFETCH_MAX_WORKERS = int(os.getenv("AQI_PREFETCH_MAX_WORKERS", "4"))
+
+_worker = None
+_worker_lock = threading.Lock()
+_stop_event = threading.Event()
+
+
+def refresh_area(area_id: str) -> dict:
+    """
+    Recomputes one area, bypassing the cache, and stores the result. Its
+    OpenAQ calls yield to interactive lookups.
+    """
+
+    with request_priority(REFRESH):
+        return get_area_air_quality(area_id, force_refresh=True)
+
+
+def refresh_areas(area_ids, max_workers: int = PREFETCH_MAX_WORKERS) -> dict:
+    """
+    Refreshes the given areas with at most max_workers in parallel.
+
+    Returns {area_id: "ok" | "no_data" | "error"}; one failing area never
+    stops the others.
+    """
+
+    area_ids = list(area_ids)
+    if not area_ids:
+        return {}
+
+    def run(area_id):
+        try:
+            result = refresh_area(area_id)
+        except Exception:
+            logger.exception("prefetch failed for %s", area_id)
+            return area_id, "error"
+
+        return area_id, result.get("status", "ok")
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(area_ids)),
+        thread_name_prefix="aqi-prefetch",
+    ) as executor:
+        return dict(executor.map(run, area_ids))
+
+
+def refresh_all_areas(max_workers: int = PREFETCH_MAX_WORKERS) -> dict:
+    return refresh_areas(AREAS.keys(), max_workers=max_workers)
+
+
+def _next_due(now: float, interval: float, jitter: float) -> float:
+    return now + interval + random.uniform(-jitter, jitter)
+
+
+def run_prefetch_loop(
+    stop_event: threading.Event,
+    lead_seconds: int = PREFETCH_LEAD_SECONDS,
+    jitter_seconds: int = PREFETCH_JITTER_SECONDS,
+    max_workers: int = PREFETCH_MAX_WORKERS,
+):
+    """
+    Blocks until stop_event is set, refreshing each area every
+    (TTL - lead) seconds +/- jitter.
+
+    Every area is refreshed once at start-up (spread over the jitter
+    window), then scheduled independently, so refreshes stay staggered.
+    """
+
+    interval = max(CACHE_TTL_SECONDS - lead_seconds, 1)
+    jitter = min(jitter_seconds, lead_seconds)
+
+    now = time.time()
+    schedule = [(now + random.uniform(0, jitter), area_id) for area_id in AREAS]
+    heapq.heapify(schedule)
+
+    while not stop_event.is_set():
+        wait = schedule[0][0] - time.time()
+        if wait > 0 and stop_event.wait(wait):
+            break
+
+        now = time.time()
+        due = []
+        while schedule and schedule[0][0] <= now:
+            due.append(heapq.heappop(schedule)[1])
+
+        statuses = refresh_areas(due, max_workers=max_workers)
+        logger.info("prefetched %d areas: %s", len(due), statuses)
+
+        done = time.time()
+        for area_id in due:
+            heapq.heappush(schedule, (_next_due(done, interval, jitter), area_id))
+
+
+def start_prefetch_worker() -> threading.Thread:
+    """
+    Starts the in-process prefetch loop in a daemon thread (idempotent).
+    """
+
+    global _worker
+
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return _worker
+
+        _stop_event.clear()
+        _worker = threading.Thread(
+            target=run_prefetch_loop,
+            args=(_stop_event,),
+            name="aqi-prefetch-scheduler",
+            daemon=True,
+        )
+        _worker.start()
+        return _worker
+
+
+def start_in_process_prefetch():
+    """
+    Starts the prefetch worker if AQI_PREFETCH_IN_PROCESS is set. Called
+    from the WSGI/ASGI entry points only.
+    """
+
+    from django.conf import settings
+
+    if settings.AQI_PREFETCH_IN_PROCESS:
+        start_prefetch_worker()
+
+
+def stop_prefetch_worker():
+    _stop_event.set()
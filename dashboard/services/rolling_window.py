@@ -0,0 +1,141 @@
+# dashboard/services/rolling_window.py
+#
+# Incremental sliding-window averages per sensor and pollutant. CPCB AQI is
+# defined on 24-hour averages (8-hour for CO and O3), so readings are kept in
+# a per-sensor window with a running sum: adding a reading and evicting
+# expired ones are O(1) amortized, and the mean never rescans history.
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+# CPCB averaging periods in hours
+CPCB_WINDOW_HOURS = {
+    "pm25": 24,
+    "pm10": 24,
+    "no2": 24,
+    "so2": 24,
+    "nh3": 24,
+    "co": 8,
+    "o3": 8,
+}
+DEFAULT_WINDOW_HOURS = 24
+
+
+def _as_timestamp(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    # OpenAQ sends ISO 8601 with a trailing Z
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class RollingWindow:
+    """
+    Running mean of the readings in the last window_seconds.
+
+    Readings must arrive oldest first; one at or before the newest stored
+    timestamp is ignored, so re-ingesting an overlapping fetch is a no-op.
+    """
+
+    __slots__ = ("window_seconds", "readings", "total", "last_timestamp")
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.readings = deque()
+        self.total = 0.0
+        self.last_timestamp = float("-inf")
+
+    def add(self, timestamp: float, value: float) -> bool:
+        if timestamp <= self.last_timestamp:
+            return False
+
+        self.readings.append((timestamp, value))
+        self.total += value
+        self.last_timestamp = timestamp
+        self.evict(timestamp)
+        return True
+
+    def evict(self, now: float):
+        cutoff = now - self.window_seconds
+        while self.readings and self.readings[0][0] <= cutoff:
+            _, value = self.readings.popleft()
+            self.total -= value
+
+        if not self.readings:
+            # reset accumulated float error once the window empties
+            self.total = 0.0
+
+    def mean(self, now: Optional[float] = None) -> Optional[float]:
+        if now is not None:
+            self.evict(now)
+
+        if not self.readings:
+            return None
+
+        return self.total / len(self.readings)
+
+    def __len__(self):
+        return len(self.readings)
+
+
+class WindowAggregator:
+    """
+    Thread-safe map of (sensor_id, parameter) -> RollingWindow.
+    """
+
+    def __init__(self, window_hours: Dict[str, int] = CPCB_WINDOW_HOURS):
+        self.window_hours = window_hours
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def _window(self, sensor_id, parameter: str) -> RollingWindow:
+        key = (sensor_id, parameter)
+        window = self._windows.get(key)
+
+        if window is None:
+            hours = self.window_hours.get(parameter, DEFAULT_WINDOW_HOURS)
+            window = self._windows[key] = RollingWindow(hours * 3600)
+
+        return window
+
+    def known(self, sensor_id, parameter: str) -> bool:
+        with self._lock:
+            return (sensor_id, parameter) in self._windows
+
+    def ingest(self, readings: Iterable[dict]) -> int:
+        """
+        Adds [{"sensor_id", "parameter", "datetime", "value"}, ...] and
+        returns how many were new.
+        """
+
+        ordered = sorted(
+            (_as_timestamp(r["datetime"]), r["sensor_id"], r["parameter"], r["value"])
+            for r in readings
+            if r.get("value") is not None
+        )
+
+        added = 0
+        with self._lock:
+            for timestamp, sensor_id, parameter, value in ordered:
+                added += self._window(sensor_id, parameter).add(timestamp, value)
+
+        return added
+
+    def sensor_mean(self, sensor_id, parameter: str, now: Optional[float] = None):
+        with self._lock:
+            window = self._windows.get((sensor_id, parameter))
+            if window is None:
+                return None
+            return window.mean(time.time() if now is None else now)
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+# process-wide aggregator fed by every fetch
+aggregator = WindowAggregator()
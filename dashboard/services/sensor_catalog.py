@@ -0,0 +1,272 @@
+# dashboard/services/sensor_catalog.py
+#
+# Locally held catalog of the OpenAQ locations in Delhi, indexed with a
+# k-d tree so a lat/lon resolves to its nearest sensors without asking
+# OpenAQ to run a geo search.
+
+import heapq
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .calculate_aqi import SUPPORTED_POLLUTANTS
+from .geo import project_km
+from .measurement_store import seed_windows
+from .openaq_point_service import fetch_locations_in_bbox
+from .openaq_scheduler import BACKFILL, request_priority
+from dashboard.metadata.areas import DELHI_BBOX
+
+logger = logging.getLogger(__name__)
+
+CATALOG_REFRESH_SECONDS = 24 * 60 * 60
+# after a failed first load, requests fall back to the radius search for
+# this long instead of retrying the bulk load every time
+CATALOG_RETRY_SECONDS = 5 * 60
+# nearest locations used for one point
+DEFAULT_K = 5
+
+# projection reference: middle of the catalog bbox
+_REF_LAT = (DELHI_BBOX[1] + DELHI_BBOX[3]) / 2
+
+
+class _KDNode:
+    __slots__ = ("point", "item", "axis", "left", "right")
+
+    def __init__(self, point, item, axis, left, right):
+        self.point = point
+        self.item = item
+        self.axis = axis
+        self.left = left
+        self.right = right
+
+
+def _build_kdtree(entries: list, depth: int = 0) -> Optional[_KDNode]:
+    """
+    entries: list of ((x, y), item). Built once per catalog load.
+    """
+
+    if not entries:
+        return None
+
+    axis = depth % 2
+    entries.sort(key=lambda e: e[0][axis])
+    mid = len(entries) // 2
+
+    return _KDNode(
+        point=entries[mid][0],
+        item=entries[mid][1],
+        axis=axis,
+        left=_build_kdtree(entries[:mid], depth + 1),
+        right=_build_kdtree(entries[mid + 1:], depth + 1),
+    )
+
+
+class SensorCatalog:
+    """
+    Immutable snapshot of locations and their sensors.
+    """
+
+    def __init__(self, locations: List[Dict]):
+        self.locations = locations
+        self._root = _build_kdtree([
+            (project_km(loc["lat"], loc["lon"], _REF_LAT), loc)
+            for loc in locations
+        ])
+
+    def __len__(self):
+        return len(self.locations)
+
+    def nearest(self, lat: float, lon: float, k: int = DEFAULT_K,
+                max_distance_km: float = math.inf) -> List[tuple]:
+        """
+        Returns up to k (distance_km, location) pairs, nearest first.
+        """
+
+        if self._root is None or k <= 0:
+            return []
+
+        target = project_km(lat, lon, _REF_LAT)
+        # max-heap of (-distance_sq, tiebreak, location)
+        best = []
+        limit_sq = max_distance_km ** 2
+
+        def visit(node):
+            if node is None:
+                return
+
+            dx = node.point[0] - target[0]
+            dy = node.point[1] - target[1]
+            dist_sq = dx * dx + dy * dy
+
+            if dist_sq <= limit_sq:
+                entry = (-dist_sq, node.item["location_id"], node.item)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif dist_sq < -best[0][0]:
+                    heapq.heapreplace(best, entry)
+
+            diff = target[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+
+            bound_sq = -best[0][0] if len(best) == k else limit_sq
+            if diff * diff <= bound_sq:
+                visit(far)
+
+        visit(self._root)
+
+        return [
+            (math.sqrt(-neg_dist_sq), loc)
+            for neg_dist_sq, _, loc in sorted(best, reverse=True)
+        ]
+
+
+_catalog: Optional[SensorCatalog] = None
+_loaded_at = 0.0
+_failed_at = 0.0
+_load_lock = threading.Lock()
+
+
+def load_catalog() -> SensorCatalog:
+    """
+    Bulk-loads the Delhi catalog from OpenAQ and makes it current.
+    """
+
+    global _catalog, _loaded_at
+
+    locations = []
+    for loc in fetch_locations_in_bbox(DELHI_BBOX):
+        # only sensors the AQI engine can use; this keeps per-point sensor
+        # fetches to the minimum
+        sensors = [
+            s for s in loc["sensors"] if s["parameter"] in SUPPORTED_POLLUTANTS
+        ]
+        if sensors:
+            locations.append({**loc, "sensors": sensors})
+
+    catalog = SensorCatalog(locations)
+
+    _catalog = catalog
+    _loaded_at = time.time()
+    logger.info("sensor catalog loaded: %d locations", len(catalog))
+
+    return catalog
+
+
+def _refresh_in_background():
+    if not _load_lock.acquire(blocking=False):
+        return  # a refresh is already running
+
+    def run():
+        global _failed_at
+
+        try:
+            with request_priority(BACKFILL):
+                catalog = load_catalog()
+            # stored history of the catalogued sensors, so point lookups get
+            # full 24 h averages without reading the database themselves
+            seed_windows([s for loc in catalog.locations for s in loc["sensors"]])
+        except Exception:
+            _failed_at = time.time()
+            logger.exception("sensor catalog refresh failed")
+        finally:
+            _load_lock.release()
+
+    threading.Thread(target=run, name="sensor-catalog-refresh", daemon=True).start()
+
+
+def get_catalog(wait: bool = False) -> Optional[SensorCatalog]:
+    """
+    Current catalog, or None until the first load has finished. The load
+    runs in the background, so a request on a cold worker falls back to
+    the radius search instead of stalling on the bulk load; wait=True
+    loads synchronously, for callers already off the request path. Once a
+    day the catalog is refreshed in the background while the old snapshot
+    keeps serving.
+    """
+
+    global _failed_at
+
+    if _catalog is None:
+        if time.time() - _failed_at < CATALOG_RETRY_SECONDS:
+            return None
+
+        if not wait:
+            _refresh_in_background()
+            return None
+
+        with _load_lock:
+            if _catalog is None:
+                try:
+                    load_catalog()
+                except Exception:
+                    _failed_at = time.time()
+                    raise
+        return _catalog
+
+    if time.time() - _loaded_at > CATALOG_REFRESH_SECONDS:
+        _refresh_in_background()
+
+    return _catalog
+
+
+def nearest_locations(
+    lat: float,
+    lon: float,
+    k: int = DEFAULT_K,
+    max_distance_km: float = 25,
+    step_km: Optional[float] = None,
+):
+    """
+    The k nearest catalogued locations within max_distance_km.
+
+    With step_km the search widens like a radius search expanding in
+    step_km steps: only locations inside the first step that reaches the
+    nearest one are kept, so a location 2 km away is not joined by others
+    20 km away.
+
+    Returns (locations, farthest_km) or None when the catalog is not loaded
+    (yet) or has no location in range, so callers can fall back to a
+    radius search.
+    """
+
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+
+    nearest = catalog.nearest(lat, lon, k, max_distance_km)
+    if not nearest:
+        return None
+
+    if step_km:
+        radius_km = max(math.ceil(nearest[0][0] / step_km), 1) * step_km
+        nearest = [(distance_km, loc) for distance_km, loc in nearest if distance_km <= radius_km]
+
+    return [loc for _, loc in nearest], max(distance_km for distance_km, _ in nearest)
+
+
+def nearest_sensors(
+    lat: float,
+    lon: float,
+    k: int = DEFAULT_K,
+    max_distance_km: float = 25,
+    step_km: Optional[float] = None,
+):
+    """
+    Sensors of the k nearest locations within max_distance_km.
+
+    Returns (sensors, farthest_km) or None, as nearest_locations.
+    """
+
+    nearest = nearest_locations(lat, lon, k, max_distance_km, step_km)
+    if nearest is None:
+        return None
+
+    locations, farthest_km = nearest
+    sensors = [sensor for loc in locations for sensor in loc["sensors"]]
+    if not sensors:
+        return None
+
+    return sensors, farthest_km
@@ -0,0 +1,121 @@
+# dashboard/services/singleflight.py
+#
+# Request coalescing: while one caller (the leader) computes the value for
+# a key, every other caller asking for the same key waits for that result
+# instead of repeating the work. Threads and coroutines share one flight
+# per key, so a cache stampede costs a single upstream fetch whether the
+# requests arrive through sync or async views.
+#
+# A leader that is cancelled (client gone, losing task of a race) has no
+# result to share: its waiters are released to start a new flight instead
+# of failing with its CancelledError.
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class _Abandoned(Exception):
+    """
+    Set on a flight whose leader stopped without a result or an error.
+    """
+
+
+class SingleFlight:
+    """
+    Per-key call deduplication. A leader's result or exception is handed to
+    every caller that joined while it was running; the next call after it
+    finishes starts a new flight.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.shared = 0
+
+    def _join(self, key) -> tuple:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+
+            future = self._calls[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _settle(self, key, future: Future, result=None, error=None):
+        # unregister first: anyone arriving from now on starts fresh
+        with self._lock:
+            self._calls.pop(key, None)
+
+        if isinstance(error, Exception):
+            future.set_exception(error)
+        elif error is not None:
+            # cancellation, interpreter exit: not the waiters' outcome
+            future.set_exception(_Abandoned())
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        """
+        Returns fn() for the key, running it at most once at a time.
+        """
+
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except _Abandoned:
+                continue
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+
+        self._settle(key, future, result=result)
+        return result
+
+    async def ado(self, key, coro_fn):
+        """
+        Async do(): the leader awaits coro_fn(); waiters await its result
+        without blocking the event loop, even if the leader is a thread.
+        """
+
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # shielded: a cancelled waiter must not cancel the shared
+                # future under the leader and the other waiters
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _Abandoned:
+                continue
+
+        try:
+            result = await coro_fn()
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+
+        self._settle(key, future, result=result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "shared": self.shared,
+            }
@@ -1,3 +1,1567 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import math
+import random
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from dashboard.services import aqi_grid, area_service
+from dashboard.services import calculate_aqi as aqi_module
+from dashboard.services import chatbot_service
+from dashboard.services import cache as cache_module
+from dashboard.services.cache import DjangoCacheBackend, LRUCache
+from dashboard.services.normalisation import normalize_window_averages
+from dashboard.services.rolling_window import (
+    RollingWindow,
+    WindowAggregator,
+    _as_timestamp,
+    aggregator as window_aggregator,
+)
+from dashboard.services.singleflight import SingleFlight
+
+
+class FakeClock:
+    """
+    Stand-in for the time module: time() and monotonic() return a value
+    the test moves forward; sleep() advances it.
+    """
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class LRUCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(cache_module, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_evicts_least_recently_used_first(self):
+        lru = LRUCache(max_entries=3, max_bytes=10**9)
+        for key in ("a", "b", "c"):
+            lru.set(key, {"v": key})
+
+        lru.get("a")  # a is now the most recent
+        lru.set("d", {"v": "d"})
+
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.get("a"), {"v": "a"})
+        self.assertEqual(lru.get("c"), {"v": "c"})
+        self.assertEqual(lru.get("d"), {"v": "d"})
+        self.assertEqual(lru.stats()["evictions"], 1)
+
+    def test_overwrite_does_not_grow(self):
+        lru = LRUCache(max_entries=2, max_bytes=10**9)
+        lru.set("a", 1)
+        lru.set("a", 2)
+        lru.set("b", 3)
+
+        self.assertEqual(lru.get("a"), 2)
+        self.assertEqual(lru.stats()["entries"], 2)
+        self.assertEqual(lru.stats()["evictions"], 0)
+
+    def test_entry_expires_after_its_ttl(self):
+        lru = LRUCache(default_ttl=60)
+        lru.set("default", {"aqi": 1})
+        lru.set("short", {"aqi": 2}, ttl_seconds=10)
+
+        self.clock.advance(10)
+        self.assertEqual(lru.get("short"), {"aqi": 2})  # not past the ttl yet
+
+        self.clock.advance(1)
+        self.assertIsNone(lru.get("short"))
+        self.assertEqual(lru.get("default"), {"aqi": 1})
+
+        self.clock.advance(50)
+        self.assertIsNone(lru.get("default"))
+        self.assertEqual(lru.stats()["expirations"], 2)
+
+    def test_get_entry_reports_store_time(self):
+        lru = LRUCache()
+        lru.set("a", {"aqi": 1})
+        stored_at = self.clock.now
+        self.clock.advance(5)
+
+        self.assertEqual(lru.get_entry("a"), {"timestamp": stored_at, "data": {"aqi": 1}})
+
+    def test_purge_sweeps_expired_entries(self):
+        lru = LRUCache(default_ttl=10)
+        lru.set("a", 1)
+        lru.set("b", 2, ttl_seconds=100)
+        self.clock.advance(11)
+
+        self.assertEqual(lru.purge_expired(), 1)
+        self.assertEqual(lru.stats()["entries"], 1)
+
+    def test_byte_budget_evicts_oldest(self):
+        value = {"payload": "x" * 1000}
+        size = cache_module._estimate_size(value)
+        lru = LRUCache(max_entries=100, max_bytes=size * 2 + size // 2)
+
+        lru.set("a", value)
+        lru.set("b", value)
+        lru.set("c", value)
+
+        self.assertIsNone(lru.get("a"))
+        self.assertIsNotNone(lru.get("b"))
+        self.assertIsNotNone(lru.get("c"))
+        self.assertLessEqual(lru.stats()["bytes"], lru.max_bytes)
+
+    def test_value_larger_than_budget_is_not_stored(self):
+        lru = LRUCache(max_bytes=100)
+        lru.set("big", {"payload": "x" * 1000})
+
+        self.assertIsNone(lru.get("big"))
+        self.assertEqual(lru.stats()["bytes"], 0)
+
+
+def _point_fetch(lat, lon, radius_km=5, concurrent=False):
+    # bare readings: normalize keeps the max, no rolling window involved
+    readings = [
+        {"parameter": "pm25", "value": 90.0},
+        {"parameter": "pm10", "value": 150.0},
+    ]
+    return readings, {"used_radius_km": 5, "measurement_count": 2}
+
+
+async def _apoint_fetch(*args, **kwargs):
+    return _point_fetch(*args, **kwargs)
+
+
+class NoDataCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetch = mock.Mock(return_value=([], {"used_radius_km": 25, "measurement_count": 0}))
+        patches = [
+            mock.patch.object(cache_module, "time", self.clock),
+            mock.patch.object(area_service, "time", self.clock),
+            mock.patch.object(cache_module, "_backend", LRUCache()),
+            mock.patch.object(area_service, "_fetch_raw_measurements_from_point", self.fetch),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_empty_cell_is_cached_briefly(self):
+        first = area_service.get_point_air_quality(10.0, 10.0)
+        second = area_service.get_point_air_quality(10.0, 10.0)
+
+        self.assertEqual(first["status"], "no_data")
+        self.assertEqual(second["status"], "no_data")
+        self.assertEqual(self.fetch.call_count, 1)
+
+        self.clock.advance(area_service.NO_DATA_TTL_SECONDS + 1)
+        area_service.get_point_air_quality(10.0, 10.0)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_empty_cell_keeps_the_last_good_response(self):
+        cache_key, _ = area_service._point_cache_keys(10.0, 10.0)
+        self.fetch.return_value = _point_fetch(10.0, 10.0)
+        area_service.get_point_air_quality(10.0, 10.0, force_refresh=True)
+
+        self.fetch.return_value = ([], {"used_radius_km": 25, "measurement_count": 0})
+        area_service.get_point_air_quality(10.0, 10.0, force_refresh=True)
+
+        last_good = cache_module.get_cached(area_service._last_good_key(cache_key))
+        self.assertIsNotNone(last_good["aqi"]["aqi"])
+
+
+class SharedStoreAsyncLookupMixin:
+    """
+    The async point lookup against a Django cache store, run the way ASGI
+    runs it (event loop, database access only allowed off the loop).
+    """
+
+    store = None
+
+    def setUp(self):
+        super().setUp()
+        settings_patch = override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "aqi": {**self.store, "KEY_PREFIX": "aqi-test"},
+        })
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        self.prepare_store()
+
+        patches = [
+            mock.patch.object(cache_module, "_backend", DjangoCacheBackend("aqi")),
+            mock.patch.object(area_service, "_afetch_raw_measurements_from_point", _apoint_fetch),
+            mock.patch.object(area_service, "_fetch_raw_measurements_from_point", _point_fetch),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(caches["aqi"].clear)
+
+    def prepare_store(self):
+        pass
+
+    async def test_async_lookup_fills_and_reads_the_store(self):
+        first = await area_service.aget_point_air_quality(28.61, 77.21)
+        second = await area_service.aget_point_air_quality(28.61, 77.21)
+
+        self.assertEqual(first["aqi"], second["aqi"])
+        self.assertIsNotNone(first["aqi"]["aqi"])
+        self.assertEqual(second["freshness"]["updated_at"], first["freshness"]["updated_at"])
+        self.assertEqual(cache_module.cache_stats()["hits"], 1)
+
+    async def test_async_lookup_sees_entries_written_by_sync_path(self):
+        from asgiref.sync import sync_to_async
+
+        stored = await sync_to_async(area_service.get_point_air_quality)(28.70, 77.10)
+        served = await area_service.aget_point_air_quality(28.70, 77.10)
+
+        self.assertEqual(served["freshness"]["updated_at"], stored["freshness"]["updated_at"])
+
+
+class SqliteStoreAsyncLookupTests(SharedStoreAsyncLookupMixin, TransactionTestCase):
+    store = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "aqi_cache_test",
+    }
+
+    def prepare_store(self):
+        call_command("createcachetable", "aqi_cache_test", verbosity=0)
+
+
+class FileStoreAsyncLookupTests(SharedStoreAsyncLookupMixin, SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": directory.name,
+        }
+        super().setUp()
+
+
+@skipIf(aqi_module.np is None, "numpy is not installed")
+class BatchAQITests(SimpleTestCase):
+    """
+    The vectorized engine must agree with calculate_overall_aqi row by row.
+    """
+
+    POLLUTANTS = ("pm25", "pm10", "no2")
+
+    def boundary_values(self) -> list:
+        values = [-1.0, 0.0, 1000.0, 1000.5, 5000.0, math.nan]
+        for breakpoints in aqi_module.SUPPORTED_POLLUTANTS.values():
+            for c_low, c_high, *_ in breakpoints:
+                # both edges, just inside and in the gaps between ranges
+                values += [c_low, c_high, c_low + 1e-9, c_high - 1e-9, c_high + 0.5]
+        return values
+
+    def random_rows(self, count: int, seed: int = 7) -> list:
+        rng = random.Random(seed)
+        boundary = self.boundary_values()
+        rows = []
+
+        for _ in range(count):
+            row = {}
+            for pollutant in self.POLLUTANTS:
+                roll = rng.random()
+                if roll < 0.15:
+                    continue  # missing pollutant
+                if roll < 0.25:
+                    row[pollutant] = math.nan
+                elif roll < 0.5:
+                    row[pollutant] = rng.choice(boundary)
+                else:
+                    row[pollutant] = rng.uniform(0, 1100)
+            rows.append(row)
+
+        return rows
+
+    def assertBatchMatchesScalar(self, rows: list):
+        columns = {
+            pollutant: [row.get(pollutant, math.nan) for row in rows]
+            for pollutant in self.POLLUTANTS
+        }
+        batch = aqi_module.calculate_overall_aqi_batch(columns)
+
+        for i, row in enumerate(rows):
+            # the scalar path never sees a missing pollutant; ties resolve by
+            # pollutant order, which is the column order here
+            present = {p: row[p] for p in self.POLLUTANTS if p in row}
+            expected = aqi_module.calculate_overall_aqi(present)
+
+            with self.subTest(row=row):
+                if expected["aqi"] is None:
+                    self.assertTrue(math.isnan(batch["aqi"][i]))
+                    self.assertEqual(batch["category"][i], "Unknown")
+                    self.assertIsNone(batch["dominant_pollutant"][i])
+                    continue
+
+                self.assertEqual(batch["aqi"][i], expected["aqi"])
+                self.assertEqual(batch["category"][i], expected["category"])
+                self.assertEqual(batch["dominant_pollutant"][i], expected["dominant_pollutant"])
+                for pollutant, sub_index in expected["sub_indices"].items():
+                    self.assertEqual(batch["sub_indices"][pollutant][i], sub_index)
+
+    def test_random_rows_match_scalar(self):
+        self.assertBatchMatchesScalar(self.random_rows(5000))
+
+    def test_boundary_values_match_scalar(self):
+        rows = [
+            {pollutant: value}
+            for pollutant in self.POLLUTANTS
+            for value in self.boundary_values()
+        ]
+        self.assertBatchMatchesScalar(rows)
+
+    def test_single_pollutant_array_matches_calculate_aqi(self):
+        values = self.boundary_values() + [random.Random(3).uniform(0, 1100) for _ in range(500)]
+
+        for pollutant, breakpoints in aqi_module.SUPPORTED_POLLUTANTS.items():
+            aqi, category_index = aqi_module.calculate_aqi_array(values, pollutant)
+            categories = aqi_module._compiled_breakpoints(pollutant)[4]
+
+            for i, value in enumerate(values):
+                expected = aqi_module.calculate_aqi(value, breakpoints)
+                with self.subTest(pollutant=pollutant, value=value):
+                    if expected["aqi"] is None:
+                        self.assertTrue(math.isnan(aqi[i]))
+                    else:
+                        self.assertEqual(aqi[i], expected["aqi"])
+                    self.assertEqual(categories[category_index[i]], expected["category"])
+
+    def test_ties_resolve_like_scalar(self):
+        # pm25 90 and no2 180 both map to AQI 200
+        self.assertBatchMatchesScalar([{"pm25": 90.0, "no2": 180.0}])
+        batch = aqi_module.calculate_overall_aqi_batch({"no2": [180.0], "pm25": [90.0]})
+        self.assertEqual(batch["dominant_pollutant"][0], "no2")
+
+    def test_all_missing_and_unsupported(self):
+        batch = aqi_module.calculate_overall_aqi_batch({"co": [1.0, 2.0]})
+
+        self.assertTrue(all(math.isnan(v) for v in batch["aqi"]))
+        self.assertEqual(list(batch["category"]), ["Unknown", "Unknown"])
+        self.assertEqual(batch["sub_indices"], {})
+
+
+@skipIf(aqi_module.np is None, "numpy is not installed")
+class AqiGridViewTests(SimpleTestCase):
+    READINGS = [
+        {"lat": 28.61, "lon": 77.21, "parameter": "pm25", "value": 95.0},
+        {"lat": 28.70, "lon": 77.10, "parameter": "pm10", "value": 210.0},
+    ]
+
+    def setUp(self):
+        for name, value in (("_grid", None), ("_failed_at", 0.0)):
+            patcher = mock.patch.object(aqi_grid, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def wait_for_build(self):
+        deadline = time.monotonic() + 5
+        while aqi_grid._build_lock.locked() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_cold_grid_answers_503_and_builds_in_background(self):
+        built = aqi_grid.build_grid(self.READINGS)
+        with mock.patch.object(aqi_grid, "fetch_grid_readings", return_value=(self.READINGS, [])), \
+                mock.patch.object(aqi_grid, "build_grid", return_value=built), \
+                mock.patch.object(aqi_grid, "store_readings"):
+            response = self.client.get("/api/aqi-grid/")
+            self.wait_for_build()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], str(aqi_grid.GRID_RETRY_SECONDS))
+        self.assertIs(aqi_grid._grid, built)
+
+        self.assertEqual(self.client.get("/api/aqi-grid/").status_code, 200)
+        self.assertEqual(
+            self.client.get("/api/aqi-grid/point/?lat=28.61&lon=77.21").status_code, 200
+        )
+
+    def test_failed_build_is_not_a_500_and_backs_off(self):
+        failing = mock.Mock(side_effect=RuntimeError("sensor catalog unavailable"))
+        with mock.patch.object(aqi_grid, "fetch_grid_readings", failing), \
+                self.assertLogs("dashboard.services.aqi_grid", "ERROR"):
+            self.assertEqual(self.client.get("/api/aqi-grid/point/?lat=28.6&lon=77.2").status_code, 503)
+            self.wait_for_build()
+            self.assertEqual(self.client.get("/api/aqi-grid/").status_code, 503)
+            self.wait_for_build()
+
+        self.assertEqual(failing.call_count, 1)
+
+    def test_non_finite_coordinates_are_rejected(self):
+        aqi_grid._grid = aqi_grid.build_grid(self.READINGS)
+
+        for query in ("bbox=nan,28.5,77.3,28.7", "bbox=77.1,28.5,inf,28.7", "bbox=1,2,3"):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/aqi-grid/?{query}").status_code, 400)
+
+        self.assertEqual(self.client.get("/api/aqi-grid/point/?lat=nan&lon=77.2").status_code, 400)
+        self.assertEqual(self.client.get("/api/aqi-grid/?bbox=77.1,28.5,77.3,28.7").status_code, 200)
+
+
+class GridReadingsTests(SimpleTestCase):
+    LOCATIONS = [
+        {"location_id": 1, "lat": 28.61, "lon": 77.21,
+         "sensors": [{"sensor_id": 11, "parameter": "pm25", "units": "µg/m³"}]},
+        {"location_id": 2, "lat": 28.70, "lon": 77.10,
+         "sensors": [{"sensor_id": 21, "parameter": "pm25", "units": "µg/m³"},
+                     {"sensor_id": 22, "parameter": "pm10", "units": "µg/m³"}]},
+    ]
+
+    def setUp(self):
+        window_aggregator.clear()
+        self.addCleanup(window_aggregator.clear)
+        patcher = mock.patch.object(aqi_grid, "seed_windows")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_grid_uses_the_window_averages_point_lookups_score(self):
+        readings = [
+            {"sensor_id": 11, "parameter": "pm25", "datetime": 1000.0, "value": 80.0},
+            {"sensor_id": 11, "parameter": "pm25", "datetime": 4600.0, "value": 110.0},
+            # sensor 22 has no fresh reading and is left out
+            {"sensor_id": 21, "parameter": "pm25", "datetime": 4600.0, "value": 40.0},
+        ]
+
+        averages = aqi_grid.sensor_averages(self.LOCATIONS, readings, now=5000.0)
+        point = normalize_window_averages(readings[:2], now=5000.0)
+
+        self.assertEqual(
+            [(a["lat"], a["parameter"], a["value"]) for a in averages],
+            [(28.61, "pm25", 95.0), (28.70, "pm25", 40.0)],
+        )
+        self.assertEqual(point, {"pm25": 95.0})
+
+    def test_grid_reads_one_latest_per_location(self):
+        from benchmarks.replay import ReplayOpenAQ, install, uninstall
+        from dashboard.services import openaq_scheduler, sensor_catalog
+
+        replay = ReplayOpenAQ("instant")
+        previous = install(replay)
+        self.addCleanup(uninstall, previous)
+        with mock.patch.object(openaq_scheduler.scheduler, "rate", 0):
+            catalog = sensor_catalog.load_catalog()
+            replay.calls.clear()
+            averages, raw = aqi_grid.fetch_grid_readings()
+
+        self.assertEqual(dict(replay.calls), {"latest": len(catalog.locations)})
+        self.assertTrue(averages)
+        self.assertEqual(len({r["sensor_id"] for r in raw}), len(raw))
+
+
+
+HOUR = 3600
+
+
+class RollingWindowTests(SimpleTestCase):
+    def test_mean_over_the_window(self):
+        window = RollingWindow(24 * HOUR)
+        for hour, value in enumerate([10.0, 20.0, 30.0]):
+            window.add(hour * HOUR, value)
+
+        self.assertEqual(window.mean(now=2 * HOUR), 20.0)
+
+    def test_readings_leave_the_window_as_now_advances(self):
+        window = RollingWindow(24 * HOUR)
+        window.add(0, 100.0)
+        window.add(12 * HOUR, 50.0)
+
+        self.assertEqual(window.mean(now=23 * HOUR), 75.0)
+        # the first reading is exactly 24 h old: out
+        self.assertEqual(window.mean(now=24 * HOUR), 50.0)
+        self.assertIsNone(window.mean(now=36 * HOUR))
+        self.assertEqual(window.total, 0.0)
+
+    def test_adding_evicts_readings_older_than_the_new_one(self):
+        window = RollingWindow(8 * HOUR)
+        window.add(0, 1.0)
+        window.add(4 * HOUR, 2.0)
+        window.add(10 * HOUR, 3.0)
+
+        self.assertEqual(len(window), 2)
+        self.assertEqual(window.mean(), 2.5)
+
+    def test_out_of_order_and_duplicate_readings_are_ignored(self):
+        window = RollingWindow(24 * HOUR)
+        self.assertTrue(window.add(5 * HOUR, 10.0))
+        self.assertFalse(window.add(5 * HOUR, 99.0))
+        self.assertFalse(window.add(4 * HOUR, 99.0))
+
+        self.assertEqual(window.mean(now=5 * HOUR), 10.0)
+
+    def test_running_mean_matches_recomputed_mean(self):
+        rng = random.Random(11)
+        window = RollingWindow(24 * HOUR)
+        history = []
+
+        for minute in range(0, 72 * 60, 15):
+            timestamp, value = minute * 60, rng.uniform(0, 500)
+            window.add(timestamp, value)
+            history.append((timestamp, value))
+
+            expected = [v for t, v in history if t > timestamp - 24 * HOUR]
+            self.assertAlmostEqual(window.mean(now=timestamp), sum(expected) / len(expected))
+
+
+class WindowAggregatorTests(SimpleTestCase):
+    def readings(self, sensor_id, parameter, values, start=0, step=HOUR):
+        return [
+            {"sensor_id": sensor_id, "parameter": parameter,
+             "datetime": start + i * step, "value": value}
+            for i, value in enumerate(values)
+        ]
+
+    def test_window_length_follows_cpcb_period(self):
+        aggregator = WindowAggregator()
+        aggregator.ingest(self.readings(1, "pm25", [10.0] * 12 + [40.0] * 12))
+        aggregator.ingest(self.readings(1, "co", [10.0] * 12 + [40.0] * 12))
+
+        now = 23 * HOUR
+        self.assertEqual(aggregator.sensor_mean(1, "pm25", now), 25.0)  # 24 h
+        self.assertEqual(aggregator.sensor_mean(1, "co", now), 40.0)    # 8 h
+
+    def test_iso_timestamps_and_reingest(self):
+        aggregator = WindowAggregator()
+        readings = [
+            {"sensor_id": 7, "parameter": "pm10", "datetime": "2025-11-14T00:00:00Z", "value": 100.0},
+            {"sensor_id": 7, "parameter": "pm10", "datetime": "2025-11-14T01:00:00Z", "value": 200.0},
+        ]
+        now = 1763082060.0  # 2025-11-14T01:01:00Z
+
+        self.assertEqual(aggregator.ingest(readings), 2)
+        self.assertEqual(aggregator.ingest(readings), 0)
+        self.assertEqual(aggregator.sensor_mean(7, "pm10", now), 150.0)
+        self.assertIsNone(aggregator.sensor_mean(7, "pm10", now + 25 * HOUR))
+        self.assertIsNone(aggregator.sensor_mean(8, "pm10", now))
+
+    def test_normalize_keeps_highest_sensor_average(self):
+        aggregator = WindowAggregator()
+        readings = (
+            self.readings(1, "pm25", [50.0, 70.0])
+            + self.readings(2, "pm25", [90.0, 110.0])
+            + self.readings(2, "no2", [30.0, 30.0])
+        )
+
+        result = normalize_window_averages(readings, aggregator=aggregator, now=2 * HOUR)
+        self.assertEqual(result, {"pm25": 100.0, "no2": 30.0})
+
+        # a day later every reading has aged out
+        self.assertEqual(
+            normalize_window_averages(readings, aggregator=aggregator, now=30 * HOUR),
+            {},
+        )
+
+
+    def test_fractional_averages_between_ranges_are_scored(self):
+        # the tables jump from 30 to 31 (pm25), 50 to 51 (pm10), 40 to 41 (no2)
+        for pollutant, value, expected in (
+            ("pm25", 30.5, {"aqi": 50, "category": "Good"}),
+            ("pm25", 60.99, {"aqi": 100, "category": "Satisfactory"}),
+            ("pm10", 50.5, {"aqi": 50, "category": "Good"}),
+            ("no2", 180.25, {"aqi": 200, "category": "Moderate"}),
+            ("pm25", 31.0, {"aqi": 51, "category": "Satisfactory"}),
+        ):
+            with self.subTest(pollutant=pollutant, value=value):
+                result = aqi_module.calculate_aqi(value, aqi_module.SUPPORTED_POLLUTANTS[pollutant])
+                self.assertEqual(result, expected)
+
+        aggregator = WindowAggregator()
+        readings = self.readings(1, "pm25", [30.0, 31.0])
+        pollutants = normalize_window_averages(readings, aggregator=aggregator, now=2 * HOUR)
+
+        self.assertEqual(pollutants, {"pm25": 30.5})
+        self.assertEqual(aqi_module.calculate_overall_aqi(pollutants)["category"], "Good")
+
+
+class RecordingBackend:
+    name = "recording"
+
+    def __init__(self):
+        self.prompts = []
+
+    def stream(self, prompt, timeout):
+        self.prompts.append(prompt)
+        yield f"answer {len(self.prompts)}"
+
+
+class ChatbotCacheTests(SimpleTestCase):
+    AQI = {"aqi": 212, "category": "Poor", "dominant_pollutant": "pm25"}
+    POLLUTANTS = {"pm25": 96.0, "pm10": 181.0}
+    WEATHER = {"wind_speed": 1.4, "temperature": 28.3, "humidity": 61}
+
+    def setUp(self):
+        self.backend = RecordingBackend()
+        patches = [
+            mock.patch.object(chatbot_service, "_backend", self.backend),
+            mock.patch.object(chatbot_service, "_response_cache", LRUCache()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def ask(self, aqi=None, pollutants=None, weather=None, query="Is it safe to run?"):
+        return chatbot_service.get_chatbot_response(
+            user_type="citizen",
+            aqi_data=aqi or self.AQI,
+            pollutants=pollutants or self.POLLUTANTS,
+            weather=weather or self.WEATHER,
+            user_query=query,
+        )
+
+    def test_same_bucket_reuses_the_answer(self):
+        first = self.ask()
+        second = self.ask(
+            aqi={**self.AQI, "aqi": 209},
+            pollutants={"pm25": 98.0, "pm10": 178.0},
+            weather={"wind_speed": 1.2, "temperature": 27.6, "humidity": 58},
+            query="is it SAFE to run",
+        )
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.backend.prompts), 1)
+
+    def test_prompt_carries_only_bucketed_values(self):
+        self.ask()
+        prompt = self.backend.prompts[0]
+
+        self.assertIn("AQI: 210 (Poor)", prompt)
+        self.assertIn("PM25: 100", prompt)
+        self.assertIn("Wind Speed: 1", prompt)
+        for exact in ("212", "96.0", "181", "1.4", "28.3", "61"):
+            self.assertNotIn(exact, prompt)
+
+    def test_aqi_or_weather_in_another_bucket_is_a_new_answer(self):
+        self.ask()
+        self.ask(aqi={**self.AQI, "aqi": 238})
+        self.ask(weather={**self.WEATHER, "wind_speed": 4.0})
+        self.ask(weather={**self.WEATHER, "humidity": 90})
+
+        self.assertEqual(len(self.backend.prompts), 4)
+
+    def test_non_numeric_values_are_dropped(self):
+        aqi, pollutants, weather = chatbot_service.bucketed_context(
+            {"aqi": "n/a", "category": "Poor"},
+            {"pm25": None, "pm10": "x", "no2": float("nan")},
+            {"wind_speed": float("inf"), "temperature": "28"},
+        )
+
+        self.assertIsNone(aqi["aqi"])
+        self.assertEqual(pollutants, {})
+        self.assertEqual(weather, {"temperature": 28})
+
+    def test_fallback_accepts_numbers_sent_as_strings(self):
+        answer = chatbot_service.fallback_answer(
+            self.AQI,
+            {"pm25": "95", "pm10": "x", "no2": None},
+            {"wind_speed": "1.5"},
+        )
+
+        self.assertIn("Low wind speed causing PM2.5 accumulation", answer)
+
+
+def _wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_threads_and_coroutines_share_one_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append("sync")
+            release.wait(5)
+            return "value"
+
+        async def coro_fn():
+            calls.append("async")
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("k", fn)))
+            for _ in range(20)
+        ]
+        threads[0].start()
+        _wait_until(lambda: flight.in_flight() == 1)
+        for t in threads[1:]:
+            t.start()
+
+        async def waiters():
+            tasks = [asyncio.ensure_future(flight.ado("k", coro_fn)) for _ in range(20)]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*tasks)
+
+        results += asyncio.run(waiters())
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(calls, ["sync"])
+        self.assertEqual(results, ["value"] * 40)
+        self.assertEqual(flight.stats(), {"in_flight": 0, "leaders": 1, "shared": 39})
+
+    def test_leader_error_is_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise ValueError("upstream down")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("k", fail)
+            except ValueError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        threads[0].start()
+        _wait_until(lambda: flight.in_flight() == 1)
+        for t in threads[1:]:
+            t.start()
+        _wait_until(lambda: flight.stats()["shared"] == 4)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        self.assertEqual(len(errors), 5)
+        self.assertEqual(len({id(e) for e in errors}), 1)
+
+    def test_next_call_after_a_flight_starts_fresh(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("k", lambda: 1), 1)
+        self.assertEqual(flight.do("k", lambda: 2), 2)
+
+    def test_cancelled_leader_hands_over_to_a_waiter(self):
+        flight = SingleFlight()
+        thread_results = []
+
+        async def scenario():
+            async def hang():
+                await asyncio.sleep(60)
+
+            async def fetch():
+                return "fetched"
+
+            leader = asyncio.ensure_future(flight.ado("k", hang))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(flight.ado("k", fetch))
+            thread = threading.Thread(
+                target=lambda: thread_results.append(flight.do("k", lambda: "fetched")),
+            )
+            thread.start()
+            while flight.stats()["shared"] < 2:
+                await asyncio.sleep(0.005)
+
+            leader.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await leader
+
+            result = await waiter
+            await asyncio.to_thread(thread.join, 5)
+            return result
+
+        self.assertEqual(asyncio.run(scenario()), "fetched")
+        self.assertEqual(thread_results, ["fetched"])
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_cancelled_waiter_does_not_cancel_the_flight(self):
+        flight = SingleFlight()
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def slow():
+                await release.wait()
+                return "value"
+
+            leader = asyncio.ensure_future(flight.ado("k", slow))
+            await asyncio.sleep(0)
+            quitter = asyncio.ensure_future(flight.ado("k", slow))
+            stayer = asyncio.ensure_future(flight.ado("k", slow))
+            await asyncio.sleep(0.01)
+
+            quitter.cancel()
+            await asyncio.sleep(0)
+            release.set()
+
+            return await leader, await stayer, quitter.cancelled()
+
+        self.assertEqual(asyncio.run(scenario()), ("value", "value", True))
+
+
+class CompressionAndValidatorTests(SimpleTestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(chatbot_service, "_backend", chatbot_service.StubBackend(0, 0)),
+            mock.patch.object(chatbot_service, "_response_cache", LRUCache()),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_sse_stream_is_not_gzipped(self):
+        response = self.client.post(
+            "/api/chatbot/stream/",
+            {"query": "Is it safe to run?", "aqi": {"aqi": 212, "category": "Poor"}},
+            content_type="application/json",
+            HTTP_ACCEPT_ENCODING="gzip, deflate",
+        )
+        chunks = list(response.streaming_content)
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        # one event per word of the stub answer, then "done"
+        self.assertGreater(len(chunks), 10)
+        self.assertTrue(chunks[-1].startswith(b"event: done"))
+
+    def test_regular_responses_are_still_gzipped(self):
+        data = {**self.area_response("fresh", 10), "reasons": ["dust"] * 200}
+        with mock.patch("dashboard.views.get_area_air_quality", return_value=data):
+            response = self.client.get(
+                "/api/dashboard/?area_id=central_delhi", HTTP_ACCEPT_ENCODING="gzip"
+            )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(response.content))["reasons"], ["dust"] * 200)
+
+    def area_response(self, state: str, age: int):
+        return {
+            "area_id": "central_delhi",
+            "aqi": {"aqi": 212, "category": "Poor"},
+            "freshness": {"state": state, "age_seconds": age, "updated_at": 1_763_082_000},
+        }
+
+    def test_etag_covers_the_freshness_state(self):
+        with mock.patch("dashboard.views.get_area_air_quality",
+                        return_value=self.area_response("fresh", 10)):
+            first = self.client.get("/api/dashboard/?area_id=central_delhi")
+
+        self.assertNotIn("age_seconds", first.json()["freshness"])
+
+        with mock.patch("dashboard.views.get_area_air_quality",
+                        return_value=self.area_response("fresh", 900)):
+            same = self.client.get(
+                "/api/dashboard/?area_id=central_delhi", HTTP_IF_NONE_MATCH=first["ETag"]
+            )
+        self.assertEqual(same.status_code, 304)
+
+        with mock.patch("dashboard.views.get_area_air_quality",
+                        return_value=self.area_response("stale", 4000)):
+            changed = self.client.get(
+                "/api/dashboard/?area_id=central_delhi", HTTP_IF_NONE_MATCH=first["ETag"]
+            )
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["freshness"], {"state": "stale", "updated_at": 1_763_082_000})
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+
+    def test_middleware_chain_stays_async(self):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+        from django.utils.module_loading import import_string
+
+        async def view(request):
+            return None
+
+        for path in settings.MIDDLEWARE:
+            with self.subTest(path):
+                middleware = import_string(path)
+                # a sync-only middleware makes Django adapt the whole chain
+                # under ASGI, running every async view through a thread
+                self.assertTrue(getattr(middleware, "async_capable", False))
+                try:
+                    instance = middleware(view)
+                except MiddlewareNotUsed:
+                    continue
+                self.assertTrue(asyncio.iscoroutinefunction(instance))
+
+
+    def test_brotli_compresses_in_both_modes(self):
+        try:
+            import brotli
+        except ImportError:
+            self.skipTest("brotli is not installed")
+
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+
+        from dashboard.middleware import BrotliMiddleware
+
+        body = b'{"reasons": ["dust"]}' * 50
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br")
+
+        async def aview(request):
+            return HttpResponse(body)
+
+        responses = [
+            BrotliMiddleware(lambda request: HttpResponse(body))(request),
+            asyncio.run(BrotliMiddleware(aview)(request)),
+        ]
+        for response in responses:
+            self.assertEqual(response["Content-Encoding"], "br")
+            self.assertEqual(brotli.decompress(response.content), body)
+
+
+class BenchmarkFixtureTests(SimpleTestCase):
+    def setUp(self):
+        window_aggregator.clear()
+        self.addCleanup(window_aggregator.clear)
+
+    def test_pipeline_scores_the_fixture_at_its_recording_time(self):
+        from benchmarks.fixture import fixture_readings, load_fixture
+
+        fixture = load_fixture()
+        readings = fixture_readings(fixture)
+        recorded_at = _as_timestamp(fixture["recorded_at"])
+
+        result = area_service._run_aqi_pipeline("bench", readings, now=recorded_at + 1)
+        # two days later the same readings have aged out of every window
+        expired = area_service._run_aqi_pipeline("bench", readings, now=recorded_at + 2 * 86400)
+
+        self.assertIsNotNone(result["aqi"]["aqi"])
+        self.assertIn("pm25", result["pollutants"])
+        self.assertIsNone(expired["aqi"]["aqi"])
+
+
+class CatalogFetchModeTests(SimpleTestCase):
+    """
+    Points near catalogued locations, read through the OpenAQ replay
+    stand-in.
+    """
+
+    def setUp(self):
+        from benchmarks.replay import ReplayOpenAQ, install, uninstall
+        from dashboard.services import openaq_scheduler, sensor_catalog
+
+        self.replay = ReplayOpenAQ("instant")
+        previous = install(self.replay)
+        self.addCleanup(uninstall, previous)
+
+        patches = [
+            mock.patch.object(openaq_scheduler.scheduler, "rate", 0),
+            mock.patch.object(area_service, "store_readings_safely"),
+            mock.patch.object(area_service, "_revalidate_executor"),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        sensor_catalog.load_catalog()
+        self.locations, _ = sensor_catalog.nearest_locations(
+            28.63, 77.22, step_km=area_service.RADIUS_STEP_KM
+        )
+        self.replay.calls.clear()
+
+    def fetch(self, mode):
+        with mock.patch.object(area_service, "fetch_measurements_by_locations",
+                               partial_with_mode(mode)):
+            return area_service._fetch_raw_measurements_from_point(28.63, 77.22)
+
+    def test_latest_mode_reads_one_latest_per_location(self):
+        readings, meta = self.fetch("latest")
+
+        self.assertEqual(dict(self.replay.calls), {"latest": len(self.locations)})
+        self.assertTrue(readings)
+        # one reading per sensor
+        self.assertEqual(len({r["sensor_id"] for r in readings}), len(readings))
+        self.assertEqual(meta["measurement_count"], len(readings))
+
+    def test_measurements_mode_keeps_per_sensor_history(self):
+        readings, _ = self.fetch("measurements")
+
+        sensors = sum(len(loc["sensors"]) for loc in self.locations)
+        self.assertNotIn("latest", self.replay.calls)
+        self.assertEqual(sum(self.replay.calls.values()), sensors)
+        self.assertTrue(readings)
+
+    def test_readings_are_stored_off_the_request_path(self):
+        readings, _ = self.fetch("latest")
+
+        area_service.store_readings_safely.assert_not_called()
+        area_service._revalidate_executor.submit.assert_called_once_with(
+            area_service.store_readings_safely, mock.ANY
+        )
+        stored = area_service._revalidate_executor.submit.call_args.args[1]
+        self.assertEqual(len(stored), len(readings))
+
+
+def partial_with_mode(mode):
+    from dashboard.services.openaq_point_service import fetch_measurements_by_locations
+
+    def fetch(locations, used_radius_km):
+        return fetch_measurements_by_locations(locations, used_radius_km, mode=mode)
+
+    return fetch
+
+
+class ClockCondition:
+    """
+    threading.Condition whose wait() advances a FakeClock instead of
+    blocking, so waits for tokens take no real time.
+    """
+
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        return self._cond.__enter__()
+
+    def __exit__(self, *exc):
+        return self._cond.__exit__(*exc)
+
+    def notify_all(self):
+        self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        self.clock.advance(timeout)
+        return False
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class OpenAQSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        from dashboard.services import openaq_scheduler
+
+        self.module = openaq_scheduler
+        self.clock = FakeClock()
+        patches = [
+            mock.patch.object(openaq_scheduler, "time", self.clock),
+            # backoff at its upper bound, so delays are predictable
+            mock.patch.object(openaq_scheduler.random, "uniform", lambda low, high: high),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def scheduler(self, rate_per_minute=60, burst=10):
+        scheduler = self.module.OpenAQScheduler(rate_per_minute=rate_per_minute, burst=burst)
+        scheduler._cond = ClockCondition(self.clock)
+        return scheduler
+
+    def take(self, scheduler, level) -> float:
+        with scheduler._cond:
+            return scheduler._try_take(level)
+
+    def test_bucket_refills_at_the_configured_rate(self):
+        scheduler = self.scheduler(rate_per_minute=60, burst=10)
+        for _ in range(10):
+            scheduler.acquire(self.module.INTERACTIVE)
+        self.assertEqual(scheduler.stats()["tokens"], 0)
+
+        self.clock.advance(3)
+        self.assertEqual(scheduler.stats()["tokens"], 3)
+
+        self.clock.advance(60)
+        self.assertEqual(scheduler.stats()["tokens"], 10)  # capped at burst
+
+    def test_empty_bucket_waits_for_the_next_token(self):
+        scheduler = self.scheduler(rate_per_minute=60, burst=1)
+        scheduler.acquire(self.module.INTERACTIVE)
+
+        started = self.clock.now
+        scheduler.acquire(self.module.INTERACTIVE)
+        self.assertAlmostEqual(self.clock.now - started, 1.0)
+
+    def test_background_classes_leave_a_reserve(self):
+        module = self.module
+        scheduler = self.scheduler(burst=10)
+
+        # backfill may not go below 60% of the bucket, refresh below 30%
+        taken = {level: 0 for level in module.PRIORITY_NAMES}
+        for level in (module.BACKFILL, module.REFRESH, module.INTERACTIVE):
+            while self.take(scheduler, level) == 0:
+                taken[level] += 1
+
+        self.assertEqual(taken, {module.BACKFILL: 4, module.REFRESH: 3, module.INTERACTIVE: 3})
+
+    def test_waiting_interactive_caller_goes_first(self):
+        module = self.module
+        scheduler = self.scheduler(burst=10)
+        scheduler._waiting[module.INTERACTIVE] = 1
+
+        self.assertGreater(self.take(scheduler, module.REFRESH), 0)
+        self.assertEqual(self.take(scheduler, module.INTERACTIVE), 0)
+
+    def test_interactive_call_gives_up_past_the_max_queue_time(self):
+        module = self.module
+        # one token a minute: the next one is far beyond the limit. A burst
+        # of 3 leaves backfill room above its 60% reserve.
+        scheduler = self.scheduler(rate_per_minute=1, burst=3)
+        for _ in range(3):
+            scheduler.acquire(module.INTERACTIVE)
+
+        started = self.clock.now
+        with self.assertRaises(module.RateLimited):
+            scheduler.acquire(module.INTERACTIVE)
+        self.assertEqual(self.clock.now, started)  # failed without queueing
+
+        # background work waits instead
+        scheduler.acquire(module.BACKFILL)
+        self.assertGreaterEqual(self.clock.now - started, 60)
+
+    def test_5xx_is_retried_with_backoff(self):
+        scheduler = self.scheduler()
+        outcomes = [UpstreamError(503), UpstreamError(502), "ok"]
+        called_at = []
+
+        def fn():
+            called_at.append(self.clock.now)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(scheduler.call(fn), "ok")
+        base = self.module.BACKOFF_BASE_SECONDS
+        self.assertAlmostEqual(called_at[1] - called_at[0], base)
+        self.assertAlmostEqual(called_at[2] - called_at[1], base * 2)
+
+    def test_429_drains_the_bucket_before_the_retry(self):
+        scheduler = self.scheduler(rate_per_minute=60, burst=10)
+        outcomes = [UpstreamError(429), "ok"]
+        called_at = []
+
+        def fn():
+            called_at.append(self.clock.now)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(scheduler.call(fn), "ok")
+        # backoff (0.5 s), then a full token's refill (1 s) from an empty bucket
+        self.assertAlmostEqual(called_at[1] - called_at[0], 1.0)
+        self.assertLess(scheduler.stats()["tokens"], 1)
+
+    def test_429_gives_up_after_max_retries(self):
+        scheduler = self.scheduler(rate_per_minute=6000, burst=10)
+        fn = mock.Mock(side_effect=UpstreamError(429))
+
+        with self.assertRaises(UpstreamError):
+            scheduler.call(fn)
+        self.assertEqual(fn.call_count, self.module.MAX_RETRIES + 1)
+
+    def test_client_errors_are_not_retried(self):
+        scheduler = self.scheduler()
+        fn = mock.Mock(side_effect=UpstreamError(404))
+
+        with self.assertRaises(UpstreamError):
+            scheduler.call(fn)
+        self.assertEqual(fn.call_count, 1)
+
+    def test_rate_limit_headers_hold_the_bucket_until_reset(self):
+        scheduler = self.scheduler(burst=10)
+        headers = {"x-ratelimit-limit": "60", "x-ratelimit-remaining": "0",
+                   "x-ratelimit-reset": "30"}
+        scheduler.observe(mock.Mock(headers=headers, spec=["headers"]))
+
+        self.assertAlmostEqual(self.take(scheduler, self.module.INTERACTIVE), 30)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        from dashboard.services import circuit_breaker, openaq_scheduler
+
+        self.module = circuit_breaker
+        self.clock = FakeClock()
+        patches = [
+            mock.patch.object(circuit_breaker, "time", self.clock),
+            mock.patch.object(openaq_scheduler, "time", self.clock),
+            mock.patch.object(circuit_breaker, "logger"),  # transitions log warnings
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def breaker(self, probe_wait_seconds=5):
+        return self.module.CircuitBreaker(
+            "test", window=4, min_calls=4, failure_rate=0.5, slow_call_seconds=5, open_seconds=30,
+            probe_wait_seconds=probe_wait_seconds,
+        )
+
+    def open_breaker(self, probe_wait_seconds=5):
+        breaker = self.breaker(probe_wait_seconds)
+        for failed in (False, True, False, True):
+            breaker.before_call()
+            breaker.record(0.1, failed)
+        self.assertEqual(breaker.state, self.module.OPEN)
+        return breaker
+
+    def scheduler(self, breaker):
+        from dashboard.services.openaq_scheduler import OpenAQScheduler
+
+        return OpenAQScheduler(rate_per_minute=6000, burst=10, breaker=breaker)
+
+    def test_opens_at_the_failure_rate_and_fails_fast(self):
+        breaker = self.open_breaker()
+
+        self.assertTrue(breaker.is_open())
+        with self.assertRaises(self.module.CircuitOpen) as ctx:
+            breaker.before_call()
+        self.assertEqual(ctx.exception.retry_in, 30)
+
+    def test_no_verdict_before_min_calls(self):
+        breaker = self.breaker()
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record(0.1, True)
+        self.assertEqual(breaker.state, self.module.CLOSED)
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = self.breaker()
+        for duration in (0.1, 6, 0.1, 6):
+            breaker.before_call()
+            breaker.record(duration, False)
+        self.assertEqual(breaker.state, self.module.OPEN)
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = self.open_breaker(probe_wait_seconds=0.05)
+        self.clock.advance(30)
+
+        self.assertFalse(breaker.is_open())
+        breaker.before_call()
+        self.assertEqual(breaker.state, self.module.HALF_OPEN)
+        with self.assertRaises(self.module.CircuitOpen) as ctx:
+            breaker.before_call()
+        # the probe outlived the wait: it will re-open the breaker
+        self.assertEqual(ctx.exception.retry_in, 30)
+
+    def wait_during_probe(self, breaker):
+        """
+        Starts a call while the probe is in flight; returns the thread and
+        its outcome ("admitted" or the CircuitOpen).
+        """
+
+        outcome = []
+
+        def call():
+            try:
+                breaker.before_call()
+                outcome.append("admitted")
+            except self.module.CircuitOpen as exc:
+                outcome.append(exc)
+
+        thread = threading.Thread(target=call)
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual(outcome, [])  # waiting, not refused
+        return thread, outcome
+
+    def test_calls_during_the_probe_go_ahead_once_it_closes(self):
+        breaker = self.open_breaker()
+        self.clock.advance(30)
+        breaker.before_call()
+
+        thread, outcome = self.wait_during_probe(breaker)
+        breaker.record(0.1, False)
+        thread.join(5)
+
+        self.assertEqual(outcome, ["admitted"])
+        self.assertEqual(breaker.state, self.module.CLOSED)
+
+    def test_calls_during_the_probe_fail_with_its_retry_time(self):
+        breaker = self.open_breaker()
+        self.clock.advance(30)
+        breaker.before_call()
+
+        thread, outcome = self.wait_during_probe(breaker)
+        breaker.record(0.1, True)
+        thread.join(5)
+
+        self.assertIsInstance(outcome[0], self.module.CircuitOpen)
+        self.assertEqual(outcome[0].retry_in, 30)
+
+    async def test_async_calls_wait_for_the_probe(self):
+        breaker = self.open_breaker()
+        scheduler = self.scheduler(breaker)
+        self.clock.advance(30)
+
+        probe_started = asyncio.Event()
+        finish_probe = asyncio.Event()
+
+        async def probe():
+            probe_started.set()
+            await finish_probe.wait()
+            return "probe"
+
+        async def lookup():
+            return "lookup"
+
+        probing = asyncio.create_task(scheduler.acall(probe))
+        await probe_started.wait()
+        waiting = asyncio.create_task(scheduler.acall(lookup))
+        await asyncio.sleep(0.1)
+        self.assertFalse(waiting.done())
+
+        finish_probe.set()
+        self.assertEqual(await probing, "probe")
+        self.assertEqual(await waiting, "lookup")
+        self.assertEqual(breaker.state, self.module.CLOSED)
+
+    def test_successful_probe_closes(self):
+        breaker = self.open_breaker()
+        self.clock.advance(30)
+
+        breaker.before_call()
+        breaker.record(0.1, False)
+        self.assertEqual(breaker.state, self.module.CLOSED)
+        breaker.before_call()  # calls flow again
+
+    def test_failed_probe_reopens(self):
+        breaker = self.open_breaker()
+        self.clock.advance(30)
+
+        breaker.before_call()
+        breaker.record(0.1, True)
+        self.assertEqual(breaker.state, self.module.OPEN)
+        self.assertEqual(breaker.stats()["retry_in"], 30)
+
+    def test_scheduler_fails_fast_without_calling_upstream(self):
+        breaker = self.open_breaker()
+        fn = mock.Mock()
+
+        with self.assertRaises(self.module.CircuitOpen):
+            self.scheduler(breaker).call(fn)
+        fn.assert_not_called()
+
+    async def test_cancelled_probe_frees_the_slot(self):
+        breaker = self.open_breaker()
+        scheduler = self.scheduler(breaker)
+        self.clock.advance(30)
+
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.Event().wait()
+
+        probe = asyncio.create_task(scheduler.acall(hang))
+        await started.wait()
+        self.assertEqual(breaker.state, self.module.HALF_OPEN)
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+
+        # the next call probes instead of being refused, and recovers
+        async def ok():
+            return "ok"
+
+        self.assertEqual(await scheduler.acall(ok), "ok")
+        self.assertEqual(breaker.state, self.module.CLOSED)
+
+    def test_interrupted_probe_frees_the_slot(self):
+        breaker = self.open_breaker()
+        scheduler = self.scheduler(breaker)
+        self.clock.advance(30)
+
+        with self.assertRaises(KeyboardInterrupt):
+            scheduler.call(mock.Mock(side_effect=KeyboardInterrupt))
+
+        self.assertEqual(scheduler.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, self.module.CLOSED)
+
+
+class OpenAQClientSignatureTests(SimpleTestCase):
+    """
+    Every SDK call the point service makes, checked against the installed
+    openaq resource signatures rather than a permissive fake.
+    """
+
+    def setUp(self):
+        from openaq.models.locations import Locations
+        from openaq.models.measurements import Measurements
+
+        from dashboard.services import openaq_point_service, openaq_scheduler
+
+        self.service = openaq_point_service
+        self.client = mock.Mock(
+            measurements=mock.create_autospec(Measurements, instance=True),
+            locations=mock.create_autospec(Locations, instance=True),
+        )
+        for resource in (self.client.measurements, self.client.locations):
+            for name in ("list", "latest"):
+                if hasattr(resource, name):
+                    response = getattr(resource, name).return_value
+                    response.results = []
+                    response.headers = None
+
+        patches = [
+            mock.patch.object(openaq_point_service, "_client", self.client),
+            mock.patch.object(openaq_scheduler.scheduler, "rate", 0),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_sensor_readings_ask_for_raw_measurements(self):
+        self.assertEqual(self.service.fetch_sensor_readings([101, 102]), {})
+
+        for call in self.client.measurements.list.call_args_list:
+            self.assertEqual(call.kwargs["data"], "measurements")
+        self.assertEqual(self.client.measurements.list.call_count, 2)
+
+    def test_location_calls_match_the_sdk(self):
+        location = {"location_id": 7, "lat": 28.6, "lon": 77.2, "sensors": []}
+
+        self.service.fetch_locations_in_bbox((77.0, 28.4, 77.4, 28.8))
+        self.service._list_locations_near(28.6, 77.2, 5)
+        self.service.fetch_latest_by_locations([location], 5)
+
+        self.assertEqual(self.client.locations.list.call_count, 2)
+        self.client.locations.latest.assert_called_once_with(7)
+
+    def test_replay_stand_in_matches_the_sdk(self):
+        import inspect
+
+        from openaq.models.locations import Locations
+        from openaq.models.measurements import Measurements
+
+        from benchmarks import replay
+
+        def params(fn):
+            return [(p.name, p.default) for p in inspect.signature(fn).parameters.values()]
+
+        for sdk, stand_in in (
+            (Measurements.list, replay._Measurements.list),
+            (Locations.list, replay._Locations.list),
+            (Locations.latest, replay._Locations.latest),
+        ):
+            with self.subTest(sdk.__qualname__):
+                self.assertEqual(params(stand_in), params(sdk))
+
+
+class PrefetchEntryPointTests(SimpleTestCase):
+    def test_command_refuses_a_per_process_store(self):
+        from django.core.management.base import CommandError
+
+        for store in ("memory", "locmem"):
+            with self.subTest(store=store), override_settings(AQI_CACHE_STORE=store), \
+                    mock.patch("dashboard.management.commands.prefetch_areas.refresh_all_areas") as refresh:
+                with self.assertRaisesMessage(CommandError, "per-process"):
+                    call_command("prefetch_areas", "--once")
+                refresh.assert_not_called()
+
+    @override_settings(AQI_CACHE_STORE="redis")
+    def test_command_runs_against_a_shared_store(self):
+        from io import StringIO
+
+        out = StringIO()
+        with mock.patch("dashboard.management.commands.prefetch_areas.refresh_all_areas",
+                        return_value={"central_delhi": "ok"}):
+            call_command("prefetch_areas", "--once", stdout=out)
+        self.assertIn("central_delhi: ok", out.getvalue())
+
+    @override_settings(AQI_PREFETCH_IN_PROCESS=True)
+    def test_only_server_entry_points_start_the_worker(self):
+        import importlib
+
+        from django.apps import apps
+
+        from dashboard.services import prefetch
+
+        with mock.patch.object(prefetch, "start_prefetch_worker") as start:
+            apps.get_app_config("dashboard").ready()
+            start.assert_not_called()
+
+            for module in ("config.wsgi", "config.asgi"):
+                with mock.patch.dict("sys.modules"):
+                    sys.modules.pop(module, None)
+                    importlib.import_module(module)
+            self.assertEqual(start.call_count, 2)
+
+
+class SensorCatalogTests(SimpleTestCase):
+    def setUp(self):
+        from dashboard.services import sensor_catalog
+
+        self.module = sensor_catalog
+        for name, value in (("_catalog", None), ("_loaded_at", 0.0), ("_failed_at", 0.0)):
+            patcher = mock.patch.object(sensor_catalog, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def location(self, location_id, km_north):
+        from dashboard.services.geo import METRES_PER_DEGREE
+
+        return {
+            "location_id": location_id,
+            "lat": 28.6 + km_north * 1000 / METRES_PER_DEGREE,
+            "lon": 77.2,
+            "sensors": [{"sensor_id": location_id * 10, "parameter": "pm25", "units": "µg/m³"}],
+        }
+
+    def test_cold_catalog_loads_in_the_background(self):
+        release = threading.Event()
+
+        def slow_bulk_load(bbox):
+            release.wait(5)
+            return [self.location(1, 1)]
+
+        with mock.patch.object(self.module, "fetch_locations_in_bbox", slow_bulk_load), \
+                mock.patch.object(self.module, "seed_windows") as seed:
+            started = time.monotonic()
+            self.assertIsNone(self.module.nearest_locations(28.6, 77.2))
+            self.assertLess(time.monotonic() - started, 1)
+
+            release.set()
+            _wait_until(lambda: self.module._catalog is not None)
+            while self.module._load_lock.locked():
+                time.sleep(0.01)
+
+        seed.assert_called_once_with([self.location(1, 1)["sensors"][0]])
+
+        locations, _ = self.module.nearest_locations(28.6, 77.2)
+        self.assertEqual([loc["location_id"] for loc in locations], [1])
+
+    def test_step_keeps_the_first_radius_that_finds_a_location(self):
+        self.module._catalog = self.module.SensorCatalog(
+            [self.location(i, km) for i, km in enumerate((2, 4, 12, 20), start=1)]
+        )
+        # freshly loaded: no background refresh against the real API
+        self.module._loaded_at = time.time()
+
+        locations, farthest_km = self.module.nearest_locations(28.6, 77.2, step_km=5)
+        self.assertEqual([loc["location_id"] for loc in locations], [1, 2])
+        self.assertAlmostEqual(farthest_km, 4, places=3)
+
+        # 5 km south nothing is within 5 km: the 10 km step takes the
+        # locations at 7 and 9 km, not those at 17 and 25 km
+        locations, farthest_km = self.module.nearest_locations(28.6 - 5 / 111.32, 77.2, step_km=5)
+        self.assertEqual([loc["location_id"] for loc in locations], [1, 2])
+        self.assertAlmostEqual(farthest_km, 9, places=3)
+
+        locations, _ = self.module.nearest_locations(28.6, 77.2)
+        self.assertEqual(len(locations), 4)
@@ -19,7 +19,14 @@ from django.urls import path
 from dashboard import views
 
 urlpatterns = [
-    path("dashboard/", views.dashboard_view),
-    path("point-aqi/", views.point_aqi),
+    path("dashboard/", views.dashboard),
+    path("point-aqi/", views.dashboard),
+    path("batch-aqi/", views.batch_aqi),
+    path("history/", views.history),
+    path("aqi-grid/", views.aqi_grid_tile),
+    path("aqi-grid/point/", views.aqi_grid_point),
+    path("async/dashboard/", views.dashboard_async),
+    path("async/point-aqi/", views.dashboard_async),
     path("chatbot/", views.chatbot_view),
+    path("chatbot/stream/", views.chatbot_stream_view),
 ]
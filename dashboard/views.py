@@ -1,10 +1,76 @@
+import hashlib
+import json
+import math
+from datetime import datetime, timedelta, timezone
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from dashboard.services.area_service import (
+    aget_area_air_quality,
+    aget_point_air_quality,
     get_area_air_quality,
+    get_batch_air_quality,
     get_point_air_quality,
 )
+from dashboard.services import metrics
+from dashboard.services.aqi_grid import GRID_RETRY_SECONDS, get_grid
+from dashboard.services.chatbot_service import (
+    get_chatbot_response,
+    stream_chatbot_response,
+)
+from dashboard.services.measurement_store import BUCKETS, get_history
+from dashboard.services.sensor_catalog import nearest_sensors
+from dashboard.metadata.areas import get_area_metadata
+
+MAX_BATCH_ITEMS = 200
+MAX_HISTORY_DAYS = 90
+
+
+def _conditional(request, version: str, last_modified: float, build):
+    """
+    ETag/Last-Modified handling for data with a known version. When the
+    client's copy is current a bodiless 304 is returned and build() (and
+    the serialization behind it) is skipped.
+    """
+
+    etag = 'W/"%s"' % hashlib.sha1(version.encode("utf-8")).hexdigest()[:20]
+    last_modified = int(last_modified)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = build()
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # clients may keep a copy but must revalidate it (cheap with a 304)
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def _aqi_response(request, data: dict, response_class=Response):
+    freshness = data.get("freshness")
+    if not freshness:
+        return response_class(data)
+
+    # everything in the body must be covered by the ETag, so the per-second
+    # age is left out (age = now - updated_at) and the state is versioned
+    freshness = {k: v for k, v in freshness.items() if k != "age_seconds"}
+    data = {**data, "freshness": freshness}
+
+    return _conditional(
+        request,
+        f"{data['area_id']}:{freshness['updated_at']}:{freshness['state']}",
+        freshness["updated_at"],
+        lambda: response_class(data),
+    )
+
 
 @api_view(["GET"])
 def dashboard(request):
@@ -13,16 +79,298 @@ def dashboard(request):
     area_id = request.GET.get("area_id")
 
     if lat and lon:
-        return Response(
-            get_point_air_quality(float(lat), float(lon))
+        return _aqi_response(
+            request, get_point_air_quality(float(lat), float(lon))
         )
 
     if area_id:
+        return _aqi_response(
+            request, get_area_air_quality(area_id)
+        )
+
+    return Response(
+        {"error": "Provide lat/lon or area_id"},
+        status=400
+    )
+
+
+@api_view(["POST"])
+def batch_aqi(request):
+    items = request.data.get("items")
+
+    if not isinstance(items, list) or not items:
+        return Response(
+            {"error": "Provide a non-empty items list"},
+            status=400
+        )
+
+    if len(items) > MAX_BATCH_ITEMS:
+        return Response(
+            {"error": f"At most {MAX_BATCH_ITEMS} items per batch"},
+            status=400
+        )
+
+    if not all(isinstance(item, dict) for item in items):
         return Response(
-            get_area_air_quality(area_id)
+            {"error": "Each item must be an object with area_id or lat/lon"},
+            status=400
         )
 
     return Response(
+        get_batch_air_quality(items)
+    )
+
+
+@api_view(["GET"])
+def history(request):
+    parameter = request.GET.get("parameter", "pm25")
+    bucket = request.GET.get("bucket", "hour")
+    sensor_ids = request.GET.getlist("sensor_id")
+    area_id = request.GET.get("area_id")
+    lat = request.GET.get("lat")
+    lon = request.GET.get("lon")
+
+    if bucket not in BUCKETS:
+        return Response(
+            {"error": f"bucket must be one of {sorted(BUCKETS)}"},
+            status=400
+        )
+
+    try:
+        days = min(int(request.GET.get("days", 7)), MAX_HISTORY_DAYS)
+        sensor_ids = [int(sensor_id) for sensor_id in sensor_ids]
+        if lat and lon:
+            lat, lon = float(lat), float(lon)
+    except ValueError:
+        return Response(
+            {"error": "days, sensor_id, lat and lon must be numbers"},
+            status=400
+        )
+
+    if not sensor_ids:
+        if area_id:
+            meta = get_area_metadata(area_id)
+            if not meta:
+                return Response({"error": "Unknown area_id"}, status=400)
+            lat, lon = meta["lat"], meta["lon"]
+
+        if not (lat and lon):
+            return Response(
+                {"error": "Provide sensor_id, area_id or lat/lon"},
+                status=400
+            )
+
+        nearest = nearest_sensors(lat, lon)
+        sensor_ids = [
+            s["sensor_id"] for s in (nearest[0] if nearest else [])
+            if s["parameter"] == parameter
+        ]
+        if not sensor_ids:
+            return Response({
+                "parameter": parameter,
+                "bucket": bucket,
+                "sensor_ids": [],
+                "series": [],
+            })
+
+    end = datetime.now(timezone.utc)
+    series = get_history(
+        parameter=parameter,
+        start=end - timedelta(days=days),
+        end=end,
+        sensor_ids=sensor_ids,
+        bucket=bucket,
+    )
+
+    return Response({
+        "parameter": parameter,
+        "bucket": bucket,
+        "sensor_ids": sensor_ids,
+        "series": series,
+    })
+
+
+def _parse_bbox(value: str):
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(","))
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise ValueError("bbox values must be finite")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _grid_not_ready():
+    response = JsonResponse(
+        {"error": "AQI grid is being built, retry shortly"},
+        status=503
+    )
+    response["Retry-After"] = GRID_RETRY_SECONDS
+    return response
+
+
+def _grid_tile_response(grid, bbox, tile_format):
+    if tile_format == "bin":
+        (rows, cols, row0, col0), payload = grid.tile_bytes(bbox)
+        response = HttpResponse(payload, content_type="application/octet-stream")
+        response["X-Grid-Rows"] = rows
+        response["X-Grid-Cols"] = cols
+        response["X-Grid-Row0"] = row0
+        response["X-Grid-Col0"] = col0
+        response["X-Grid-BBox"] = ",".join(str(v) for v in grid.bbox)
+        response["X-Grid-Cell-Size-M"] = grid.cell_size_m
+        response["X-Grid-Built-At"] = grid.built_at
+        return response
+
+    return JsonResponse(grid.tile_json(bbox))
+
+
+# plain Django views: DRF reserves ?format= for its own content negotiation
+@require_GET
+def aqi_grid_tile(request):
+    bbox = request.GET.get("bbox")
+    try:
+        bbox = _parse_bbox(bbox) if bbox else None
+    except ValueError:
+        return JsonResponse(
+            {"error": "bbox must be min_lon,min_lat,max_lon,max_lat"},
+            status=400
+        )
+
+    grid = get_grid()
+    if grid is None:
+        return _grid_not_ready()
+
+    tile_format = request.GET.get("format")
+
+    return _conditional(
+        request,
+        f"grid:{grid.built_at}:{bbox}:{tile_format}",
+        grid.built_at,
+        lambda: _grid_tile_response(grid, bbox, tile_format),
+    )
+
+
+@require_GET
+def aqi_grid_point(request):
+    try:
+        lat = float(request.GET["lat"])
+        lon = float(request.GET["lon"])
+    except (KeyError, ValueError):
+        lat = lon = math.nan
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        return JsonResponse(
+            {"error": "Provide lat/lon"},
+            status=400
+        )
+
+    grid = get_grid()
+    if grid is None:
+        return _grid_not_ready()
+
+    result = grid.lookup(lat, lon)
+    if result is None:
+        return JsonResponse(
+            {"error": "Point outside the grid"},
+            status=404
+        )
+
+    return JsonResponse(result)
+
+
+# DRF's @api_view is sync-only, so the async variant is a plain Django view.
+# Under ASGI it runs on the event loop and awaits OpenAQ without holding a
+# worker thread.
+async def dashboard_async(request):
+    lat = request.GET.get("lat")
+    lon = request.GET.get("lon")
+    area_id = request.GET.get("area_id")
+
+    if lat and lon:
+        return _aqi_response(
+            request,
+            await aget_point_air_quality(float(lat), float(lon)),
+            JsonResponse,
+        )
+
+    if area_id:
+        return _aqi_response(
+            request,
+            await aget_area_air_quality(area_id),
+            JsonResponse,
+        )
+
+    return JsonResponse(
         {"error": "Provide lat/lon or area_id"},
         status=400
     )
+
+
+@api_view(["POST"])
+def chatbot_view(request):
+    query = request.data.get("query")
+    if not query:
+        return Response(
+            {"error": "Provide query"},
+            status=400
+        )
+
+    answer = get_chatbot_response(
+        user_type=request.data.get("user_type", "citizen"),
+        aqi_data=request.data.get("aqi", {}),
+        pollutants=request.data.get("pollutants", {}),
+        weather=request.data.get("weather", {}),
+        user_query=query,
+    )
+
+    return Response({"response": answer})
+
+
+def _sse_events(events):
+    for event in events:
+        yield f"data: {json.dumps(event)}\n\n"
+    yield "event: done\ndata: {}\n\n"
+
+
+@api_view(["POST"])
+def chatbot_stream_view(request):
+    """
+    Same body as chatbot_view; the answer is streamed as server-sent events
+    ({"text": ...} per chunk, then a "done" event).
+    """
+
+    query = request.data.get("query")
+    if not query:
+        return Response(
+            {"error": "Provide query"},
+            status=400
+        )
+
+    events = stream_chatbot_response(
+        user_type=request.data.get("user_type", "citizen"),
+        aqi_data=request.data.get("aqi", {}),
+        pollutants=request.data.get("pollutants", {}),
+        weather=request.data.get("weather", {}),
+        user_query=query,
+    )
+
+    response = StreamingHttpResponse(_sse_events(events), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus scrape target. 404 unless AQI_METRICS_ENABLED=1.
+    """
+
+    if not metrics.enabled():
+        return JsonResponse(
+            {"error": "Metrics are disabled; set AQI_METRICS_ENABLED=1"},
+            status=404
+        )
+
+    return HttpResponse(
+        metrics.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )